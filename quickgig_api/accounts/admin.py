@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django import forms
 from django.contrib.auth.forms import ReadOnlyPasswordHashField
+from quickgig_api.admin_tools import LargeTableAdminMixin
 from .models import BaseUser, TaskerProfile
 
 # --- Custom forms for creating and changing users ---
@@ -46,7 +47,7 @@ class BaseUserChangeForm(forms.ModelForm):
 
 # --- Admin class ---
 @admin.register(BaseUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     add_form = BaseUserCreationForm
     form = BaseUserChangeForm
     model = BaseUser
@@ -68,9 +69,14 @@ class CustomUserAdmin(UserAdmin):
     )
 
 @admin.register(TaskerProfile)
-class TaskerProfileAdmin(admin.ModelAdmin):
+class TaskerProfileAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("get_username", "bio", "get_skills", "id")
     search_fields = ("user__email", "user__username", "bio")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("skills")
 
     def get_username(self, obj):
         return obj.user.username
@@ -0,0 +1,21 @@
+"""
+ASGI-native versions of the read-heavy account endpoints (see quickgig_api/asyncapi.py).
+"""
+from quickgig_api.asyncapi import async_read_view
+from quickgig_api.db_routers import read_from_replica
+from quickgig_api.pagination import TaskerPagination
+from .models import TaskerProfile
+from .serializers import TaskerProfileSerializer
+from .views import filter_taskers
+
+
+@async_read_view(authenticated=False)
+async def public_taskers(request):
+    """Async PublicTaskerListView"""
+    queryset = TaskerProfile.objects.select_related('user').prefetch_related('skills')
+    queryset = filter_taskers(queryset, request.query_params, fields=('skills', 'location', 'username'))
+
+    paginator = TaskerPagination()
+    with read_from_replica():
+        page = await paginator.apaginate_queryset(queryset, request)
+    return paginator.get_paginated_data(TaskerProfileSerializer(page, many=True).data)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher
+from django.core.checks import Error, register
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from settings.PASSWORD_PBKDF2_ITERATIONS.
+    Hashes with another iteration count are updated on the user's next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+@register()
+def check_password_hasher(app_configs, **kwargs):
+    """The preferred hasher's optional library (argon2-cffi, bcrypt) must be installed"""
+    hasher = get_hasher('default')
+    if getattr(hasher, 'library', None) is None:
+        return []
+    try:
+        hasher._load_library()
+    except ValueError as e:
+        return [Error(str(e), hint="Install it or change PASSWORD_HASHER.", id='accounts.E001')]
+    return []
@@ -0,0 +1,90 @@
+import json
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from quickgig_api.benchmark import format_result, run_concurrently, summarize
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput and latency through POST /api/accounts/auth/login/, "
+        "optionally under several password hasher configurations. "
+        "Runs against the configured database and removes its user afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Total logins')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent clients')
+        parser.add_argument(
+            '--hashers', nargs='+', default=[None],
+            help="Hasher configurations to compare: pbkdf2, pbkdf2:<iterations>, argon2, bcrypt "
+                 "(default: the configured one)"
+        )
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        email = f'login-{uuid.uuid4().hex[:8]}@bench.local'
+        password = uuid.uuid4().hex
+        user = User.objects.create_user(email=email, password=password, username='bench-login', is_active=True)
+
+        results = []
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for config in options['hashers']:
+                    with override_settings(**self._hasher_settings(config)):
+                        # Store the password with this configuration's hasher first
+                        user.set_password(password)
+                        user.save(update_fields=['password'])
+                        results.append(self._run(config, email, password, options))
+        finally:
+            User.objects.filter(email=email).delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(f"{format_result(result)}, {result['queries_per_login']} queries per login")
+
+    def _hasher_settings(self, config):
+        if config is None:
+            return {}
+
+        name, _, iterations = config.partition(':')
+        if name not in settings.PASSWORD_HASHER_CHOICES:
+            raise CommandError(f"Unknown hasher {name!r}, choose from {', '.join(settings.PASSWORD_HASHER_CHOICES)}")
+
+        overrides = {
+            'PASSWORD_HASHERS': [settings.PASSWORD_HASHER_CHOICES[name]] + [
+                hasher for other, hasher in settings.PASSWORD_HASHER_CHOICES.items() if other != name
+            ],
+        }
+        if iterations:
+            overrides['PASSWORD_PBKDF2_ITERATIONS'] = int(iterations)
+        return overrides
+
+    def _run(self, config, email, password, options):
+        url = reverse('user-login')
+        payload = {'email': email, 'password': password}
+
+        def login(index):
+            response = Client().post(url, payload, content_type='application/json')
+            if response.status_code != 200:
+                raise CommandError(f"Login failed with {response.status_code}: {response.content[:200]}")
+
+        with CaptureQueriesContext(connection) as queries:
+            login(0)
+        latencies, seconds = run_concurrently(login, options['requests'], options['threads'])
+
+        return summarize(
+            f"login[{config or settings.PASSWORD_HASHER}]", latencies, seconds,
+            threads=options['threads'], queries_per_login=len(queries)
+        )
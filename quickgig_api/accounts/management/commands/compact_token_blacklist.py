@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted refresh tokens in small batches. "
+        "Expired tokens are rejected on their own, so their rows only slow down the blacklist lookups. "
+        "Meant to run from cron, e.g. `0 3 * * * python manage.py compact_token_blacklist`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tokens deleted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the expired tokens')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # Fixed cut-off, so tokens expiring while this runs are left for the next run
+        expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now())
+
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} expired tokens would be deleted")
+            return
+
+        total = 0
+        while True:
+            # Short transactions keep the table available to logins and refreshes
+            with transaction.atomic():
+                ids = list(expired.order_by('id').values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            total += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired tokens"))
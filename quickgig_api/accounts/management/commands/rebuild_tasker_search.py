@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import TaskerProfile
+from accounts.search import TaskerSearch
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized tasker search terms for every tasker profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        profile_ids = list(TaskerProfile.objects.order_by('id').values_list('id', flat=True))
+
+        for start in range(0, len(profile_ids), batch_size):
+            TaskerSearch.rebuild(profile_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search terms for {len(profile_ids)} taskers"))
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:53
+
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+# Frozen copy of accounts.search.build_terms as of this migration, so later
+# changes to the live search code don't alter what this backfill writes
+def normalize(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char)).lower()
+    return ' '.join(''.join(char if char.isalnum() else ' ' for char in value).split())
+
+
+def build_terms(username, location, skill_ids):
+    terms = set()
+    for (word_kind, trigram_kind), value in (
+        (('username', 'username_trigram'), username),
+        (('location', 'location_trigram'), location),
+    ):
+        normalized = normalize(value)
+        terms.update((word_kind, word[:64]) for word in normalized.split())
+        terms.update((trigram_kind, normalized[i:i + 3]) for i in range(len(normalized) - 2))
+    terms.update(('skill', str(skill_id)) for skill_id in skill_ids)
+    return terms
+
+
+def backfill_search_terms(apps, schema_editor):
+    TaskerProfile = apps.get_model('accounts', 'TaskerProfile')
+    TaskerSearchTerm = apps.get_model('accounts', 'TaskerSearchTerm')
+    Skill = TaskerProfile.skills.through
+
+    profiles = TaskerProfile.objects.order_by('id').values_list('id', 'user__username', 'user__location')
+    last_id = 0
+    while True:
+        batch = list(profiles.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        skills = {}
+        for profile_id, skill_id in Skill.objects.filter(
+            taskerprofile_id__in=[profile_id for profile_id, _, _ in batch]
+        ).values_list('taskerprofile_id', 'service_id'):
+            skills.setdefault(profile_id, []).append(skill_id)
+
+        TaskerSearchTerm.objects.bulk_create(
+            [
+                TaskerSearchTerm(profile_id=profile_id, kind=kind, term=term)
+                for profile_id, username, location in batch
+                for kind, term in build_terms(username, location, skills.get(profile_id, []))
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_baseuser_options_alter_taskerprofile_options_and_more'),
+        ('services', '0002_alter_service_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskerSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('username', 'Username word'), ('username_trigram', 'Username trigram'), ('location', 'Location word'), ('location_trigram', 'Location trigram'), ('skill', 'Skill')], max_length=20)),
+                ('term', models.CharField(max_length=64)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='accounts.taskerprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'term', 'profile'], name='tasker_search_term_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_search_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_tasker_search_terms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baseuser',
+            name='profile_picture_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
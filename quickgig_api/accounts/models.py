@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from services.models import Service
+from .pictures import DEFAULT_PICTURE, schedule_thumbnails
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 class UserManager(BaseUserManager):
@@ -25,6 +26,8 @@ class BaseUser(AbstractBaseUser, PermissionsMixin):
     location = models.CharField(max_length=255, blank=True)
     phone_number = models.CharField(max_length=20, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True)
+    # SHA-256 of the picture once its thumbnails exist (accounts.pictures)
+    profile_picture_digest = models.CharField(max_length=64, blank=True, editable=False)
 
     # roles
     is_client = models.BooleanField(default=True)
@@ -36,6 +39,12 @@ class BaseUser(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    # Fields whose changes the save hooks react to (thumbnails, tasker profile, search terms)
+    TRACKED_FIELDS = ('profile_picture', 'username', 'location', 'is_tasker')
+    # Their values as last loaded or saved, and the ones the last save changed
+    _saved_values = {}
+    changed_fields = frozenset()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
@@ -50,11 +59,54 @@ class BaseUser(AbstractBaseUser, PermissionsMixin):
         # Handle profile picture
         # If profile picture is empty, assign default picture
         if not self.profile_picture:
-            # Ensure default picture path is correct
-            default_picture_path = 'profile_pictures/default-avatar.jpg'
-            self.profile_picture.name = default_picture_path
+            self.profile_picture.name = DEFAULT_PICTURE
+
+        update_fields = kwargs.get('update_fields')
+        self.changed_fields = {
+            name for name, value in self._tracked_values().items()
+            # Unknown (deferred) values count as changed
+            if self._saved_values.get(name, models.DEFERRED) != value
+            and (update_fields is None or name in update_fields)
+        }
+        if not self.profile_picture._committed:
+            self.changed_fields.add('profile_picture')
+
+        # A new upload or another stored picture needs new thumbnails
+        if 'profile_picture' in self.changed_fields:
+            self.profile_picture_digest = ''
         super().save(*args, **kwargs)
 
+        self._saved_values = {
+            **self._saved_values,
+            **{name: value for name, value in self._tracked_values().items()
+               if update_fields is None or name in update_fields},
+        }
+        if 'profile_picture' in self.changed_fields and self.profile_picture.name != DEFAULT_PICTURE:
+            user_id = self.pk
+            transaction.on_commit(lambda: schedule_thumbnails(user_id))
+
+    def _tracked_values(self):
+        return {
+            'profile_picture': self.profile_picture.name, 'username': self.username,
+            'location': self.location, 'is_tasker': self.is_tasker,
+        }
+
+    def _loaded_values(self, names):
+        # From __dict__, so deferred fields stay unloaded
+        values = {name: self.__dict__.get(name, models.DEFERRED) for name in names}
+        return {name: getattr(value, 'name', value) for name, value in values.items()}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._saved_values = user._loaded_values(cls.TRACKED_FIELDS)
+        return user
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        refreshed = [name for name in self.TRACKED_FIELDS if fields is None or name in fields]
+        self._saved_values = {**self._saved_values, **self._loaded_values(refreshed)}
+
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
@@ -69,4 +121,34 @@ class TaskerProfile(models.Model):
     
     class Meta:
         verbose_name = 'Tasker'
-        verbose_name_plural = 'Taskers'
\ No newline at end of file
+        verbose_name_plural = 'Taskers'
+
+
+class TaskerSearchTerm(models.Model):
+    """Denormalized search term of a tasker, kept up to date by accounts.signals"""
+    USERNAME = 'username'
+    USERNAME_TRIGRAM = 'username_trigram'
+    LOCATION = 'location'
+    LOCATION_TRIGRAM = 'location_trigram'
+    SKILL = 'skill'
+
+    KIND_CHOICES = [
+        (USERNAME, 'Username word'),
+        (USERNAME_TRIGRAM, 'Username trigram'),
+        (LOCATION, 'Location word'),
+        (LOCATION_TRIGRAM, 'Location trigram'),
+        (SKILL, 'Skill'),
+    ]
+
+    profile = models.ForeignKey(TaskerProfile, on_delete=models.CASCADE, related_name='search_terms')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    term = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"{self.kind}: {self.term}"
+
+    class Meta:
+        indexes = [
+            # Covers the whole lookup, the search never has to read the table itself
+            models.Index(fields=['kind', 'term', 'profile'], name='tasker_search_term_idx'),
+        ]
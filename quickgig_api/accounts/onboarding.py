@@ -0,0 +1,57 @@
+"""
+Registration and become-tasker write paths.
+
+Both run in one transaction with a fixed number of queries, however many
+skills a new tasker picks:
+
+- register_user: one INSERT of the active user.
+- become_tasker: a compare-and-set UPDATE of is_tasker, an upsert of the
+  profile, a DELETE + INSERT of its skills and a DELETE + INSERT of its
+  search terms, built from the values at hand instead of read back.
+
+become_tasker writes with update() and bulk_create(), so the BaseUser and
+TaskerProfile save signals do not run a second time over the same rows.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import BaseUser, TaskerProfile
+from .search import TaskerSearch
+
+
+class Onboarding:
+
+    @staticmethod
+    def register_user(email, password, **fields):
+        """Create an active user (set is_active=False here once email verification exists)"""
+        return BaseUser.objects.create_user(email, password, is_active=True, **fields)
+
+    @staticmethod
+    @transaction.atomic
+    def become_tasker(user, bio, skills):
+        """Turn user into a tasker with the given bio and skills (Service instances), returning the profile"""
+        # Only one of two concurrent requests gets to convert the user
+        if not BaseUser.objects.filter(id=user.id, is_tasker=False).update(is_tasker=True):
+            raise ValidationError("User is already a tasker.", code='conflict')
+        user.is_tasker = True
+        user._saved_values = {**user._saved_values, 'is_tasker': True}
+
+        # A former tasker keeps their profile row, which gets the new bio
+        profile, = TaskerProfile.objects.bulk_create(
+            [TaskerProfile(user=user, bio=bio)],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['bio'],
+        )
+
+        skill_ids = sorted({service.id for service in skills})
+        through = TaskerProfile.skills.through
+        through.objects.filter(taskerprofile_id=profile.id).delete()
+        through.objects.bulk_create(
+            [through(taskerprofile_id=profile.id, service_id=skill_id) for skill_id in skill_ids]
+        )
+
+        TaskerSearch.index(profile.id, user.username, user.location, skill_ids)
+        # So user.taskerprofile needs no query
+        user.taskerprofile = profile
+        return profile
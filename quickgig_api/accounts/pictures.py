@@ -0,0 +1,135 @@
+"""
+Profile picture thumbnails.
+
+After a user saves a new profile picture, a worker thread (PROFILE_PICTURE_WORKERS)
+decodes it once and writes one thumbnail per PROFILE_PICTURE_SIZES entry (card
+and avatar) as WebP. Thumbnails are named after the SHA-256 of the source
+image, thumbnails/<ab>/<digest>-<size>.webp, so an image is only processed
+once however many users upload it, and a thumbnail URL never changes
+content. In production the web server or CDN serves MEDIA_ROOT/thumbnails/
+with THUMBNAIL_CACHE_CONTROL; under DEBUG, serve_thumbnail does the same.
+
+The digest is stored on BaseUser.profile_picture_digest once the thumbnails
+exist; until then, and for users on the default avatar, thumbnail_urls()
+returns the default avatar's thumbnails.
+"""
+import functools
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.views.static import serve
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PICTURE = 'profile_pictures/default-avatar.jpg'
+THUMBNAIL_DIR = 'thumbnails'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_name(digest, size):
+    return f'{THUMBNAIL_DIR}/{digest[:2]}/{digest}-{size}.webp'
+
+
+def generate_thumbnails(name, storage=default_storage):
+    """Write the thumbnails of the stored image name, returning its digest"""
+    with storage.open(name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    missing = {size: box for size, box in settings.PROFILE_PICTURE_SIZES.items()
+               if not storage.exists(thumbnail_name(digest, size))}
+    if not missing:
+        return digest
+
+    image = Image.open(io.BytesIO(data))
+    # Let JPEG decode at the smallest scale still larger than every thumbnail
+    largest = max(missing.values())
+    image.draft('RGB', largest)
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+
+    for size, box in missing.items():
+        output = io.BytesIO()
+        ImageOps.fit(image, box, Image.Resampling.LANCZOS).save(output, 'WEBP', quality=80)
+        target = thumbnail_name(digest, size)
+        saved = storage.save(target, ContentFile(output.getvalue()))
+        if saved != target:
+            # Another worker wrote the same content first
+            storage.delete(saved)
+    return digest
+
+
+def process_profile_picture(user_id):
+    """Thumbnail the user's current picture and record its digest"""
+    from .models import BaseUser
+
+    try:
+        name = BaseUser.objects.filter(id=user_id).values_list('profile_picture', flat=True).first()
+        if not name or name == DEFAULT_PICTURE:
+            return
+        digest = generate_thumbnails(name)
+        # Unless the picture was replaced in the meantime
+        BaseUser.objects.filter(id=user_id, profile_picture=name).update(profile_picture_digest=digest)
+    except Exception:
+        logger.exception("Could not create thumbnails for user %s", user_id)
+    finally:
+        if threading.current_thread() is not threading.main_thread() and settings.PROFILE_PICTURE_WORKERS:
+            connections.close_all()
+
+
+def schedule_thumbnails(user_id):
+    """Process the user's picture on a worker thread, or inline without workers"""
+    global _executor
+
+    if not settings.PROFILE_PICTURE_WORKERS:
+        process_profile_picture(user_id)
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.PROFILE_PICTURE_WORKERS, thread_name_prefix='thumbnails')
+    _executor.submit(process_profile_picture, user_id)
+
+
+@functools.cache
+def _default_digest():
+    return generate_thumbnails(DEFAULT_PICTURE)
+
+
+def default_digest():
+    """Digest of the default avatar, thumbnailed on first use"""
+    # functools.cache keeps no result when the call raises, so a failure is retried next time
+    try:
+        return _default_digest()
+    except (OSError, ValueError):
+        logger.exception("Could not create thumbnails for the default avatar")
+        return None
+
+
+def thumbnail_urls(user, request=None):
+    """Size -> thumbnail URL of the user's picture (the default avatar's while theirs are pending)"""
+    digest = user.profile_picture_digest or default_digest()
+    if not digest:
+        return {size: None for size in settings.PROFILE_PICTURE_SIZES}
+
+    urls = {}
+    for size in settings.PROFILE_PICTURE_SIZES:
+        url = default_storage.url(thumbnail_name(digest, size))
+        urls[size] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def serve_thumbnail(request, path):
+    """Serve a thumbnail from MEDIA_ROOT for good, its name changes with its content (only routed under DEBUG)"""
+    response = serve(request, path, document_root=f'{settings.MEDIA_ROOT}/{THUMBNAIL_DIR}')
+    response['Cache-Control'] = settings.THUMBNAIL_CACHE_CONTROL
+    return response
@@ -0,0 +1,127 @@
+"""
+Tasker search backed by the denormalized TaskerSearchTerm table.
+
+Every tasker gets one row per normalized username/location word, one row per
+trigram of the normalized username/location and one row per skill. Searches
+only look up indexed (kind, term) pairs instead of scanning users with
+icontains and de-duplicating a skills join:
+
+- skills:   any of the given skill ids
+- location/username with 3+ characters: every trigram of the query must be present
+- shorter location/username queries: prefix match on the words
+"""
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import TaskerProfile, TaskerSearchTerm
+
+MAX_TERM_LENGTH = 64
+
+TEXT_FIELDS = (
+    ('username', TaskerSearchTerm.USERNAME, TaskerSearchTerm.USERNAME_TRIGRAM),
+    ('location', TaskerSearchTerm.LOCATION, TaskerSearchTerm.LOCATION_TRIGRAM),
+)
+
+
+def normalize(value):
+    """Lowercase, strip accents and collapse everything but letters and digits to single spaces"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char)).lower()
+    return ' '.join(''.join(char if char.isalnum() else ' ' for char in value).split())
+
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def build_terms(username, location, skill_ids):
+    """Get the (kind, term) pairs describing one tasker"""
+    terms = set()
+    for (_, word_kind, trigram_kind), value in zip(TEXT_FIELDS, (username, location)):
+        normalized = normalize(value)
+        terms.update((word_kind, word[:MAX_TERM_LENGTH]) for word in normalized.split())
+        terms.update((trigram_kind, trigram) for trigram in trigrams(normalized))
+    terms.update((TaskerSearchTerm.SKILL, str(skill_id)) for skill_id in skill_ids)
+    return terms
+
+
+class TaskerSearch:
+    """Maintain and query the tasker search terms"""
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(profile_ids):
+        """Recompute the search terms of the given tasker profiles"""
+        profile_ids = list(profile_ids)
+        if not profile_ids:
+            return
+
+        profiles = TaskerProfile.objects.filter(id__in=profile_ids).values_list(
+            'id', 'user__username', 'user__location'
+        )
+        skills = {}
+        for profile_id, skill_id in TaskerProfile.skills.through.objects.filter(
+            taskerprofile_id__in=profile_ids
+        ).values_list('taskerprofile_id', 'service_id'):
+            skills.setdefault(profile_id, []).append(skill_id)
+
+        TaskerSearch.replace_terms(
+            profile_ids,
+            (
+                (profile_id, build_terms(username, location, skills.get(profile_id, [])))
+                for profile_id, username, location in profiles
+            ),
+        )
+
+    @staticmethod
+    def index(profile_id, username, location, skill_ids):
+        """Set the search terms of one tasker from known values, without reading them back"""
+        TaskerSearch.replace_terms([profile_id], [(profile_id, build_terms(username, location, skill_ids))])
+
+    @staticmethod
+    def replace_terms(profile_ids, profile_terms):
+        """Replace the terms of profile_ids with the (profile_id, terms) pairs"""
+        TaskerSearchTerm.objects.filter(profile_id__in=profile_ids).delete()
+        TaskerSearchTerm.objects.bulk_create(
+            [
+                TaskerSearchTerm(profile_id=profile_id, kind=kind, term=term)
+                for profile_id, terms in profile_terms
+                for kind, term in terms
+            ],
+            batch_size=1000
+        )
+
+    @staticmethod
+    def matching_profiles(field, value):
+        """Subquery of profile ids whose username/location matches value"""
+        _, word_kind, trigram_kind = next(entry for entry in TEXT_FIELDS if entry[0] == field)
+        normalized = normalize(value)
+        grams = trigrams(normalized)
+
+        if grams:
+            return TaskerSearchTerm.objects.filter(
+                kind=trigram_kind, term__in=grams
+            ).values('profile_id').annotate(
+                matched=Count('term', distinct=True)
+            ).filter(matched=len(grams)).values('profile_id')
+
+        # Range instead of LIKE so the (kind, term) index is usable on every backend
+        return TaskerSearchTerm.objects.filter(
+            kind=word_kind, term__gte=normalized, term__lt=normalized + '\uffff'
+        ).values('profile_id')
+
+    @staticmethod
+    def filter_queryset(queryset, skill_ids=None, location=None, username=None):
+        """Narrow a TaskerProfile queryset down to the taskers matching the search"""
+        if skill_ids is not None:
+            queryset = queryset.filter(id__in=TaskerSearchTerm.objects.filter(
+                kind=TaskerSearchTerm.SKILL, term__in=[str(skill_id) for skill_id in skill_ids]
+            ).values('profile_id'))
+
+        for field, value in (('location', location), ('username', username)):
+            if value and normalize(value):
+                queryset = queryset.filter(id__in=TaskerSearch.matching_profiles(field, value))
+
+        return queryset
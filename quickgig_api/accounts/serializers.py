@@ -1,9 +1,14 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import update_last_login
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from .models import BaseUser, TaskerProfile
+from .onboarding import Onboarding
+from .pictures import thumbnail_urls
+from .tokens import CachedBlacklistRefreshToken
 from services.models import Service
 
 
@@ -22,10 +27,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password_confirm', None)
-        user = BaseUser.objects.create_user(**validated_data)
-        user.is_active = True  # Activate user immediately or set to False for email verification
-        user.save()
-        return user
+        return Onboarding.register_user(**validated_data)
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -44,11 +46,26 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             
             if not user.is_active:
                 raise serializers.ValidationError('User account is disabled.')
-            
-            attrs['user'] = user
-            validated_data = super().validate(attrs)
-            validated_data['user'] = user
-            return validated_data
+
+            # Build the tokens here rather than in super().validate(), which would
+            # authenticate (and hash the password) a second time
+            self.user = user
+            refresh = self.get_token(user)
+
+            if jwt_settings.UPDATE_LAST_LOGIN:
+                update_last_login(None, user)
+
+            return {
+                'refresh': str(refresh),
+                'access': str(refresh.access_token),
+                'user': {
+                    'id': user.id,
+                    'email': user.email,
+                    'username': user.username,
+                    'is_tasker': user.is_tasker,
+                    'is_client': user.is_client,
+                },
+            }
         else:
             raise serializers.ValidationError('Must include "email" and "password".')
 
@@ -63,14 +80,25 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return token
 
 
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh that checks revocation through the in-process revocation index"""
+    token_class = CachedBlacklistRefreshToken
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for viewing user profile"""
+    profile_thumbnails = serializers.SerializerMethodField()
+
     class Meta:
         model = BaseUser
         fields = ('id', 'email', 'username', 'location', 'phone_number', 
-                 'profile_picture', 'is_client', 'is_tasker')
+                 'profile_picture', 'profile_thumbnails', 'is_client', 'is_tasker')
         read_only_fields = ('id', 'email', 'is_client', 'is_tasker')
 
+    def get_profile_thumbnails(self, obj):
+        # Cards and avatars should use these, not the full size profile_picture
+        return thumbnail_urls(obj, self.context.get('request'))
+
 
 class UserUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating user profile"""
@@ -95,28 +123,23 @@ class UserUpdateSerializer(serializers.ModelSerializer):
 class BecomeTaskerSerializer(serializers.Serializer):
     """Serializer for converting a user to a tasker"""
     bio = serializers.CharField(max_length=1000, required=True)
-    skills = serializers.ListField(
-        child=serializers.PrimaryKeyRelatedField(queryset=Service.objects.all()),
-        required=True,
-    )
+    skills = serializers.ListField(child=serializers.IntegerField(), required=True)
+
+    def validate_skills(self, value):
+        # One query for all the skills rather than one per PrimaryKeyRelatedField
+        services = list(Service.objects.filter(id__in=set(value)))
+        missing = set(value) - {service.id for service in services}
+        if missing:
+            raise serializers.ValidationError(
+                [f'Invalid pk "{pk}" - object does not exist.' for pk in sorted(missing)]
+            )
+        return services
 
     def update(self, instance, validated_data):
-        # Update user to be a tasker
-        instance.is_tasker = True
-        instance.save()
-
-        # The signal will automatically create the TaskerProfile
-        # Now get the profile and update it
-        tasker_profile = instance.taskerprofile
-        
-        # Update profile with provided data
-        if 'bio' in validated_data:
-            tasker_profile.bio = validated_data['bio']
-        
-        if 'skills' in validated_data:
-            tasker_profile.skills.set(validated_data['skills'])
-        
-        tasker_profile.save()
+        try:
+            Onboarding.become_tasker(instance, validated_data['bio'], validated_data['skills'])
+        except ValidationError as e:
+            raise serializers.ValidationError(e.messages)
         return instance
 
 
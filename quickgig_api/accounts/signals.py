@@ -1,10 +1,69 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from .models import BaseUser, TaskerProfile
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from services.models import Service
+from .models import BaseUser, TaskerProfile, TaskerSearchTerm
+from .search import TaskerSearch
+from .tokens import revocations
+
+# BaseUser fields that feed the tasker search terms
+SEARCH_FIELDS = {'username', 'location', 'is_tasker'}
 
 
 @receiver(post_save, sender=BaseUser)
 def create_tasker_profile(sender, instance, created, **kwargs):
-    # If the user is a tasker but doesn't have a profile, create one
-    if instance.is_tasker and not hasattr(instance, 'tasker_profile'):
+    # A user who just became a tasker gets a profile, other saves don't query
+    if instance.is_tasker and 'is_tasker' in instance.changed_fields:
         TaskerProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=BaseUser)
+def update_tasker_search_terms(sender, instance, created, **kwargs):
+    """Refresh the search terms when a tasker's username or location changes, drop them when they stop being one"""
+    if not instance.is_tasker:
+        # The profile stays (become_tasker reuses it), its terms must not
+        if not created and 'is_tasker' in instance.changed_fields:
+            TaskerSearchTerm.objects.filter(profile__user=instance).delete()
+        return
+    # changed_fields only holds saved fields, so update_fields is covered too
+    if not SEARCH_FIELDS & instance.changed_fields:
+        return
+    TaskerSearch.rebuild(TaskerProfile.objects.filter(user=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=TaskerProfile)
+def index_new_tasker_profile(sender, instance, created, **kwargs):
+    if created:
+        TaskerSearch.rebuild([instance.id])
+
+
+@receiver(m2m_changed, sender=TaskerProfile.skills.through)
+def update_tasker_skill_terms(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh the search terms when skills are added to or removed from taskers"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        profile_ids = [instance.id]
+    elif action == 'post_clear':
+        # service.taskerprofile_set.clear(): the service's terms are still there
+        profile_ids = TaskerSearchTerm.objects.filter(
+            kind=TaskerSearchTerm.SKILL, term=str(instance.id)
+        ).values_list('profile_id', flat=True)
+    else:
+        profile_ids = pk_set
+
+    TaskerSearch.rebuild(profile_ids)
+
+
+@receiver(post_delete, sender=Service)
+def drop_deleted_skill_terms(sender, instance, **kwargs):
+    """The cascade on the skills through table sends no m2m_changed, drop the service's terms here"""
+    TaskerSearchTerm.objects.filter(kind=TaskerSearchTerm.SKILL, term=str(instance.id)).delete()
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def index_revoked_token(sender, instance, created, **kwargs):
+    """Make this process' revocation index aware of the token right away"""
+    if created:
+        revocations.add(instance.token.jti)
@@ -1,3 +1,517 @@
-from django.test import TestCase
+import importlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from PIL import Image
+
+from services.models import Category, Service
+from .models import BaseUser, TaskerSearchTerm
+from .pictures import _default_digest, default_digest, serve_thumbnail, thumbnail_name
+from .search import build_terms
+from .serializers import BecomeTaskerSerializer
+from .tokens import BloomFilter, revocations
+
+
+class PublicTaskerSearchTests(TestCase):
+    """Public tasker search through the denormalized search terms"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Home')
+        self.cleaning = Service.objects.create(name='Cleaning', description='', price='10.00', category=category)
+        self.plumbing = Service.objects.create(name='Plumbing', description='', price='20.00', category=category)
+
+        self.alice = self._tasker('alice@example.com', 'Alice Wanjiru', 'Nairobi West', [self.cleaning])
+        self.bob = self._tasker('bob@example.com', 'Bob Otieno', 'Mombasa', [self.plumbing])
+        self.carol = self._tasker('carol@example.com', 'Carol', 'Nairobi', [self.cleaning, self.plumbing])
+        self.client = APIClient()
+
+    def _tasker(self, email, username, location, skills):
+        user = BaseUser.objects.create_user(
+            email=email, password=None, username=username, location=location, is_tasker=True
+        )
+        user.taskerprofile.skills.set(skills)
+        return user
+
+    def _search(self, **params):
+        response = self.client.get(reverse('public-taskers'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(tasker['user']['email'] for tasker in response.data['results'])
+
+    def test_filter_by_skills(self):
+        self.assertEqual(self._search(skills=self.plumbing.id), ['bob@example.com', 'carol@example.com'])
+        self.assertEqual(
+            self._search(skills=f'{self.cleaning.id},{self.plumbing.id}'),
+            ['alice@example.com', 'bob@example.com', 'carol@example.com']
+        )
+
+    def test_location_substring_match(self):
+        self.assertEqual(self._search(location='NAIROBI'), ['alice@example.com', 'carol@example.com'])
+        self.assertEqual(self._search(location='robi we'), ['alice@example.com'])
+        self.assertEqual(self._search(location='kisumu'), [])
+
+    def test_short_username_is_prefix_match(self):
+        self.assertEqual(self._search(username='ot'), ['bob@example.com'])
+        self.assertEqual(self._search(username='wanj'), ['alice@example.com'])
+
+    def test_combined_filters(self):
+        self.assertEqual(
+            self._search(skills=self.cleaning.id, location='nairobi', username='car'),
+            ['carol@example.com']
+        )
+
+    def test_terms_follow_profile_changes(self):
+        self.bob.location = 'Nairobi CBD'
+        self.bob.save()
+        self.alice.taskerprofile.skills.add(self.plumbing)
+        self.cleaning.taskerprofile_set.clear()
+
+        self.assertEqual(
+            self._search(location='nairobi'),
+            ['alice@example.com', 'bob@example.com', 'carol@example.com']
+        )
+        self.assertEqual(self._search(skills=self.cleaning.id), [])
+        self.assertEqual(
+            self._search(skills=self.plumbing.id),
+            ['alice@example.com', 'bob@example.com', 'carol@example.com']
+        )
+
+    def test_last_login_update_does_not_touch_terms(self):
+        before = list(TaskerSearchTerm.objects.values_list('id', flat=True))
+
+        self.alice.save(update_fields=['last_login'])
+
+        self.assertEqual(list(TaskerSearchTerm.objects.values_list('id', flat=True)), before)
+
+    def test_deleted_service_leaves_no_skill_terms(self):
+        plumbing_id = self.plumbing.id
+        self.plumbing.delete()
+
+        self.assertFalse(TaskerSearchTerm.objects.filter(kind=TaskerSearchTerm.SKILL, term=str(plumbing_id)).exists())
+        self.assertEqual(self._search(skills=self.cleaning.id), ['alice@example.com', 'carol@example.com'])
+
+    def test_former_tasker_loses_terms(self):
+        self.bob.is_tasker = False
+        self.bob.save()
+
+        self.assertFalse(TaskerSearchTerm.objects.filter(profile__user=self.bob).exists())
+
+    def test_migration_terms_match_the_live_ones(self):
+        migration = importlib.import_module('accounts.migrations.0004_tasker_search_terms')
+
+        for username, location in (('Alice Wanjiru', 'Nairobi West'), ('Zoë', ''), ('', None)):
+            self.assertEqual(
+                migration.build_terms(username, location, [1, 2]), build_terms(username, location, [1, 2])
+            )
+
+
+class LoginTests(TestCase):
+    """POST /api/accounts/auth/login/"""
+
+    def setUp(self):
+        self.user = BaseUser.objects.create_user(
+            email='login@example.com', password='pass12345', username='login', is_active=True
+        )
+        self.client = APIClient()
+
+    def test_login_looks_up_the_user_once(self):
+        # user lookup + outstanding refresh token insert
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                reverse('user-login'), {'email': 'login@example.com', 'password': 'pass12345'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], 'Login successful')
+        self.assertEqual(response.data['user']['id'], self.user.id)
+        self.assertIn('access', response.data)
+        self.assertIn('refresh', response.data)
+
+    def test_wrong_password(self):
+        response = self.client.post(
+            reverse('user-login'), {'email': 'login@example.com', 'password': 'wrong'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OnboardingTests(TestCase):
+    """Registration and become-tasker run in one transaction with a fixed query count"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Home')
+        self.services = [
+            Service.objects.create(name=f'Service {i}', description='', price=10, category=category)
+            for i in range(5)
+        ]
+        self.client = APIClient()
+
+    def register(self):
+        return self.client.post(reverse('user-register'), {
+            'email': 'new@example.com', 'username': 'new user', 'location': 'Lyon',
+            'password': 'Xy12345678!', 'password_confirm': 'Xy12345678!',
+        }, format='json')
+
+    def become_tasker(self, user, skills):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse('users-become-tasker'),
+            {'bio': 'Handy', 'skills': [service.id for service in skills]},
+            format='json'
+        )
+
+    def test_register_query_budget(self):
+        # email check, savepoint, user insert, outstanding token insert, release
+        with self.assertNumQueries(5):
+            response = self.register()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = BaseUser.objects.get(email='new@example.com')
+        self.assertTrue(user.is_active)
+        self.assertTrue(user.check_password('Xy12345678!'))
+
+    def test_become_tasker_query_budget_does_not_grow_with_skills(self):
+        self.register()
+        for skills in (self.services[:1], self.services):
+            user = BaseUser.objects.create_user(
+                email=f'{len(skills)}@example.com', password=None, username=f'tasker{len(skills)}'
+            )
+            # skills lookup, savepoint, user update, profile upsert, skills delete + insert,
+            # search terms delete + insert, release, response skills
+            with self.assertNumQueries(10):
+                response = self.become_tasker(user, skills)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        user.refresh_from_db()
+        self.assertTrue(user.is_tasker)
+        profile = user.taskerprofile
+        self.assertEqual(profile.bio, 'Handy')
+        self.assertEqual(set(profile.skills.all()), set(self.services))
+        self.assertEqual(
+            set(TaskerSearchTerm.objects.filter(profile=profile, kind=TaskerSearchTerm.SKILL)
+                .values_list('term', flat=True)),
+            {str(service.id) for service in self.services},
+        )
+        self.assertEqual(response.data['tasker_profile']['id'], profile.id)
+
+    def test_become_tasker_serializer_returns_the_user(self):
+        user = BaseUser.objects.create_user(email='t@example.com', password=None, username='t')
+        serializer = BecomeTaskerSerializer(user, data={'bio': 'Handy', 'skills': [self.services[0].id]})
+        serializer.is_valid(raise_exception=True)
+
+        self.assertIs(serializer.save(), user)
+        self.assertTrue(user.is_tasker)
+        self.assertEqual(user.taskerprofile.bio, 'Handy')
+
+    def test_become_tasker_rejects_unknown_skills_and_taskers(self):
+        user = BaseUser.objects.create_user(email='t@example.com', password=None, username='t')
+
+        response = self.become_tasker(user, [Service(id=999)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('skills', response.data)
+        user.refresh_from_db()
+        self.assertFalse(user.is_tasker)
+
+        self.become_tasker(user, self.services[:1])
+        response = self.become_tasker(user, self.services[:1])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordinary_tasker_save_is_one_query(self):
+        user = BaseUser.objects.create_user(email='t@example.com', password=None, username='t', is_tasker=True)
+        user = BaseUser.objects.get(pk=user.pk)
+
+        user.phone_number = '0600000000'
+        with self.assertNumQueries(1):
+            user.save()
+
+        # A changed search field still refreshes the terms
+        user.location = 'Paris'
+        user.save()
+        self.assertTrue(TaskerSearchTerm.objects.filter(
+            profile__user=user, kind=TaskerSearchTerm.LOCATION, term='paris'
+        ).exists())
+
+
+class PasswordRehashTests(TestCase):
+    """Hashes made with an outdated hasher configuration are upgraded on login"""
+
+    def _login(self, password='pass12345'):
+        return APIClient().post(
+            reverse('user-login'), {'email': 'rehash@example.com', 'password': password}, format='json'
+        )
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_iteration_change_rehashes_on_login(self):
+        user = BaseUser.objects.create_user(
+            email='rehash@example.com', password='pass12345', username='rehash', is_active=True
+        )
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher'])
+    def test_legacy_algorithm_is_replaced(self):
+        user = BaseUser.objects.create_user(
+            email='rehash@example.com', password='pass12345', username='rehash', is_active=True
+        )
+
+        with self.settings(
+            PASSWORD_HASHERS=[
+                'accounts.hashers.TunablePBKDF2PasswordHasher',
+                'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+            ],
+            PASSWORD_PBKDF2_ITERATIONS=1000,
+        ):
+            self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+
+class TokenRevocationTests(TestCase):
+    """Refresh token revocation through the in-process index and blacklist compaction"""
+
+    def setUp(self):
+        revocations.reset()
+        self.user = BaseUser.objects.create_user(
+            email='tokens@example.com', password=None, username='tokens', is_active=True
+        )
+        self.client = APIClient()
+
+    def _refresh(self, token):
+        return self.client.post(reverse('token-refresh'), {'refresh': str(token)}, format='json')
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=100)
+        keys = [f'jti-{i}' for i in range(100)]
+        for key in keys:
+            bloom.add(key)
+
+        self.assertTrue(all(key in bloom for key in keys))
+        self.assertLess(sum(f'other-{i}' in bloom for i in range(1000)), 50)
+
+    def test_unrevoked_token_skips_the_blacklist_query(self):
+        jti = RefreshToken.for_user(self.user)['jti']
+        revocations.is_revoked('warm-up')
+
+        with self.assertNumQueries(0):
+            self.assertFalse(revocations.is_revoked(jti))
+
+    def test_logged_out_token_cannot_refresh(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.assertEqual(self._refresh(refresh).status_code, status.HTTP_200_OK)
+
+        # The rotated token is blacklisted after use
+        self.assertEqual(self._refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        refresh = RefreshToken.for_user(self.user)
+        self.client.force_authenticate(self.user)
+        self.client.post(reverse('user-logout'), {'refresh': str(refresh)}, format='json')
+        self.client.force_authenticate(None)
+
+        self.assertEqual(self._refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_committed_out_of_id_order_is_picked_up(self):
+        late, early = RefreshToken.for_user(self.user), RefreshToken.for_user(self.user)
+        revocations.is_revoked('warm-up')
+
+        # Another worker's row with the higher id commits first, the lower id is still in flight.
+        # bulk_create sends no post_save, as if another process wrote them
+        outstanding = {token.jti: token for token in OutstandingToken.objects.filter(jti__in=[late['jti'], early['jti']])}
+        watermark = revocations.watermark
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(id=watermark + 2, token=outstanding[early['jti']])])
+        revocations.synced_at = 0
+        self.assertTrue(revocations.is_revoked(early['jti']))
+        self.assertIn(watermark + 1, revocations.gaps)
+
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(id=watermark + 1, token=outstanding[late['jti']])])
+        revocations.synced_at = 0
+        self.assertTrue(revocations.is_revoked(late['jti']))
+        self.assertEqual(revocations.gaps, {})
+
+    def test_sparse_high_ids_track_a_bounded_number_of_gaps(self):
+        first, second = RefreshToken.for_user(self.user), RefreshToken.for_user(self.user)
+        outstanding = {token.jti: token for token in OutstandingToken.objects.filter(jti__in=[first['jti'], second['jti']])}
+
+        # After compaction the oldest surviving row can have any id: a first build tracks no holes
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(id=2_000_000, token=outstanding[first['jti']])])
+        self.assertTrue(revocations.is_revoked(first['jti']))
+        self.assertEqual(revocations.gaps, {})
+
+        # A jump past MAX_REVOCATION_GAPS falls back to a rebuild on the next sync
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(id=4_000_000, token=outstanding[second['jti']])])
+        revocations.synced_at = 0
+        self.assertTrue(revocations.is_revoked(second['jti']))
+        self.assertEqual(revocations.gaps, {})
+        self.assertEqual(revocations.built_at, 0)
+
+        self.assertFalse(revocations.is_revoked('never-issued'))
+        self.assertEqual((revocations.watermark, revocations.gaps), (4_000_000, {}))
+        self.assertGreater(revocations.built_at, 0)
+
+    def test_compaction_removes_only_expired_tokens(self):
+        live = RefreshToken.for_user(self.user)
+        expired = RefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+
+        call_command('compact_token_blacklist', batch_size=1, stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class AsyncPublicTaskerSearchTests(PublicTaskerSearchTests):
+    """The same searches through the async public tasker endpoint"""
+
+    def _search(self, **params):
+        response = self.client.get(reverse('public-taskers-async'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(tasker['user']['email'] for tasker in response.json()['results'])
+
+
+class AdminChangelistTests(TestCase):
+    """User and tasker profile changelists cost the same queries for any page size"""
+
+    def setUp(self):
+        self.admin = BaseUser.objects.create_superuser(email='admin@example.com', password='pass12345', is_active=True)
+        self.client.force_login(self.admin)
+        category = Category.objects.create(name='Home')
+        self.services = [
+            Service.objects.create(name=f'Service {i}', description='', price='10.00', category=category)
+            for i in range(3)
+        ]
+
+    def _add_taskers(self, start, count):
+        for index in range(start, start + count):
+            tasker = BaseUser.objects.create_user(
+                email=f'tasker{index}@example.com', password=None, username=f'tasker{index}', is_tasker=True
+            )
+            tasker.taskerprofile.skills.set(self.services)
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_budget(self):
+        for name in ('admin:accounts_baseuser_changelist', 'admin:accounts_taskerprofile_changelist'):
+            with self.subTest(name):
+                self._add_taskers(0, 1)
+                few = self._queries(reverse(name))
+                self._add_taskers(100, 10)
+                self.assertEqual(self._queries(reverse(name)), few)
+                self.assertLessEqual(few, 6)
+                BaseUser.objects.filter(is_tasker=True).delete()
+
+    def test_skills_come_from_the_prefetch(self):
+        self._add_taskers(0, 2)
+        response = self.client.get(reverse('admin:accounts_taskerprofile_changelist'))
+        self.assertContains(response, 'Service 0, Service 1, Service 2', count=2)
+
+
+class ProfilePictureTests(TestCase):
+    """Thumbnails of uploaded profile pictures"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        shutil.copytree(settings.BASE_DIR / 'media' / 'profile_pictures', f'{self.media}/profile_pictures')
+        settings_override = override_settings(MEDIA_ROOT=self.media, PROFILE_PICTURE_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        _default_digest.cache_clear()
+        self.addCleanup(_default_digest.cache_clear)
+
+        self.user = BaseUser.objects.create_user(
+            email='tasker@example.com', password='pass12345', username='tasker', is_tasker=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _image(self, color='red', size=(1200, 900)):
+        output = io.BytesIO()
+        Image.new('RGB', size, color).save(output, 'JPEG')
+        return SimpleUploadedFile('me.jpg', output.getvalue(), content_type='image/jpeg')
+
+    def _upload(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('users-me'), {'profile_picture': image}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_upload_creates_content_addressed_thumbnails(self):
+        self._upload(self._image())
+
+        self.user.refresh_from_db()
+        digest = self.user.profile_picture_digest
+        self.assertEqual(len(digest), 64)
+        for size, box in (('card', (320, 320)), ('avatar', (64, 64))):
+            with Image.open(f'{self.media}/{thumbnail_name(digest, size)}') as thumbnail:
+                self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', box))
+
+        response = self.client.get(reverse('public-taskers'))
+        thumbnails = response.data['results'][0]['user']['profile_thumbnails']
+        self.assertTrue(thumbnails['card'].endswith(f'{digest}-card.webp'))
+
+        # The route only exists under DEBUG
+        response = serve_thumbnail(RequestFactory().get(thumbnails['avatar']), f'{digest[:2]}/{digest}-avatar.webp')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_same_picture_is_processed_once(self):
+        self._upload(self._image())
+        other = BaseUser.objects.create_user(email='other@example.com', password=None, username='other')
+        self.client.force_authenticate(other)
+        self._upload(self._image())
+
+        other.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(other.profile_picture_digest, self.user.profile_picture_digest)
+        thumbnails = f'{self.media}/{thumbnail_name(other.profile_picture_digest, "card")}'.rsplit('/', 1)[0]
+        self.assertEqual(len(os.listdir(thumbnails)), 2)
+
+    def test_new_picture_replaces_the_thumbnails(self):
+        self._upload(self._image())
+        first = BaseUser.objects.get(id=self.user.id).profile_picture_digest
+
+        self._upload(self._image(color='blue'))
+
+        self.assertNotIn(BaseUser.objects.get(id=self.user.id).profile_picture_digest, ('', first))
+        # Saving other fields leaves them alone
+        user = BaseUser.objects.get(id=self.user.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.save()
+        self.assertEqual(callbacks, [])
+
+    def test_default_avatar_thumbnails(self):
+        thumbnails = self.client.get(reverse('users-me')).data['profile_thumbnails']
+
+        self.assertEqual(BaseUser.objects.get(id=self.user.id).profile_picture_digest, '')
+        self.assertTrue(thumbnails['avatar'].endswith(f'{default_digest()}-avatar.webp'))
+
+    def test_default_avatar_failure_is_retried(self):
+        os.rename(f'{self.media}/profile_pictures', f'{self.media}/moved')
+        with self.assertLogs('accounts.pictures', 'ERROR'):
+            self.assertIsNone(default_digest())
+
+        os.rename(f'{self.media}/moved', f'{self.media}/profile_pictures')
+        self.assertEqual(len(default_digest()), 64)
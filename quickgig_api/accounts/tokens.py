@@ -0,0 +1,195 @@
+"""
+In-process lookup of revoked (blacklisted) refresh tokens.
+
+SimpleJWT checks every refresh token against BlacklistedToken with a query.
+RevocationIndex keeps a Bloom filter of the revoked JTIs instead, so tokens
+that were never revoked (nearly all of them) are accepted without touching the
+database; a filter hit is confirmed with the usual query.
+
+The filter is fed by accounts.signals for revocations made by this process and
+synced from the table every JWT_REVOCATION_SYNC_SECONDS for the others. A sync
+reads the ids above the highest one seen so far, plus the holes below it:
+blacklist rows can commit out of id order (PostgreSQL hands out ids when the
+row is inserted, not when it commits), so a missing id next to a recent row is
+re-read until it shows up or is JWT_REVOCATION_GAP_SECONDS old. Only ids above
+the watermark of the previous sync are tracked (a first build tracks none, the
+table may start at any id after compaction), and at most MAX_REVOCATION_GAPS of
+them: past that, the next sync rebuilds the filter instead.
+
+Staleness bound: a token revoked by another worker is refused at most
+JWT_REVOCATION_SYNC_SECONDS after the revocation commits, provided that the
+revoking transaction committed within JWT_REVOCATION_GAP_SECONDS of writing
+the row (a revocation is a single short INSERT). A slower one is picked up at
+the next rebuild, at most JWT_REVOCATION_REBUILD_SECONDS later.
+
+The filter is rebuilt from scratch every JWT_REVOCATION_REBUILD_SECONDS to drop
+expired tokens. Syncs and rebuilds read the table outside the lock, one thread
+at a time, while the other requests keep using the current filter. Set
+JWT_REVOCATION_SYNC_SECONDS to 0 to always ask the database.
+"""
+import datetime
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Missing blacklist ids re-read by every sync before falling back to a rebuild
+MAX_REVOCATION_GAPS = 1000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (false positives only, no deletes)"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationIndex:
+    """Process-wide Bloom filter of revoked refresh token JTIs, synced from BlacklistedToken"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.bloom = None
+            # Highest blacklist id seen, and the missing ids below it (id -> monotonic time first missed)
+            self.watermark = 0
+            self.gaps = {}
+            self.synced_at = 0.0
+            self.built_at = 0.0
+            # A thread is reading the table; JTIs added meanwhile, replayed into a rebuilt filter
+            self.refreshing = False
+            self.added = []
+
+    def add(self, jti):
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+            if self.refreshing:
+                self.added.append(jti)
+
+    def is_revoked(self, jti):
+        if not settings.JWT_REVOCATION_SYNC_SECONDS:
+            return self._query(jti)
+
+        self._sync()
+        bloom = self.bloom
+        if bloom is not None and jti not in bloom:
+            return False
+        # Possibly revoked (or no filter yet), the database has the final word
+        return self._query(jti)
+
+    def _query(self, jti):
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def _sync(self):
+        now = time.monotonic()
+        with self.lock:
+            if self.refreshing:
+                return
+            rebuild = self.bloom is None or now - self.built_at >= settings.JWT_REVOCATION_REBUILD_SECONDS
+            if not rebuild and now - self.synced_at < settings.JWT_REVOCATION_SYNC_SECONDS:
+                return
+            self.refreshing = True
+            self.added = []
+            # Holes are only tracked above what the previous sync had read, none on a first build
+            floor = self.watermark if self.bloom is not None else None
+            watermark, gaps = (0 if rebuild else self.watermark), dict(self.gaps)
+
+        bloom = loaded = overflow = None
+        try:
+            if rebuild:
+                bloom = BloomFilter(capacity=max(
+                    # Leave room for the revocations made until the next rebuild
+                    2 * BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).count(), 10_000
+                ))
+                queryset = BlacklistedToken.objects.all()
+            else:
+                # Bits are only ever set, so readers can share the filter while it is fed
+                bloom = self.bloom
+                queryset = BlacklistedToken.objects.filter(id__gt=min(gaps, default=watermark + 1) - 1)
+            watermark, overflow = self._load(bloom, queryset, watermark, gaps, now, floor)
+            loaded = True
+        finally:
+            with self.lock:
+                if loaded:
+                    if rebuild:
+                        for jti in self.added:
+                            bloom.add(jti)
+                        self.bloom = bloom
+                        self.built_at = now
+                    self.watermark = watermark
+                    self.gaps = {
+                        missing: seen for missing, seen in gaps.items()
+                        if now - seen < settings.JWT_REVOCATION_GAP_SECONDS
+                    }
+                    self.synced_at = now
+                    if overflow:
+                        # Too many holes to re-read on every sync, scan the whole table next time
+                        self.gaps = {}
+                        self.built_at = 0.0
+                        self.synced_at = 0.0
+                self.refreshing = False
+                self.added = []
+
+    def _load(self, bloom, queryset, watermark, gaps, now, floor):
+        """
+        Add the unexpired JTIs of queryset to bloom, tracking the id holes above
+        floor (None tracks none); returns the new watermark and whether the holes
+        went over MAX_REVOCATION_GAPS
+        """
+        wall_now = timezone.now()
+        # Only a hole below a recent row can still be an uncommitted revocation
+        recent = wall_now - datetime.timedelta(seconds=settings.JWT_REVOCATION_GAP_SECONDS)
+        overflow = False
+        rows = queryset.order_by('id').values_list('id', 'token__jti', 'token__expires_at', 'blacklisted_at')
+        for blacklisted_id, jti, expires_at, blacklisted_at in rows.iterator(chunk_size=5000):
+            if expires_at > wall_now:
+                bloom.add(jti)
+            gaps.pop(blacklisted_id, None)
+            if blacklisted_id > watermark:
+                if floor is not None and not overflow and blacklisted_at >= recent:
+                    missing = range(max(watermark, floor) + 1, blacklisted_id)
+                    if len(gaps) + len(missing) > MAX_REVOCATION_GAPS:
+                        overflow = True
+                    else:
+                        for missing_id in missing:
+                            gaps.setdefault(missing_id, now)
+                watermark = blacklisted_id
+        return watermark, overflow
+
+
+revocations = RevocationIndex()
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """Refresh token whose blacklist check goes through the in-process revocation index"""
+
+    def check_blacklist(self):
+        if revocations.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from . import async_views
 from .views import (
     UserRegistrationView,
     CustomTokenObtainPairView,
@@ -27,6 +28,7 @@ urlpatterns = [
     # Public tasker URLs (no authentication required)
     path('public/taskers/', PublicTaskerListView.as_view(), name='public-taskers'),
     path('public/taskers/<int:pk>/', TaskerDetailView.as_view(), name='public-tasker-detail'),
+    path('async/public/taskers/', async_views.public_taskers, name='public-taskers-async'),
     
     # Include router URLs
     path('', include(router.urls)),
@@ -64,9 +66,16 @@ TASKER PROFILES:
 PUBLIC ENDPOINTS (No authentication required):
 - GET /public/taskers/ - List all taskers (with filtering)
 - GET /public/taskers/{id}/ - Get specific tasker details
+- GET /async/public/taskers/ - Same as /public/taskers/, served by an async view (for ASGI)
 
 FILTERING PARAMETERS:
 - ?skills=1,2,3 - Filter taskers by skill IDs
 - ?location=nairobi - Filter taskers by location
 - ?username=johnsmith - Filter tasker by username
+  (location/username: accent and case insensitive, trigram match for 3+ characters,
+  word prefix match below that; see accounts/search.py)
+
+PAGINATION:
+- /public/taskers/ is cursor paginated ({"next", "previous", "results"})
+- ?page_size=20 - Page size (capped by API_MAX_PAGE_SIZE)
 """
\ No newline at end of file
@@ -6,9 +6,14 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from quickgig_api.db_routers import ReplicaListMixin
+from quickgig_api.pagination import TaskerPagination
 
 from .models import BaseUser, TaskerProfile
+from .search import TaskerSearch
+from .tokens import CachedBlacklistRefreshToken
 from .serializers import (
     UserRegistrationSerializer,
     CustomTokenObtainPairSerializer,
@@ -29,6 +34,23 @@ from .permissions import (
 User = get_user_model()
 
 
+def filter_taskers(queryset, query_params, fields):
+    """
+    Apply the ?skills=, ?location= and ?username= filters through the tasker search terms
+    """
+    skill_ids = None
+    skills = query_params.get('skills')
+    if skills and 'skills' in fields:
+        skill_ids = [int(x) for x in skills.split(',') if x.isdigit()]
+
+    return TaskerSearch.filter_queryset(
+        queryset,
+        skill_ids=skill_ids,
+        location=query_params.get('location') if 'location' in fields else None,
+        username=query_params.get('username') if 'username' in fields else None,
+    )
+
+
 class UserRegistrationView(generics.CreateAPIView):
     """
     View for user registration
@@ -42,10 +64,12 @@ class UserRegistrationView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
+            # The user and their outstanding token are written together
+            with transaction.atomic():
+                user = serializer.save()
 
-            # Generate tokens for the newly created user
-            refresh = RefreshToken.for_user(user)
+                # Generate tokens for the newly created user
+                refresh = RefreshToken.for_user(user)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
@@ -75,21 +99,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         response = super().post(request, *args, **kwargs)
 
         if response.status_code == 200:
-            # Get user info to add to response
-            email = request.data.get('email')
-            user = User.objects.get(email=email)
-            
-            # Add user info to the existing token response
-            response.data.update({
-                'message': 'Login successful',
-                'user': {
-                    'id': user.id,
-                    'email': user.email,
-                    'username': user.username,
-                    'is_tasker': user.is_tasker,
-                    'is_client': user.is_client,
-                }
-            })
+            # The serializer already added the authenticated user's info
+            response.data['message'] = 'Login successful'
         
         return response
 
@@ -104,7 +115,7 @@ class LogoutView(APIView):
         try:
             refresh_token = request.data.get('refresh')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = CachedBlacklistRefreshToken(refresh_token)
                 token.blacklist()
             
             return Response({
@@ -176,11 +187,9 @@ class UserViewSet(viewsets.ModelViewSet):
         
         serializer = BecomeTaskerSerializer(user, data=request.data)
         serializer.is_valid(raise_exception=True)
-        updated_user = serializer.save()
-        
-        # Get the created tasker profile (signal will create it automatically)
-        tasker_profile = user.taskerprofile
-        profile_serializer = TaskerProfileSerializer(tasker_profile)
+        user = serializer.save()
+        # Set by the onboarding pipeline, no query
+        profile_serializer = TaskerProfileSerializer(user.taskerprofile)
         
         return Response({
             'message': 'Successfully became a tasker',
@@ -214,7 +223,7 @@ class UserViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_204_NO_CONTENT)
 
 
-class TaskerProfileViewSet(viewsets.ModelViewSet):
+class TaskerProfileViewSet(ReplicaListMixin, viewsets.ModelViewSet):
     """
     ViewSet for tasker profile operations
     """
@@ -231,19 +240,7 @@ class TaskerProfileViewSet(viewsets.ModelViewSet):
         Optionally filter taskers by skills or location
         """
         queryset = TaskerProfile.objects.select_related('user').prefetch_related('skills')
-        
-        # Filter by skills
-        skills = self.request.query_params.get('skills')
-        if skills:
-            skill_ids = [int(x) for x in skills.split(',') if x.isdigit()]
-            queryset = queryset.filter(skills__id__in=skill_ids).distinct()
-        
-        # Filter by location
-        location = self.request.query_params.get('location')
-        if location:
-            queryset = queryset.filter(user__location__icontains=location.lower())
-        
-        return queryset
+        return filter_taskers(queryset, self.request.query_params, fields=('skills', 'location'))
 
     @action(detail=False, methods=['get', 'put', 'patch'], 
             permission_classes=[permissions.IsAuthenticated])
@@ -288,37 +285,21 @@ class TaskerProfileViewSet(viewsets.ModelViewSet):
 
 
 # Additional view for public tasker listing (without authentication required)
-class PublicTaskerListView(generics.ListAPIView):
+class PublicTaskerListView(ReplicaListMixin, generics.ListAPIView):
     """
     Public view to list all taskers (read-only)
     """
     queryset = TaskerProfile.objects.select_related('user').prefetch_related('skills')
     serializer_class = TaskerProfileSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = TaskerPagination
 
     def get_queryset(self):
         """
         Filter taskers by skills or location
         """
         queryset = super().get_queryset()
-        
-        # Filter by skills
-        skills = self.request.query_params.get('skills')
-        if skills:
-            skill_ids = [int(x) for x in skills.split(',') if x.isdigit()]
-            queryset = queryset.filter(skills__id__in=skill_ids).distinct()
-        
-        # Filter by location
-        location = self.request.query_params.get('location')
-        if location:
-            queryset = queryset.filter(user__location__icontains=location.lower())
-
-        # Filter by username
-        username = self.request.query_params.get('username')
-        if username:
-            queryset = queryset.filter(user__username__icontains=username.lower())
-
-        return queryset
+        return filter_taskers(queryset, self.request.query_params, fields=('skills', 'location', 'username'))
 
 
 class TaskerDetailView(generics.RetrieveAPIView):
@@ -0,0 +1,110 @@
+"""
+Admin changelists that stay fast on large tables.
+
+LargeTableAdminMixin gives a ModelAdmin:
+
+- EstimatedCountPaginator: an unfiltered changelist of a table with at
+  least ADMIN_ESTIMATED_COUNT_MIN rows takes its row count from the
+  database statistics (pg_class.reltuples, sqlite_stat1 after ANALYZE)
+  instead of an exact COUNT(*); filtered and searched lists count exactly.
+- no second COUNT(*) of the whole table for the "N total" link.
+- the media AutocompleteFilter needs.
+
+AutocompleteFilter replaces the related-object list filter, which renders
+one link per row of the related table, with the admin's select2
+autocomplete (the related model's admin must define search_fields):
+
+    list_filter = (('tasker', AutocompleteFilter),)
+"""
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+
+def estimated_count(model, using='default'):
+    """Row count of the model's table from the database statistics, or None without statistics"""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'sqlite':
+                # The first number of every index's stat is the table's row count
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 only exists once ANALYZE has run
+        return None
+
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    # reltuples is -1 for a table that was never analyzed
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_MIN:
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """List filter picking the related object with a select2 autocomplete"""
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        value = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+        chooser = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.value = value[-1] if isinstance(value, list) else value
+        if self.value is not None:
+            try:
+                self.value = field.target_field.to_python(self.value)
+            except ValidationError:
+                # Not an id: show the unfiltered list instead of failing on the lookup
+                self.value = None
+                self.used_parameters.pop(self.lookup_kwarg, None)
+        self.widget = chooser.widget.render(self.lookup_kwarg, self.value, attrs={'id': f'filter_{field_path}'})
+        # Carry the other filters over when this one is applied
+        self.hidden_params = [
+            (name, value) for name, value in request.GET.items() if name not in (self.lookup_kwarg, 'p')
+        ]
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': 'All',
+        }
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(None, None).media
@@ -0,0 +1,80 @@
+"""
+Helpers for the ASGI-native read endpoints (tasks/async_views.py, accounts/async_views.py).
+
+DRF views are synchronous, so under an ASGI server every DRF request occupies
+a worker thread for its whole duration. The async read endpoints are plain
+Django async views instead: they authenticate the JWT, paginate and query
+through the async ORM, and reuse the DRF serializers on the fetched (fully
+joined/prefetched) rows, which do not touch the database again.
+
+They return the same JSON as their DRF counterparts.
+"""
+import functools
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+User = get_user_model()
+
+
+async def authenticate(request):
+    """Async counterpart of JWTAuthentication.authenticate, returning the user or None"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+
+    token = authentication.get_validated_token(raw_token)
+    try:
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise AuthenticationFailed('Token contained no recognizable user identification')
+
+    user = await User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None or not user.is_active:
+        raise AuthenticationFailed('User not found or inactive')
+    return user
+
+
+def async_read_view(authenticated=True):
+    """
+    Turn an async function into a GET-only API view. The function receives a DRF
+    Request (for query_params) with request.user set, and returns JSON data.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                response = api_response(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED
+                )
+                response['Allow'] = 'GET, HEAD'
+                return response
+
+            try:
+                api_request = Request(request)
+                api_request.user = await authenticate(request) or AnonymousUser()
+                if authenticated and not api_request.user.is_authenticated:
+                    raise NotAuthenticated()
+                data = await view(api_request, *args, **kwargs)
+            except APIException as exc:
+                detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+                return api_response(detail, status=exc.status_code)
+            return api_response(data)
+        return wrapper
+    return decorator
+
+
+def api_response(data, status=status.HTTP_200_OK):
+    return JsonResponse(data, status=status, safe=False, encoder=DjangoJSONEncoder)
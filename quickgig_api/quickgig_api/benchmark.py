@@ -0,0 +1,89 @@
+"""
+Helpers shared by the benchmark management commands.
+"""
+import asyncio
+import threading
+import time
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, seconds, **extra):
+    """Standard result record of a benchmark scenario, latencies in seconds"""
+    return {
+        'name': name,
+        'count': len(latencies),
+        'seconds': seconds,
+        'throughput': len(latencies) / seconds if seconds else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        **extra,
+    }
+
+
+def run_concurrently(worker, total, threads):
+    """
+    Call worker(index) total times spread over threads, returning (latencies, seconds).
+    Each thread closes its database connection when done.
+    """
+    from django.db import connection
+
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def loop():
+        try:
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                began = time.perf_counter()
+                worker(index)
+                elapsed = time.perf_counter() - began
+                with lock:
+                    latencies.append(elapsed)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+async def run_concurrently_async(worker, total, concurrency):
+    """
+    Await worker(index) total times with at most concurrency in flight on the
+    current event loop, returning (latencies, seconds).
+    """
+    latencies = []
+    counter = iter(range(total))
+
+    async def loop():
+        for index in counter:
+            began = time.perf_counter()
+            await worker(index)
+            latencies.append(time.perf_counter() - began)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+def format_result(result):
+    return (
+        f"{result['name']:>24}: {result['count']} in {result['seconds']:.2f}s "
+        f"({result['throughput']:.1f}/s), p50 {result['p50_ms']:.1f}ms, p99 {result['p99_ms']:.1f}ms"
+    )
@@ -0,0 +1,59 @@
+"""
+Read-replica routing for the API listings.
+
+Only code running inside read_from_replica() reads from the 'replica'
+database; everything else, writes and reads alike, stays on 'default'.
+The listing endpoints opt in through ReplicaListMixin (class based views)
+or the read_from_replica() decorator (function views), so a request never
+reads its own writes from a lagging replica. Without a 'replica' entry in
+settings.DATABASES the router does nothing.
+"""
+import contextlib
+import contextvars
+
+from django.conf import settings
+
+REPLICA = 'replica'
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+@contextlib.contextmanager
+def read_from_replica():
+    """Route the ORM reads made in this block (or decorated function) to the replica"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is migrated through replication
+        return db != REPLICA
+
+
+class ReplicaListMixin:
+    """Serve the GET listing of a DRF view (or viewset 'list' action) from the replica"""
+
+    def dispatch(self, request, *args, **kwargs):
+        action_map = getattr(self, 'action_map', None)
+        listing = action_map.get('get') == 'list' if action_map else True
+
+        if request.method == 'GET' and listing:
+            with read_from_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,291 @@
+"""
+Per-request query and latency instrumentation.
+
+RequestMetricsMiddleware (first entry of settings.MIDDLEWARE) records for
+every request, keyed by the resolved URL name (slot-list, booking-list, ...):
+
+- the number of SQL queries and the time spent in them
+- the time spent serializing, in the outermost Serializer.data of each
+  serializer (including the queries its lazy querysets run)
+- the time spent rendering DRF responses (JSON encoding)
+- the total latency
+
+The numbers are added to the response as a Server-Timing header (when
+SERVER_TIMING_HEADER is on), aggregated per process for the Prometheus text
+endpoint (metrics_view, /api/metrics/, which needs METRICS_TOKEN outside
+DEBUG) and queries slower than
+SLOW_QUERY_THRESHOLD_MS are logged to the 'quickgig_api.sql' logger at the
+end of the request, slowest first.
+
+Queries are timed by an execute wrapper installed on every connection; it
+only records while a request is being measured, including queries the async
+ORM runs in a worker thread.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('quickgig_api.sql')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Any other method a client sends is counted as 'other', so labels stay bounded and quote-free
+HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'})
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_serializing = contextvars.ContextVar('serializing', default=False)
+
+
+class RequestTimings:
+    """What one request spent, filled in while it runs"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+        self.slow_queries = []
+        self.lock = threading.Lock()
+
+    def add_query(self, sql, seconds):
+        with self.lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            if seconds * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self.slow_queries.append((seconds, sql))
+
+    def add_serialization(self, seconds):
+        with self.lock:
+            self.serialize_seconds += seconds
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_timer(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_timer)
+
+
+def timed_data(data):
+    """Wrap the Serializer.data property to time to_representation() while a request is measured"""
+
+    def get_data(serializer):
+        timings = _current.get()
+        # Cached data, or a serializer used inside another one (already timed)
+        if timings is None or hasattr(serializer, '_data') or _serializing.get():
+            return data.fget(serializer)
+
+        token = _serializing.set(True)
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            timings.add_serialization(time.perf_counter() - started)
+            _serializing.reset(token)
+
+    get_data.timed = True
+    return property(get_data, doc=data.__doc__)
+
+
+# Serializer.data and ListSerializer.data wrap this one
+if not getattr(BaseSerializer.data.fget, 'timed', False):
+    BaseSerializer.data = timed_data(BaseSerializer.data)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Process-wide aggregates per route, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.routes = {}
+
+    def observe(self, route, method, status, timings, total):
+        with self.lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            if route not in self.routes:
+                self.routes[route] = {
+                    'latency': Histogram(DURATION_BUCKETS),
+                    'queries': Histogram(QUERY_COUNT_BUCKETS),
+                    'db_seconds': 0.0,
+                    'serialize_seconds': 0.0,
+                    'render_seconds': 0.0,
+                }
+            stats = self.routes[route]
+            stats['latency'].observe(total)
+            stats['queries'].observe(timings.queries)
+            stats['db_seconds'] += timings.db_seconds
+            stats['serialize_seconds'] += timings.serialize_seconds
+            stats['render_seconds'] += timings.render_seconds
+
+    def render(self):
+        with self.lock:
+            lines = [
+                '# HELP quickgig_http_requests_total Requests by route, method and status.',
+                '# TYPE quickgig_http_requests_total counter',
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'quickgig_http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}'
+                )
+
+            histograms = (
+                ('quickgig_http_request_duration_seconds', 'latency', 'Total request latency.'),
+                ('quickgig_db_queries_per_request', 'queries', 'SQL queries per request.'),
+            )
+            for name, field, description in histograms:
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+                for route, stats in sorted(self.routes.items()):
+                    lines += _histogram_lines(name, route, stats[field])
+
+            counters = (
+                ('quickgig_db_duration_seconds_total', 'db_seconds', 'Time spent in SQL queries.'),
+                ('quickgig_serialization_seconds_total', 'serialize_seconds', 'Time spent serializing.'),
+                ('quickgig_render_seconds_total', 'render_seconds', 'Time spent rendering responses.'),
+            )
+            for name, field, description in counters:
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+                for route, stats in sorted(self.routes.items()):
+                    lines.append(f'{name}{{route="{route}"}} {stats[field]:.6f}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name, route, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+    cumulative += histogram.counts[-1]
+    lines += [
+        f'{name}_bucket{{route="{route}",le="+Inf"}} {cumulative}',
+        f'{name}_sum{{route="{route}"}} {histogram.sum:.6f}',
+        f'{name}_count{{route="{route}"}} {cumulative}',
+    ]
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    """Measure queries, DB time, serialization and render time and latency of every request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = _current.get()
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = _current.get()
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def start(self, request):
+        # Connections opened before this module was imported have no timer yet
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+        return _current.set(RequestTimings())
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, time the rendering
+        timings = _current.get()
+        if timings is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timings.render_seconds += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name or match.view_name) if match else 'unresolved'
+
+        method = request.method if request.method in HTTP_METHODS else 'other'
+        registry.observe(route, method, response.status_code, timings, total)
+
+        if timings.slow_queries:
+            slowest = sorted(timings.slow_queries, reverse=True)[:settings.SLOW_QUERY_LOG_LIMIT]
+            for seconds, sql in slowest:
+                logger.warning("Slow query on %s (%.1fms): %s", route, seconds * 1000, sql)
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = (
+                f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.queries} queries", '
+                f'serialize;dur={timings.serialize_seconds * 1000:.1f}, '
+                f'render;dur={timings.render_seconds * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, protected by settings.METRICS_TOKEN (open without one only under DEBUG)"""
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif request.headers.get('Authorization') != f'Bearer {settings.METRICS_TOKEN}':
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,186 @@
+"""
+Keyset (cursor) pagination for the API listings.
+
+Pages are fetched with a `WHERE (a, b, id) > (last_a, last_b, last_id)` style
+filter on the listing's natural ordering instead of OFFSET, so the cost of a
+page does not grow with how deep into the listing the client is.
+
+Query parameters
+----------------
+- ?cursor=<opaque>   Position returned in the `next`/`previous` links.
+- ?page_size=<n>     Page size, capped by settings.API_MAX_PAGE_SIZE.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a composite ordering, ending with a unique field"""
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = settings.API_PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+            if requested > 0:
+                page_size = requested
+        except (KeyError, ValueError):
+            pass
+        return min(page_size, settings.API_MAX_PAGE_SIZE)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views, fetching the page through the async ORM"""
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([obj async for obj in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.position, self.reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*[f'-{field}' if self.reverse else field for field in self.ordering])
+        if self.position is not None:
+            position = self.parse_position(queryset.model, self.position)
+            queryset = queryset.filter(self.get_keyset_filter(position, self.reverse))
+
+        # Fetch one extra row to know whether another page exists
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.page = results
+        return results
+
+    def get_keyset_filter(self, position, reverse):
+        """Lexicographic (a, b, c) > (x, y, z) comparison built from Q objects"""
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def parse_position(self, model, position):
+        """Convert the cursor's values with their ordering fields, a tampered cursor is a 404"""
+        values = []
+        for path, value in zip(self.ordering, position):
+            opts = model._meta
+            for name in path.split('__'):
+                field = opts.get_field(name)
+                if field.is_relation:
+                    opts = field.related_model._meta
+            try:
+                if not isinstance(value, str):
+                    raise TypeError(value)
+                values.append(field.to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_position(self, instance):
+        values = []
+        for field in self.ordering:
+            value = instance
+            for attr in field.split('__'):
+                value = getattr(value, attr)
+            values.append(str(value))
+        return values
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position = data['p']
+            reverse = bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(data.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SlotPagination(KeysetPagination):
+    ordering = ('date', 'start_time', 'id')
+
+
+class AvailabilitySearchPagination(KeysetPagination):
+    # Tasker first, so each tasker's slots stay together for grouping
+    ordering = ('tasker_id', 'date', 'start_time', 'id')
+
+
+class BookingPagination(KeysetPagination):
+    ordering = ('availability_slot__date', 'availability_slot__start_time', 'id')
+
+
+class TaskerPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class ServicePagination(KeysetPagination):
+    # Service's own ordering (by category name), with ties broken on ids
+    ordering = ('category__name', 'category_id', 'id')
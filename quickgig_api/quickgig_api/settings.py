@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -58,6 +61,37 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Keyset pagination (quickgig_api.pagination)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# How BookingService.create_booking claims a slot: 'optimistic' or 'locking'
+BOOKING_CONCURRENCY = 'optimistic'
+
+# Rows fetched (and streamed) at a time by the CSV/NDJSON booking exports
+BOOKING_EXPORT_CHUNK_SIZE = 2000
+
+# Most bookings one bulk booking or bulk cancel request may carry
+BOOKING_BULK_MAX_ITEMS = 100
+
+# Slots dated more than ARCHIVE_AFTER_DAYS ago, with their bookings once those
+# are completed or cancelled, are moved to the archive tables ARCHIVE_BATCH_SIZE
+# slots per transaction (tasks.archive, `manage.py archive_bookings`)
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_BATCH_SIZE = 1000
+
+# Unfiltered admin changelists of tables at least this large show the
+# database's row estimate instead of running COUNT(*) (quickgig_api.admin_tools)
+ADMIN_ESTIMATED_COUNT_MIN = 10_000
+
+# Profile picture thumbnails (accounts.pictures): size name -> (width, height)
+PROFILE_PICTURE_SIZES = {'card': (320, 320), 'avatar': (64, 64)}
+# Threads creating thumbnails after an upload, 0 creates them during the request
+PROFILE_PICTURE_WORKERS = 2
+# Thumbnail names change with their content, so they can be cached for good
+# (the web server should send the same header for MEDIA_URL/thumbnails/)
+THUMBNAIL_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -65,9 +99,21 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.CachedTokenRefreshSerializer',
 }
 
+# Revoked refresh tokens are looked up in an in-process Bloom filter (accounts.tokens).
+# Revocations made by other workers are picked up within JWT_REVOCATION_SYNC_SECONDS
+# of their commit, unless their transaction took over JWT_REVOCATION_GAP_SECONDS to
+# commit; those wait for the next rebuild (JWT_REVOCATION_REBUILD_SECONDS).
+# 0 disables the filter and checks the blacklist table on every refresh.
+JWT_REVOCATION_SYNC_SECONDS = 5
+JWT_REVOCATION_GAP_SECONDS = 60
+JWT_REVOCATION_REBUILD_SECONDS = 60 * 60
+
 MIDDLEWARE = [
+    # Outermost, so its latency covers the other middleware too
+    'quickgig_api.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -78,6 +124,29 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request instrumentation (quickgig_api.metrics)
+# Per-route query counts, DB/serialization/render time and latency are served in
+# the Prometheus text format at /api/metrics/ (Bearer METRICS_TOKEN; without a
+# token the endpoint is only open under DEBUG) and, per response, in a
+# Server-Timing header (by default only under DEBUG, SERVER_TIMING_HEADER=1
+# turns it on). Queries slower than SLOW_QUERY_THRESHOLD_MS are logged to
+# 'quickgig_api.sql', at most SLOW_QUERY_LOG_LIMIT per request.
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', '1' if DEBUG else '0') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+SLOW_QUERY_LOG_LIMIT = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'quickgig_api.sql': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
 ROOT_URLCONF = 'quickgig_api.urls'
 
 CORS_ALLOWED_ORIGINS = [
@@ -87,7 +156,7 @@ CORS_ALLOWED_ORIGINS = [
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -104,14 +173,96 @@ WSGI_APPLICATION = 'quickgig_api.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# SQLite by default. DATABASE_ENGINE=postgresql (pip install "psycopg[binary,pool]")
+# reads DATABASE_NAME, DATABASE_USER, DATABASE_PASSWORD, DATABASE_HOST and
+# DATABASE_PORT. Connections are kept open for DATABASE_CONN_MAX_AGE seconds and
+# checked before reuse; DATABASE_POOL_MAX_SIZE > 0 switches to a psycopg pool
+# per worker process instead. DATABASE_REPLICA_HOST adds a read replica that
+# serves the GET listings (quickgig_api.db_routers).
+
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DATABASE_NAME', 'quickgig'),
+            'USER': os.environ.get('DATABASE_USER', 'quickgig'),
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
+            'PORT': os.environ.get('DATABASE_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+
+    DATABASE_POOL_MAX_SIZE = int(os.environ.get('DATABASE_POOL_MAX_SIZE', 0))
+    if DATABASE_POOL_MAX_SIZE:
+        # The pool keeps the connections, Django must not hold on to them itself
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': DATABASE_POOL_MAX_SIZE,
+            'timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+        }
+
+    if os.environ.get('DATABASE_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'OPTIONS': {**DATABASES['default']['OPTIONS']},
+            'HOST': os.environ['DATABASE_REPLICA_HOST'],
+            'PORT': os.environ.get('DATABASE_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+elif DATABASE_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DATABASE_ENGINE must be 'sqlite' or 'postgresql', not {DATABASE_ENGINE!r}")
+
+DATABASE_ROUTERS = ['quickgig_api.db_routers.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND=locmem (default), redis (pip install redis, CACHE_LOCATION like
+# redis://localhost:6379/0) or memcached (pip install pymemcache, CACHE_LOCATION
+# like localhost:11211). The catalog and heatmap caches are invalidated by the
+# worker handling the write, so the other workers only see that through a shared
+# backend: locmem is per process and refused (services.E001) when WEB_CONCURRENCY,
+# the worker count gunicorn and uvicorn read, is above 1.
 
-DATABASES = {
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'quickgig'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://localhost:6379/0'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', 'localhost:11211'),
+}
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}, not {CACHE_BACKEND!r}")
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'quickgig'),
     }
 }
 
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Seconds a rendered catalog page (services.cache) stays cached for a catalog version
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a tasker's month of heatmap counts (tasks.heatmap) stays cached; writes invalidate it sooner
+HEATMAP_CACHE_TIMEOUT = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +283,39 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# PASSWORD_HASHER picks the hasher for new hashes: 'pbkdf2' (iterations from
+# PASSWORD_PBKDF2_ITERATIONS), 'argon2' (pip install django[argon2]) or
+# 'bcrypt' (pip install django[bcrypt]). The others stay listed so existing
+# hashes still verify; they are rehashed with the preferred one on next login,
+# which is why PASSWORD_PBKDF2_ITERATIONS may not go below Django's default.
+
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'accounts.hashers.TunablePBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+if PASSWORD_HASHER not in PASSWORD_HASHER_CHOICES:
+    raise ImproperlyConfigured(
+        f"PASSWORD_HASHER must be one of {', '.join(PASSWORD_HASHER_CHOICES)}, not {PASSWORD_HASHER!r}"
+    )
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations))
+if PASSWORD_PBKDF2_ITERATIONS < PBKDF2PasswordHasher.iterations:
+    # A typo would silently weaken every hash as users log in
+    raise ImproperlyConfigured(
+        f"PASSWORD_PBKDF2_ITERATIONS must be at least {PBKDF2PasswordHasher.iterations}, "
+        f"not {PASSWORD_PBKDF2_ITERATIONS}"
+    )
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
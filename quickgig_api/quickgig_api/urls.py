@@ -15,18 +15,29 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from accounts.pictures import THUMBNAIL_DIR, serve_thumbnail
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
     path('api/services/', include('services.urls')),
     path('api/tasks/', include('tasks.urls')),
+    path('api/metrics/', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
+    # In production the web server serves MEDIA_ROOT, with THUMBNAIL_CACHE_CONTROL on thumbnails/
+    urlpatterns += [
+        re_path(
+            rf"^{settings.MEDIA_URL.lstrip('/')}{THUMBNAIL_DIR}/(?P<path>.+)$", serve_thumbnail,
+            name='profile-thumbnail'
+        ),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 
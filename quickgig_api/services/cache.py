@@ -0,0 +1,74 @@
+"""
+Versioned response cache for the public service catalog.
+
+The catalog shares a single version stamp. Saving or deleting a Category or a
+Service (services.signals) bumps it, which orphans every cached response at
+once. The version doubles as ETag and its creation time as Last-Modified, so
+conditional requests are answered with a 304 before any query runs.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'services:catalog:version'
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Several workers need a shared cache, or they keep serving what another one invalidated"""
+    if settings.WEB_CONCURRENCY > 1 and isinstance(caches['default'], LocMemCache):
+        return [Error(
+            f"The local-memory cache is per process and WEB_CONCURRENCY is {settings.WEB_CONCURRENCY}.",
+            hint="Set CACHE_BACKEND to redis or memcached (and CACHE_LOCATION).",
+            id='services.E001',
+        )]
+    return []
+
+
+def get_catalog_version():
+    """Get the current (version, last_modified) of the catalog"""
+    state = cache.get(CATALOG_VERSION_KEY)
+    if state is None:
+        # Nothing known about the catalog, start a fresh version
+        cache.add(CATALOG_VERSION_KEY, (uuid.uuid4().hex, int(time.time())), None)
+        state = cache.get(CATALOG_VERSION_KEY)
+    return state
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, (uuid.uuid4().hex, int(time.time())), None)
+
+
+class CatalogCacheMixin:
+    """Serve list() from the versioned catalog cache with ETag/Last-Modified validation"""
+
+    def list(self, request, *args, **kwargs):
+        version, last_modified = get_catalog_version()
+        etag = quote_etag(version)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            response = not_modified
+        else:
+            # The renderer is part of the key, the browsable API and JSON differ. So are the scheme
+            # and host: next/previous links are absolute. Hashed to fit memcached's key limit
+            url = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+            key = f'services:catalog:{version}:{request.accepted_renderer.format}:{url}'
+            data = cache.get(key)
+            if data is None:
+                data = super().list(request, *args, **kwargs).data
+                cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+            response = Response(data)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'public, no-cache'
+        return response
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump_catalog_version
+from .models import Category, Service
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Service)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    """Any change to the catalog invalidates every cached catalog response"""
+    bump_catalog_version()
@@ -1,3 +1,91 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .cache import check_shared_cache
+from .models import Category, Service
+
+
+class CatalogCacheTests(TestCase):
+    """Versioned response cache for the public catalog endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Home')
+        self.service = Service.objects.create(
+            name='Cleaning', description='', price='10.00', category=self.category
+        )
+        self.client = APIClient()
+
+    def test_repeat_requests_skip_the_database(self):
+        for name in ('categories', 'services'):
+            first = self.client.get(reverse(name))
+
+            with self.assertNumQueries(0):
+                second = self.client.get(reverse(name))
+
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_page_links_follow_the_request_host(self):
+        Service.objects.create(name='Ironing', description='', price='15.00', category=self.category)
+        url = reverse('services') + '?page_size=1'
+
+        with self.settings(ALLOWED_HOSTS=['api.example.com', 'internal']):
+            self.client.get(url, HTTP_HOST='api.example.com', secure=True)
+            response = self.client.get(url, HTTP_HOST='internal')
+
+        self.assertTrue(response.data['next'].startswith('http://internal/'))
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(reverse('services'))['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('services'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_returns_not_modified(self):
+        last_modified = self.client.get(reverse('categories'))['Last-Modified']
+
+        response = self.client.get(reverse('categories'), HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_saves_and_deletes_invalidate(self):
+        etag = self.client.get(reverse('services'))['ETag']
+
+        self.service.name = 'Deep cleaning'
+        self.service.save()
+        response = self.client.get(reverse('services'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['name'], 'Deep cleaning')
+
+        self.category.delete()
+        response = self.client.get(reverse('services'), HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_services_are_paged_in_category_name_order(self):
+        garden = Category.objects.create(name='Garden')
+        Service.objects.create(name='Mowing', description='', price='20.00', category=garden)
+        Service.objects.create(name='Ironing', description='', price='15.00', category=self.category)
+
+        names = []
+        url = reverse('services') + '?page_size=1'
+        while url:
+            response = self.client.get(url)
+            names.extend(service['name'] for service in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(names, ['Mowing', 'Cleaning', 'Ironing'])
+
+    def test_several_workers_need_a_shared_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
+        with override_settings(WEB_CONCURRENCY=4):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['services.E001'])
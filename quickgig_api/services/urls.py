@@ -24,5 +24,9 @@ Notes
 -----
 - Only admin users can perform write operations (POST, PUT, PATCH, DELETE) if those endpoints are added.
 - Currently, only listing (GET) is available for both categories and services.
+- The service listing is cursor paginated ({"next", "previous", "results"}); use ?page_size=<n>.
+- Both listings are served from a versioned cache (services/cache.py) and send ETag and
+  Last-Modified headers; If-None-Match / If-Modified-Since requests get a 304.
+  Saving or deleting a Category or Service (API or admin) invalidates the cache.
 - Permissions are enforced so that anyone can view, but only admins can modify (if implemented).
 """
\ No newline at end of file
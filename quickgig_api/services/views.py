@@ -1,8 +1,10 @@
 from rest_framework import generics, permissions
+from quickgig_api.pagination import ServicePagination
+from .cache import CatalogCacheMixin
 from .models import Service, Category
 from .serializers import CategorySerializer, ServiceSerializer
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CatalogCacheMixin, generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     # Allowing only admins to write
@@ -11,9 +13,10 @@ class CategoryListView(generics.ListAPIView):
             return [permissions.AllowAny()]
         return [permissions.IsAdminUser()]
 
-class ServiceListView(generics.ListAPIView):
-    queryset = Service.objects.all()
+class ServiceListView(CatalogCacheMixin, generics.ListAPIView):
+    queryset = Service.objects.select_related('category')
     serializer_class = ServiceSerializer
+    pagination_class = ServicePagination
     # Allowing only admins to write
     def get_permissions(self):
         if self.request.method in permissions.SAFE_METHODS:
@@ -1,19 +1,28 @@
 from django.contrib import admin
-from .models import AvailabilitySlot, Booking
+from quickgig_api.admin_tools import AutocompleteFilter, LargeTableAdminMixin
+from .exports import stream_bookings
+from .models import ArchivedAvailabilitySlot, ArchivedBooking, AvailabilitySlot, Booking
 
 @admin.register(AvailabilitySlot)
-class AvailabilitySlotAdmin(admin.ModelAdmin):
+class AvailabilitySlotAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('tasker', 'date', 'start_time', 'end_time', 'is_booked', 'id')
-    list_filter = ('date', 'is_booked', 'tasker')
+    list_filter = ('date', 'is_booked', ('tasker', AutocompleteFilter))
+    list_select_related = ('tasker',)
+    autocomplete_fields = ('tasker',)
     search_fields = ('tasker__username', 'tasker__email')
     ordering = ('date', 'start_time')
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('client', 'tasker', 'task', 'date', 'start_time', 'status')
-    list_filter = ('status', 'availability_slot__date', 'task')
+    list_filter = (
+        'status', 'availability_slot__date', 'task', ('tasker', AutocompleteFilter), ('client', AutocompleteFilter)
+    )
+    list_select_related = ('client', 'tasker', 'task', 'availability_slot')
+    autocomplete_fields = ('client', 'tasker', 'availability_slot')
     search_fields = ('client__username', 'tasker__username', 'task__name')
     ordering = ('-created_at',)
+    actions = ['export_csv', 'export_ndjson']
     
     def date(self, obj):
         return obj.availability_slot.date
@@ -22,3 +31,45 @@ class BookingAdmin(admin.ModelAdmin):
     def start_time(self, obj):
         return obj.availability_slot.start_time
     start_time.short_description = 'Start Time'
+
+    @admin.action(description='Export selected bookings as CSV')
+    def export_csv(self, request, queryset):
+        return stream_bookings([queryset], 'csv')
+
+    @admin.action(description='Export selected bookings as NDJSON')
+    def export_ndjson(self, request, queryset):
+        return stream_bookings([queryset], 'ndjson')
+
+
+class ArchiveAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """The archive is only written by tasks.archive"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedAvailabilitySlot)
+class ArchivedAvailabilitySlotAdmin(ArchiveAdmin):
+    list_display = ('tasker', 'date', 'start_time', 'end_time', 'is_booked', 'archived_at')
+    list_filter = (('tasker', AutocompleteFilter),)
+    list_select_related = ('tasker',)
+    search_fields = ('tasker__username', 'tasker__email')
+    # Primary key order, the archive has no index for the others
+    ordering = ('-id',)
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(ArchiveAdmin):
+    list_display = ('client', 'tasker', 'task', 'date', 'status', 'archived_at')
+    list_filter = ('status', ('tasker', AutocompleteFilter), ('client', AutocompleteFilter))
+    list_select_related = ('client', 'tasker', 'task', 'availability_slot')
+    search_fields = ('client__username', 'tasker__username', 'task__name')
+    ordering = ('-id',)
+
+    def date(self, obj):
+        return obj.availability_slot.date
+    date.short_description = 'Date'
@@ -0,0 +1,128 @@
+"""
+Archival of expired availability slots and finished bookings.
+
+Slots dated before the cut-off (ARCHIVE_AFTER_DAYS ago) move to
+ArchivedAvailabilitySlot, together with their booking when it is completed or
+cancelled; a past slot whose booking is still confirmed or in progress stays
+where it is until the booking is closed. Rows keep their ids and columns, so
+the history endpoints serialize them like the live ones.
+
+Each batch of ARCHIVE_BATCH_SIZE slots is one short transaction: the rows are
+copied with INSERT ... SELECT (no round trip through Python) and deleted with
+DELETE ... WHERE id IN (SELECT ...) on the same conditions, both on the
+connection the router picks for writing slots. If a booking changed status in
+between, the counts differ and the batch is rolled back to be picked up again.
+
+archive_expired() is the scheduler hook (cron runs `manage.py archive_bookings`,
+a task queue can call the function directly).
+"""
+import datetime
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+
+from .heatmap import invalidate_heatmaps
+from .models import ArchivedAvailabilitySlot, ArchivedBooking, AvailabilitySlot, Booking
+
+FINISHED_STATUSES = ('completed', 'cancelled')
+
+
+def archive_cutoff(days=None):
+    """Slots dated before this day are archived"""
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    return timezone.now().date() - datetime.timedelta(days=days)
+
+
+def archivable_slots(cutoff):
+    return AvailabilitySlot.objects.filter(date__lt=cutoff).filter(
+        models.Q(booking__isnull=True) | models.Q(booking__status__in=FINISHED_STATUSES)
+    )
+
+
+def copy_rows(connection, queryset, archive_model, archived_at):
+    """INSERT ... SELECT the rows of queryset into archive_model, returning how many were copied"""
+    fields = [field.attname for field in queryset.model._meta.concrete_fields]
+    select = queryset.order_by().annotate(
+        archived_at_value=models.Value(archived_at, output_field=models.DateTimeField())
+    ).values_list(*fields, 'archived_at_value')
+    sql, params = select.query.get_compiler(connection=connection).as_sql()
+
+    quote = connection.ops.quote_name
+    columns = [archive_model._meta.get_field(name).column for name in fields + ['archived_at']]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(archive_model._meta.db_table)} ({", ".join(map(quote, columns))}) {sql}',
+            params
+        )
+        return cursor.rowcount
+
+
+def delete_rows(connection, queryset):
+    """DELETE the rows of queryset by id, without the ORM's collector, returning how many were deleted"""
+    sql, params = queryset.order_by().values('pk').query.get_compiler(connection=connection).as_sql()
+
+    quote = connection.ops.quote_name
+    meta = queryset.model._meta
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {quote(meta.db_table)} WHERE {quote(meta.pk.column)} IN ({sql})', params)
+        return cursor.rowcount
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Archive up to batch_size of the oldest archivable slots, returning the
+    (slots, bookings) archived, or None when concurrent changes rolled it back
+    """
+    now = timezone.now()
+    # Archive tables live next to the live ones, on the connection that writes slots
+    using = router.db_for_write(AvailabilitySlot)
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        selected = list(
+            archivable_slots(cutoff).using(using).order_by('date', 'start_time', 'id')
+            .values_list('id', 'tasker_id')[:batch_size]
+        )
+        if not selected:
+            return 0, 0
+        slot_ids = [slot_id for slot_id, _ in selected]
+
+        bookings = Booking.objects.using(using).filter(
+            availability_slot_id__in=slot_ids, status__in=FINISHED_STATUSES
+        )
+        slots = AvailabilitySlot.objects.using(using).filter(id__in=slot_ids)
+        copy_rows(connection, slots, ArchivedAvailabilitySlot, now)
+        copied_bookings = copy_rows(connection, bookings, ArchivedBooking, now)
+
+        # Plain DELETEs: the ORM's cascade would take along a booking made meanwhile
+        deleted_bookings = delete_rows(connection, bookings)
+        # A slot that still has a booking now got one (or a status change) meanwhile
+        deleted_slots = delete_rows(connection, slots.filter(booking__isnull=True))
+        if deleted_bookings != copied_bookings or deleted_slots != len(slot_ids):
+            transaction.set_rollback(True, using=using)
+            return None
+        invalidate_heatmaps((tasker_id for _, tasker_id in selected), using=using)
+    return deleted_slots, deleted_bookings
+
+
+def archive_expired(cutoff=None, batch_size=None, max_retries=3):
+    """Archive every expired slot and finished booking, returning the (slots, bookings) totals"""
+    cutoff = cutoff or archive_cutoff()
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+
+    slots = bookings = 0
+    retries = 0
+    while True:
+        archived = archive_batch(cutoff, batch_size)
+        if archived is None:
+            # Rows changed under the batch: the next selection sees their new state
+            retries += 1
+            if retries > max_retries:
+                break
+            continue
+        if not archived[0]:
+            break
+        slots += archived[0]
+        bookings += archived[1]
+    return slots, bookings
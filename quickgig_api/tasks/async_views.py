@@ -0,0 +1,41 @@
+"""
+ASGI-native versions of the read-heavy task endpoints (see quickgig_api/asyncapi.py).
+"""
+from quickgig_api.asyncapi import async_read_view
+from quickgig_api.db_routers import read_from_replica
+from quickgig_api.pagination import BookingPagination, SlotPagination
+from .models import AvailabilitySlot, BookingService
+from .serializers import AvailabilitySlotSerializer, BookingSerializer
+
+
+@async_read_view(authenticated=False)
+async def slot_list(request):
+    """Async AvailabilitySlotListCreateView listing"""
+    queryset = AvailabilitySlot.objects.select_related('tasker')
+    tasker_id = request.query_params.get("tasker")
+
+    if tasker_id:
+        queryset = queryset.filter(tasker_id=tasker_id)
+
+    paginator = SlotPagination()
+    with read_from_replica():
+        page = await paginator.apaginate_queryset(queryset, request)
+    return paginator.get_paginated_data(AvailabilitySlotSerializer(page, many=True).data)
+
+
+@async_read_view()
+async def client_bookings(request):
+    """Async client_bookings"""
+    paginator = BookingPagination()
+    with read_from_replica():
+        page = await paginator.apaginate_queryset(BookingService.get_client_bookings(request.user), request)
+    return paginator.get_paginated_data(BookingSerializer(page, many=True).data)
+
+
+@async_read_view()
+async def tasker_bookings(request):
+    """Async tasker_bookings"""
+    paginator = BookingPagination()
+    with read_from_replica():
+        page = await paginator.apaginate_queryset(BookingService.get_tasker_bookings(request.user), request)
+    return paginator.get_paginated_data(BookingSerializer(page, many=True).data)
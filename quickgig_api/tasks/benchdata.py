@@ -0,0 +1,347 @@
+"""
+Synthetic, reproducible data for benchmarks and capacity planning.
+
+DataGenerator streams the whole BaseUser/TaskerProfile/Service/AvailabilitySlot/
+Booking graph into the database without going through the ORM per row: rows are
+generated as tuples, ids are assigned up front so foreign keys need no round
+trips, every user shares one precomputed password hash and rows go out in
+batched inserts (COPY on PostgreSQL). The same seed always produces the same
+data, at any scale.
+
+Everything created for a run is tagged: users get @bench-<tag>.local emails and
+services hang off a "bench-<tag>" category, so load_benchmark_data(tag) can
+reuse a generated data set for bench_api and delete_benchmark_data(tag)
+removes it again. Generate into an otherwise idle database, since ids are
+allocated from the current maximum.
+"""
+import contextlib
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import TaskerProfile, TaskerSearchTerm
+from accounts.pictures import DEFAULT_PICTURE
+from accounts.search import build_terms
+from services.models import Category, Service
+from .models import AvailabilitySlot, Booking
+
+User = get_user_model()
+
+FIRST_NAMES = ['Amina', 'Brian', 'Cynthia', 'David', 'Esther', 'Felix', 'Grace', 'Hassan', 'Irene', 'James']
+LAST_NAMES = ['Wanjiru', 'Otieno', 'Kamau', 'Mutua', 'Achieng', 'Kiprono', 'Njeri', 'Omondi', 'Chebet', 'Barasa']
+LOCATIONS = ['Nairobi West', 'Nairobi CBD', 'Westlands', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika']
+SERVICE_NAMES = ['Cleaning', 'Plumbing', 'Electrical', 'Moving', 'Painting', 'Gardening', 'Laundry', 'Carpentry']
+
+DEFAULT_PASSWORD = 'bench-password'
+FIRST_SLOT_HOUR = 6
+MAX_SLOTS_PER_DAY = 24 - FIRST_SLOT_HOUR
+# Free slot ids kept on BenchmarkData for booking scenarios
+FREE_SLOTS_KEPT = 10_000
+
+
+class BenchmarkData:
+    """Ids of a generated data set"""
+
+    def __init__(self, tag, password=DEFAULT_PASSWORD):
+        self.tag = tag
+        self.password = password
+        self.client_ids = []
+        self.tasker_ids = []
+        self.service_ids = []
+        self.free_slot_ids = []
+        # tasker id -> ids of the services they offer
+        self.skills = {}
+        # table -> rows written, filled in by DataGenerator
+        self.rows = {}
+        self.seconds = 0.0
+
+    def email(self, role, index):
+        return f'{role}{index}@bench-{self.tag}.local'
+
+
+class TableWriter:
+    """Buffer row tuples for one table and write them in batches, after the rows they reference"""
+
+    def __init__(self, model, fields, batch_size, parent=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.parent = parent
+        self.rows = []
+        self.count = 0
+
+        quote = connection.ops.quote_name
+        self.table = quote(model._meta.db_table)
+        self.columns = ', '.join(quote(model._meta.get_field(field).column) for field in fields)
+        self.placeholders = ', '.join(['%s'] * len(fields))
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.parent is not None:
+            self.parent.flush()
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                with cursor.copy(f'COPY {self.table} ({self.columns}) FROM STDIN') as copy:
+                    for row in self.rows:
+                        copy.write_row(row)
+            else:
+                cursor.executemany(
+                    f'INSERT INTO {self.table} ({self.columns}) VALUES ({self.placeholders})', self.rows
+                )
+        self.count += len(self.rows)
+        self.rows = []
+
+
+class DataGenerator:
+    """Stream a deterministic data set of the requested size into the database"""
+
+    def __init__(self, tag, seed=0, password=DEFAULT_PASSWORD, batch_size=10_000, start_date=None):
+        self.tag = tag
+        self.seed = seed
+        self.password = password
+        self.batch_size = batch_size
+        self.start_date = start_date or timezone.now().date() + datetime.timedelta(days=1)
+
+        ops = connection.ops
+        self.now = ops.adapt_datetimefield_value(timezone.now())
+        self.today = timezone.now().date()
+        self.times = [
+            (ops.adapt_timefield_value(datetime.time(hour, 0)), ops.adapt_timefield_value(datetime.time(hour, 45)))
+            for hour in range(FIRST_SLOT_HOUR, 24)
+        ]
+
+    def rng(self, table):
+        # One stream per table, so changing one table's size leaves the others alone
+        return random.Random(f'{self.seed}:{table}')
+
+    def writer(self, model, fields, parent=None):
+        return TableWriter(model, fields, self.batch_size, parent)
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def generate(self, clients=200, taskers=50, services=8, skills_per_tasker=3, days=14, slots_per_day=8,
+                 bookings=500):
+        """Write the data set, returning its BenchmarkData"""
+        started = time.perf_counter()
+        data = BenchmarkData(self.tag, self.password)
+        slots_per_day = min(slots_per_day, MAX_SLOTS_PER_DAY)
+
+        category = Category.objects.create(name=f'bench-{self.tag}')
+        data.service_ids = [service.id for service in Service.objects.bulk_create([
+            Service(name=f'{SERVICE_NAMES[i % len(SERVICE_NAMES)]} {i}', description='', price=10 + i, category=category)
+            for i in range(services)
+        ])]
+
+        first_user = self.next_id(User)
+        data.client_ids = list(range(first_user, first_user + clients))
+        data.tasker_ids = list(range(first_user + clients, first_user + clients + taskers))
+
+        with self.bulk_load_settings():
+            self.write_users(data, first_user)
+            self.write_taskers(data, skills_per_tasker)
+            self.write_slots_and_bookings(data, days, slots_per_day, bookings)
+        self.reset_sequences()
+
+        data.seconds = time.perf_counter() - started
+        return data
+
+    @contextlib.contextmanager
+    def bulk_load_settings(self):
+        """
+        On SQLite, keep index pages in a large cache and skip the fsync per batch
+        commit while loading: an OS crash mid-load can corrupt the file, which is
+        fine for a generated data set but not for a database that matters.
+        Inside an outer transaction there are no per-batch commits to speed up.
+        """
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            yield
+            return
+
+        with connection.cursor() as cursor:
+            previous = {
+                pragma: cursor.execute(f'PRAGMA {pragma}').fetchone()[0] for pragma in ('cache_size', 'synchronous')
+            }
+            cursor.execute('PRAGMA cache_size = -262144')
+            cursor.execute('PRAGMA synchronous = OFF')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                for pragma, value in previous.items():
+                    cursor.execute(f'PRAGMA {pragma} = {int(value)}')
+
+    def write_users(self, data, first_user):
+        rng = self.rng('users')
+        password_hash = make_password(self.password)
+        users = self.writer(User, [
+            'id', 'password', 'is_superuser', 'email', 'username', 'location', 'phone_number',
+            'profile_picture', 'profile_picture_digest', 'is_client', 'is_tasker', 'is_active', 'is_staff',
+        ])
+        # Kept for the tasker search terms
+        self.tasker_names = []
+
+        for user_id in data.client_ids + data.tasker_ids:
+            is_tasker = user_id >= first_user + len(data.client_ids)
+            index = user_id - (data.tasker_ids[0] if is_tasker else first_user)
+            username = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+            location = rng.choice(LOCATIONS).lower()
+            users.add((
+                user_id, password_hash, False, data.email('tasker' if is_tasker else 'client', index),
+                username, location, '', DEFAULT_PICTURE, '', True, is_tasker, True, False,
+            ))
+            if is_tasker:
+                self.tasker_names.append((username, location))
+        users.flush()
+        data.rows['users'] = users.count
+
+    def write_taskers(self, data, skills_per_tasker):
+        rng = self.rng('taskers')
+        profiles = self.writer(TaskerProfile, ['id', 'user', 'bio'])
+        skills = self.writer(TaskerProfile.skills.through, ['taskerprofile', 'service'], parent=profiles)
+        terms = self.writer(TaskerSearchTerm, ['profile', 'kind', 'term'], parent=profiles)
+        first_profile = self.next_id(TaskerProfile)
+
+        for index, tasker_id in enumerate(data.tasker_ids):
+            profile_id = first_profile + index
+            offered = rng.sample(data.service_ids, min(skills_per_tasker, len(data.service_ids)))
+            data.skills[tasker_id] = offered
+
+            profiles.add((profile_id, tasker_id, ''))
+            for service_id in offered:
+                skills.add((profile_id, service_id))
+            # The same terms TaskerSearch.rebuild would compute
+            username, location = self.tasker_names[index]
+            for kind, term in build_terms(username, location, offered):
+                terms.add((profile_id, kind, term))
+
+        profiles.flush()
+        skills.flush()
+        terms.flush()
+        data.rows.update(profiles=profiles.count, skills=skills.count, search_terms=terms.count)
+
+    def write_slots_and_bookings(self, data, days, slots_per_day, bookings):
+        rng = self.rng('bookings')
+        slots = self.writer(
+            AvailabilitySlot, ['id', 'tasker', 'date', 'start_time', 'end_time', 'is_booked', 'created_at']
+        )
+        booking_rows = self.writer(Booking, [
+            'client', 'tasker', 'task', 'description', 'availability_slot', 'status', 'created_at', 'updated_at',
+        ], parent=slots)
+        dates = [
+            (self.start_date + datetime.timedelta(days=day), self.start_date + datetime.timedelta(days=day) < self.today)
+            for day in range(days)
+        ]
+        dates = [(connection.ops.adapt_datefield_value(date), past) for date, past in dates]
+
+        total = len(data.tasker_ids) * days * slots_per_day
+        remaining = min(bookings, total)
+        slot_id = self.next_id(AvailabilitySlot)
+        free = []
+
+        for tasker_id in data.tasker_ids:
+            offered = data.skills[tasker_id]
+            for date, past in dates:
+                for start_time, end_time in self.times[:slots_per_day]:
+                    # Selection sampling: exactly `bookings` slots end up booked, streamed
+                    booked = rng.random() * total < remaining
+                    total -= 1
+                    slots.add((slot_id, tasker_id, date, start_time, end_time, booked, self.now))
+                    if booked:
+                        remaining -= 1
+                        booking_rows.add((
+                            rng.choice(data.client_ids), tasker_id, rng.choice(offered), 'Benchmark booking',
+                            slot_id, 'completed' if past else 'confirmed', self.now, self.now,
+                        ))
+                    elif len(free) < FREE_SLOTS_KEPT:
+                        free.append(slot_id)
+                    slot_id += 1
+
+        booking_rows.flush()
+        slots.flush()
+        data.rows.update(slots=slots.count, bookings=booking_rows.count)
+        rng.shuffle(free)
+        data.free_slot_ids = free
+
+    def reset_sequences(self):
+        models = [User, TaskerProfile, TaskerProfile.skills.through, TaskerSearchTerm, AvailabilitySlot, Booking]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+def seed_benchmark_data(tag, seed=0, clients=200, taskers=50, services=8, skills_per_tasker=3,
+                        weeks=2, slots_per_day=8, bookings=500, password=DEFAULT_PASSWORD):
+    """
+    Create clients, taskers with skills and search terms, weeks of hourly slots
+    from tomorrow on and bookings of random slots. Users share one password hash.
+    """
+    return DataGenerator(tag, seed=seed, password=password).generate(
+        clients=clients, taskers=taskers, services=services, skills_per_tasker=skills_per_tasker,
+        days=weeks * 7, slots_per_day=slots_per_day, bookings=bookings
+    )
+
+
+def load_benchmark_data(tag, seed=0, password=DEFAULT_PASSWORD):
+    """BenchmarkData of a data set generated earlier with this tag"""
+    data = BenchmarkData(tag, password)
+    email_suffix = f'@bench-{tag}.local'
+    users = User.objects.filter(email__endswith=email_suffix).order_by('id')
+    data.client_ids = list(users.filter(is_tasker=False).values_list('id', flat=True))
+    data.tasker_ids = list(users.filter(is_tasker=True).values_list('id', flat=True))
+    data.service_ids = list(Service.objects.filter(category__name=f'bench-{tag}').values_list('id', flat=True))
+    for tasker_id, service_id in TaskerProfile.skills.through.objects.filter(
+        taskerprofile__user__email__endswith=email_suffix
+    ).values_list('taskerprofile__user_id', 'service_id'):
+        data.skills.setdefault(tasker_id, []).append(service_id)
+
+    data.free_slot_ids = list(AvailabilitySlot.objects.filter(
+        tasker__email__endswith=email_suffix, is_booked=False, booking__isnull=True, date__gt=timezone.now().date()
+    ).order_by('id').values_list('id', flat=True)[:FREE_SLOTS_KEPT])
+    random.Random(seed).shuffle(data.free_slot_ids)
+    return data
+
+
+def delete_benchmark_data(tag):
+    """Remove everything generated for tag"""
+    users = User.objects.filter(email__endswith=f'@bench-{tag}.local').values('id')
+    profiles = TaskerProfile.objects.filter(user__in=users).values('id')
+    services = Service.objects.filter(category__name=f'bench-{tag}').values('id')
+
+    with transaction.atomic():
+        # The large tables go with one DELETE each, children first; the ORM
+        # would load every row to cascade
+        _delete_where(Booking, 'tasker', users)
+        _delete_where(Booking, 'client', users)
+        _delete_where(Booking, 'task', services)
+        _delete_where(AvailabilitySlot, 'tasker', users)
+        _delete_where(TaskerSearchTerm, 'profile', profiles)
+        _delete_where(TaskerProfile.skills.through, 'taskerprofile', profiles)
+        _delete_where(TaskerProfile, 'user', users)
+        # Whatever else references the users (tokens, admin log) cascades normally
+        User.objects.filter(email__endswith=f'@bench-{tag}.local').delete()
+        Category.objects.filter(name=f'bench-{tag}').delete()
+
+
+def _delete_where(model, field, subquery):
+    quote = connection.ops.quote_name
+    sql, params = subquery.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {quote(model._meta.get_field(field).column)} IN ({sql})', params
+        )
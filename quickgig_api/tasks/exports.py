@@ -0,0 +1,111 @@
+"""
+Streaming booking exports (CSV or NDJSON).
+
+Rows are read with values_list(), so the client, tasker, service and slot
+columns come out of one joined query without building model instances, and
+fetched with .iterator() in BOOKING_EXPORT_CHUNK_SIZE chunks. Each chunk is
+encoded and handed to the StreamingHttpResponse before the next one is
+read, so memory stays flat however many bookings are exported.
+
+Several querysets ordered by date, start time and id (live and archived
+bookings) are merged into a single stream in that order.
+
+CSV cells starting with =, +, -, @, a tab or a carriage return get a leading
+apostrophe, so a spreadsheet shows a description or username as text instead
+of running it as a formula.
+"""
+import csv
+import heapq
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Spreadsheets treat cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# (column, lookup) pairs, in export order
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('status', 'status'),
+    ('date', 'availability_slot__date'),
+    ('start_time', 'availability_slot__start_time'),
+    ('end_time', 'availability_slot__end_time'),
+    ('service', 'task__name'),
+    ('price', 'task__price'),
+    ('client', 'client__username'),
+    ('client_email', 'client__email'),
+    ('tasker', 'tasker__username'),
+    ('tasker_email', 'tasker__email'),
+    ('description', 'description'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+
+class Echo:
+    """File-like object csv.writer writes to, returning each line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(querysets):
+    """Tuples of the EXPORT_COLUMNS of every queryset, read in chunks and merged by date, start time and id"""
+    streams = [
+        queryset.values_list(*(lookup for _, lookup in EXPORT_COLUMNS)).iterator(
+            chunk_size=settings.BOOKING_EXPORT_CHUNK_SIZE
+        )
+        for queryset in querysets
+    ]
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=lambda row: (row[2], row[3], row[0]))
+
+
+def csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+def ndjson_lines(rows):
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def batched(lines, size):
+    # One write per chunk of rows rather than per row
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def stream_bookings(querysets, export_format, filename='bookings'):
+    """StreamingHttpResponse with the bookings of querysets as a CSV or NDJSON attachment"""
+    lines = csv_lines if export_format == 'csv' else ndjson_lines
+    response = StreamingHttpResponse(
+        batched(lines(export_rows(querysets)), settings.BOOKING_EXPORT_CHUNK_SIZE),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,99 @@
+"""
+Per-tasker availability heatmap: free and booked slot counts per day.
+
+Counts are cached per (tasker, month) under the tasker's version stamp. Every
+write that changes a tasker's slots or their is_booked flag calls
+invalidate_heatmaps(), which drops the stamp once the transaction commits and
+so orphans all of that tasker's months at once. A request only queries the
+months missing from the cache, with a single grouped aggregate over their
+whole span.
+
+The aggregate reads the primary: a lagging replica could put counts from
+before the invalidation back in the cache. Invalidations only reach the other
+workers through a shared cache backend (CACHE_BACKEND, see services.E001).
+"""
+import datetime
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from accounts.models import BaseUser
+
+
+def version_key(tasker_id):
+    return f'tasks:heatmap:version:{tasker_id}'
+
+
+def get_heatmap_version(tasker_id):
+    version = cache.get(version_key(tasker_id))
+    if version is None:
+        cache.add(version_key(tasker_id), uuid.uuid4().hex, None)
+        version = cache.get(version_key(tasker_id))
+    return version
+
+
+def invalidate_heatmaps(tasker_ids, using=None):
+    """Drop the cached heatmaps of these taskers once the current transaction (on using) commits"""
+    keys = [version_key(tasker_id) for tasker_id in set(tasker_ids)]
+    if keys:
+        # Before the commit, a concurrent request could cache the old counts again
+        transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+
+def month_starts(date_from, date_to):
+    month = date_from.replace(day=1)
+    while month <= date_to:
+        yield month
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def month_end(month):
+    return (month + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+
+
+def daily_counts(tasker_id, date_from, date_to):
+    """{date: (free, booked)} of the tasker's slots within the dates, in one grouped query"""
+    from .models import AvailabilitySlot
+
+    rows = AvailabilitySlot.objects.filter(
+        tasker_id=tasker_id, date__range=(date_from, date_to)
+    ).order_by().values('date').annotate(
+        free=Count('id', filter=Q(is_booked=False)),
+        booked=Count('id', filter=Q(is_booked=True)),
+    ).values_list('date', 'free', 'booked')
+    return {date: (free, booked) for date, free, booked in rows}
+
+
+def get_heatmap(tasker_id, date_from, date_to):
+    """
+    {date: (free, booked)} for the days within the dates that have slots, in
+    date order, or None when there is no such tasker
+    """
+    version = get_heatmap_version(tasker_id)
+    keys = {month: f'tasks:heatmap:{tasker_id}:{version}:{month:%Y-%m}' for month in month_starts(date_from, date_to)}
+    months = cache.get_many(keys.values())
+
+    missing = [month for month, key in keys.items() if key not in months]
+    if missing:
+        # Only on a miss: cached months were filled for an existing tasker (who,
+        # once deleted, may still get empty months until HEATMAP_CACHE_TIMEOUT)
+        if not BaseUser.objects.filter(id=tasker_id, is_tasker=True).exists():
+            return None
+        counts = daily_counts(tasker_id, missing[0], month_end(missing[-1]))
+        filled = {keys[month]: {} for month in missing}
+        for date, day_counts in counts.items():
+            key = keys.get(date.replace(day=1))
+            if key in filled:
+                filled[key][date] = day_counts
+        cache.set_many(filled, settings.HEATMAP_CACHE_TIMEOUT)
+        months.update(filled)
+
+    return {
+        date: day_counts
+        for key in keys.values()
+        for date, day_counts in sorted(months[key].items())
+        if date_from <= date <= date_to
+    }
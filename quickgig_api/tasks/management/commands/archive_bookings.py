@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from tasks.archive import archivable_slots, archive_cutoff, archive_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Move availability slots dated more than ARCHIVE_AFTER_DAYS ago, and their completed or "
+        "cancelled bookings, to the archive tables in small batches. "
+        "Meant to run from cron, e.g. `30 3 * * * python manage.py archive_bookings`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive slots dated more than this many days ago')
+        parser.add_argument('--batch-size', type=int, help='Slots archived per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+
+        if options['dry_run']:
+            counts = archivable_slots(cutoff).order_by().aggregate(
+                slots=Count('id'), bookings=Count('booking')
+            )
+            self.stdout.write(
+                f"{counts['slots']} slots and {counts['bookings']} bookings dated before {cutoff} would be archived"
+            )
+            return
+
+        slots, bookings = archive_expired(cutoff, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {slots} slots and {bookings} bookings dated before {cutoff}"
+        ))
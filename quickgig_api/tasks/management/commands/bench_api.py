@@ -0,0 +1,204 @@
+import datetime
+import json
+import platform
+import random
+import subprocess
+import threading
+import uuid
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from quickgig_api.benchmark import format_result, run_concurrently, summarize
+from tasks.benchdata import LOCATIONS, delete_benchmark_data, load_benchmark_data, seed_benchmark_data
+from tasks.models import AvailabilitySlot
+
+SCENARIOS = ['login', 'tasker-search', 'slot-list', 'booking-create', 'dashboard']
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic data at a configurable scale, run timed scenarios through the real "
+        "URL confs (login, tasker search, slot listing, concurrent booking creation, client "
+        "and tasker dashboards) and report throughput, latency and queries per request. "
+        "Use --output to keep the JSON for comparison across commits. Runs against the "
+        "configured database and removes its data afterwards unless --keep is given, or "
+        "against a data set made earlier by generate_bench_data with --data <tag>."
+    )
+
+    def add_arguments(self, parser):
+        scale = parser.add_argument_group('scale')
+        scale.add_argument('--clients', type=int, default=200)
+        scale.add_argument('--taskers', type=int, default=50)
+        scale.add_argument('--services', type=int, default=8)
+        scale.add_argument('--skills-per-tasker', type=int, default=3)
+        scale.add_argument('--weeks', type=int, default=2, help='Weeks of slots per tasker')
+        scale.add_argument('--slots-per-day', type=int, default=8)
+        scale.add_argument('--bookings', type=int, default=500)
+        scale.add_argument('--seed', type=int, default=0, help='Random seed for data and requests')
+
+        parser.add_argument('--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--json', action='store_true', help='Print the JSON report')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data')
+        parser.add_argument(
+            '--data', metavar='TAG', help='Use the data set generate_bench_data wrote under TAG instead of seeding'
+        )
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        scale = {
+            name: options[name]
+            for name in ('clients', 'taskers', 'services', 'skills_per_tasker', 'weeks', 'slots_per_day', 'bookings')
+        }
+        if options['clients'] < 1 or options['taskers'] < 1 or options['services'] < 1:
+            raise CommandError("--clients, --taskers and --services must be at least 1")
+
+        if options['data']:
+            data = load_benchmark_data(options['data'], seed=options['seed'])
+            if not data.client_ids or not data.tasker_ids or not data.service_ids:
+                raise CommandError(f"No data set {options['data']!r}, create it with generate_bench_data")
+            scale = {
+                'data': options['data'], 'clients': len(data.client_ids), 'taskers': len(data.tasker_ids),
+                'services': len(data.service_ids),
+            }
+        else:
+            data = seed_benchmark_data(tag, seed=options['seed'], **scale)
+        rng = random.Random(options['seed'])
+
+        results = []
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for scenario in options['scenarios']:
+                    run = getattr(self, f"_{scenario.replace('-', '_')}")
+                    results.append(run(data, rng, options))
+                    self.stderr.write(format_result(results[-1]))
+        finally:
+            if not options['keep'] and not options['data']:
+                delete_benchmark_data(tag)
+
+        report = {
+            'commit': self._commit(),
+            'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'password_hasher': settings.PASSWORD_HASHERS[0],
+            'scale': {**scale, 'seed': options['seed']},
+            'requests': options['requests'],
+            'threads': options['threads'],
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _measure(self, name, request, options, total=None):
+        """Time request(client, index) over the thread pool, counting the queries of one extra call"""
+        statuses = {}
+        lock = threading.Lock()
+
+        def worker(index):
+            status_code = request(Client(), index).status_code
+            with lock:
+                statuses[status_code] = statuses.get(status_code, 0) + 1
+
+        with CaptureQueriesContext(connection) as queries:
+            request(Client(), -1)
+        latencies, seconds = run_concurrently(worker, total or options['requests'], options['threads'])
+        return summarize(
+            name, latencies, seconds, threads=options['threads'], queries_per_request=len(queries),
+            statuses={str(code): count for code, count in sorted(statuses.items())}
+        )
+
+    def _auth(self, user_id):
+        token = AccessToken()
+        token[jwt_settings.USER_ID_CLAIM] = str(user_id)
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def _login(self, data, rng, options):
+        emails = [data.email('client', index) for index in range(len(data.client_ids))]
+        picks = [rng.choice(emails) for _ in range(options['requests'] + 1)]
+
+        def request(client, index):
+            return client.post(
+                reverse('user-login'), {'email': picks[index], 'password': data.password},
+                content_type='application/json'
+            )
+        return self._measure('login', request, options)
+
+    def _tasker_search(self, data, rng, options):
+        queries = []
+        for _ in range(options['requests'] + 1):
+            params = rng.choice([
+                {'location': rng.choice(LOCATIONS).split()[0]},
+                {'skills': ','.join(str(pk) for pk in rng.sample(data.service_ids, min(2, len(data.service_ids))))},
+                {'username': rng.choice(['ot', 'wanj', 'kam', 'grace'])},
+                {'location': rng.choice(LOCATIONS), 'skills': str(rng.choice(data.service_ids))},
+            ])
+            queries.append(params)
+
+        def request(client, index):
+            return client.get(reverse('public-taskers'), queries[index])
+        return self._measure('tasker-search', request, options)
+
+    def _slot_list(self, data, rng, options):
+        taskers = [rng.choice(data.tasker_ids) for _ in range(options['requests'] + 1)]
+
+        def request(client, index):
+            return client.get(reverse('slot-list'), {'tasker': taskers[index]})
+        return self._measure('slot-list', request, options)
+
+    def _booking_create(self, data, rng, options):
+        # Every request claims its own free slot, so this measures write throughput, not conflicts
+        total = min(options['requests'], len(data.free_slot_ids) - 1)
+        if total < 1:
+            raise CommandError("Not enough free slots for booking-create, seed more --weeks or fewer --bookings")
+        slots = dict(AvailabilitySlot.objects.filter(
+            id__in=data.free_slot_ids[:total + 1]
+        ).values_list('id', 'tasker_id'))
+        slot_ids = data.free_slot_ids[:total + 1]
+        clients = [rng.choice(data.client_ids) for _ in slot_ids]
+
+        def request(client, index):
+            slot_id = slot_ids[index]
+            return client.post(
+                reverse('booking-list'),
+                {
+                    'client': clients[index], 'tasker': slots[slot_id], 'task': data.skills[slots[slot_id]][0],
+                    'availability_slot': slot_id, 'description': 'Benchmark booking',
+                },
+                content_type='application/json', **self._auth(clients[index])
+            )
+        return self._measure('booking-create', request, options, total=total)
+
+    def _dashboard(self, data, rng, options):
+        views = [
+            (reverse('client-bookings'), rng.choice(data.client_ids)) if rng.random() < 0.5
+            else (reverse('tasker-bookings'), rng.choice(data.tasker_ids))
+            for _ in range(options['requests'] + 1)
+        ]
+
+        def request(client, index):
+            url, user_id = views[index]
+            return client.get(url, **self._auth(user_id))
+        return self._measure('dashboard', request, options)
@@ -0,0 +1,132 @@
+import asyncio
+import datetime
+import json
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from quickgig_api.benchmark import format_result, run_concurrently, run_concurrently_async, summarize
+from services.models import Category, Service
+from tasks.models import AvailabilitySlot, Booking
+
+User = get_user_model()
+
+# (name, DRF endpoint, async endpoint, authenticated)
+ENDPOINTS = [
+    ('slots', 'slot-list', 'slot-list-async', False),
+    ('client-bookings', 'client-bookings', 'client-bookings-async', True),
+    ('tasker-bookings', 'tasker-bookings', 'tasker-bookings-async', True),
+    ('public-taskers', 'public-taskers', 'public-taskers-async', False),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second of the read endpoints served by the WSGI handler with a "
+        "thread pool against the ASGI handler on one event loop, for both the DRF views and "
+        "their async versions. --client-delay simulates slow clients holding each request open. "
+        "Runs in-process against the configured database and removes its data afterwards; "
+        "for numbers including the server itself, load the /api/.../async/ URLs of uvicorn "
+        "(ASGI) and gunicorn (WSGI) with an external load generator."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per scenario')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--concurrency', type=int, default=64, help='In-flight ASGI requests')
+        parser.add_argument(
+            '--client-delay', type=float, default=0.0,
+            help='Milliseconds each client keeps its request open (slow network)'
+        )
+        parser.add_argument('--bookings', type=int, default=50, help='Bookings to seed')
+        parser.add_argument(
+            '--endpoints', nargs='+', default=[name for name, *_ in ENDPOINTS],
+            choices=[name for name, *_ in ENDPOINTS]
+        )
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        client_user, tasker = self._seed(run_id, options['bookings'])
+        users = {'client-bookings': client_user, 'tasker-bookings': tasker}
+
+        results = []
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for name, sync_name, async_name, authenticated in ENDPOINTS:
+                    if name not in options['endpoints']:
+                        continue
+                    headers = {}
+                    if authenticated:
+                        access = RefreshToken.for_user(users.get(name, client_user)).access_token
+                        headers['Authorization'] = f'Bearer {access}'
+
+                    results.append(self._wsgi(f'{name}[wsgi]', reverse(sync_name), headers, options))
+                    results.append(self._asgi(f'{name}[asgi,drf]', reverse(sync_name), headers, options))
+                    results.append(self._asgi(f'{name}[asgi,async]', reverse(async_name), headers, options))
+        finally:
+            User.objects.filter(email__endswith=f'@bench-{run_id}.local').delete()
+            Category.objects.filter(name=f'bench-{run_id}').delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(format_result(result))
+
+    def _seed(self, run_id, bookings):
+        client_user = User.objects.create_user(
+            email=f'client@bench-{run_id}.local', password=None, username=f'client-{run_id}', is_active=True
+        )
+        tasker = User.objects.create_user(
+            email=f'tasker@bench-{run_id}.local', password=None, username=f'tasker-{run_id}',
+            is_tasker=True, is_active=True
+        )
+        category = Category.objects.create(name=f'bench-{run_id}')
+        service = Service.objects.create(name=f'bench-{run_id}', description='', price='10.00', category=category)
+
+        first_day = timezone.now().date() + datetime.timedelta(days=1)
+        slots = AvailabilitySlot.objects.bulk_create([
+            AvailabilitySlot(
+                tasker=tasker, date=first_day + datetime.timedelta(days=index // 24),
+                start_time=datetime.time(index % 24, 0), end_time=datetime.time(index % 24, 30), is_booked=True
+            )
+            for index in range(bookings)
+        ])
+        Booking.objects.bulk_create([
+            Booking(client=client_user, tasker=tasker, task=service, availability_slot=slot, description='')
+            for slot in slots
+        ])
+        return client_user, tasker
+
+    def _check(self, response, path):
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} failed with {response.status_code}: {response.content[:200]}")
+
+    def _wsgi(self, name, path, headers, options):
+        delay = options['client_delay'] / 1000
+
+        def request(index):
+            self._check(Client().get(path, headers=headers), path)
+            time.sleep(delay)
+
+        latencies, seconds = run_concurrently(request, options['requests'], options['threads'])
+        return summarize(name, latencies, seconds, threads=options['threads'], client_delay_ms=options['client_delay'])
+
+    def _asgi(self, name, path, headers, options):
+        delay = options['client_delay'] / 1000
+
+        async def request(index):
+            self._check(await AsyncClient().get(path, headers=headers), path)
+            await asyncio.sleep(delay)
+
+        latencies, seconds = asyncio.run(run_concurrently_async(request, options['requests'], options['concurrency']))
+        return summarize(
+            name, latencies, seconds, concurrency=options['concurrency'], client_delay_ms=options['client_delay']
+        )
@@ -0,0 +1,136 @@
+import datetime
+import json
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from quickgig_api.benchmark import percentile
+from services.models import Category, Service
+from tasks.models import AvailabilitySlot, Booking, BookingService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire N concurrent bookings at the same availability slot and report throughput, "
+        "latency and double-bookings for the optimistic and locking booking modes. "
+        "Runs against the configured database and removes its data afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent clients per slot')
+        parser.add_argument('--rounds', type=int, default=20, help='Slots to race for per mode')
+        parser.add_argument(
+            '--modes', nargs='+', default=['optimistic', 'locking'], choices=['optimistic', 'locking']
+        )
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        tasker, clients, service = self._seed(run_id, options['threads'])
+
+        try:
+            # Each mode races for slots on its own days
+            days_per_mode = options['rounds'] // 1440 + 1
+            results = [
+                self._run_mode(mode, tasker, clients, service, options['rounds'], first_day=1 + index * days_per_mode)
+                for index, mode in enumerate(options['modes'])
+            ]
+        finally:
+            User.objects.filter(email__endswith=f'@bench-{run_id}.local').delete()
+            service.category.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:>10}: {result['attempts']} attempts in {result['seconds']:.2f}s "
+                f"({result['throughput']:.1f}/s), p50 {result['p50_ms']:.1f}ms, p99 {result['p99_ms']:.1f}ms, "
+                f"booked {result['booked']}, rejected {result['rejected']}, errors {result['errors']}, "
+                f"double-bookings {result['double_bookings']}"
+            )
+
+    def _seed(self, run_id, threads):
+        domain = f'bench-{run_id}.local'
+        tasker = User.objects.create_user(
+            email=f'tasker@{domain}', password=None, username='bench-tasker', is_tasker=True, is_active=True
+        )
+        clients = [
+            User.objects.create_user(email=f'client{i}@{domain}', password=None, username=f'bench-client-{i}')
+            for i in range(threads)
+        ]
+        category = Category.objects.create(name=f'Benchmark {run_id}')
+        service = Service.objects.create(name='Benchmark', description='', price='1.00', category=category)
+        tasker.taskerprofile.skills.add(service)
+        return tasker, clients, service
+
+    def _run_mode(self, mode, tasker, clients, service, rounds, first_day):
+        latencies = []
+        outcomes = {'booked': 0, 'rejected': 0, 'errors': 0}
+        winners = {}
+        lock = threading.Lock()
+        day = timezone.now().date() + datetime.timedelta(days=first_day)
+        slot_ids = []
+        seconds = 0.0
+
+        for round_number in range(rounds):
+            start = datetime.time(round_number // 60 % 24, round_number % 60)
+            slot = AvailabilitySlot.objects.create(
+                tasker=tasker, date=day + datetime.timedelta(days=round_number // 1440),
+                start_time=start, end_time=datetime.time(start.hour, start.minute, 30)
+            )
+            slot_ids.append(slot.id)
+            barrier = threading.Barrier(len(clients))
+
+            def attempt(client):
+                try:
+                    barrier.wait()
+                    began = time.perf_counter()
+                    try:
+                        BookingService.create_booking(
+                            client=client, tasker=tasker, task=service,
+                            availability_slot_id=slot.id, description='benchmark', mode=mode
+                        )
+                        outcome = 'booked'
+                    except ValidationError:
+                        outcome = 'rejected'
+                    except DatabaseError:
+                        outcome = 'errors'
+                    elapsed = time.perf_counter() - began
+                    with lock:
+                        latencies.append(elapsed)
+                        outcomes[outcome] += 1
+                        if outcome == 'booked':
+                            winners[slot.id] = winners.get(slot.id, 0) + 1
+                finally:
+                    connection.close()
+
+            workers = [threading.Thread(target=attempt, args=(client,)) for client in clients]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            seconds += time.perf_counter() - started
+
+        stored = Booking.objects.filter(availability_slot_id__in=slot_ids).count()
+        return {
+            'mode': mode,
+            'attempts': len(latencies),
+            'seconds': seconds,
+            'throughput': len(latencies) / seconds if seconds else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            **outcomes,
+            # More than one client told "booked" for the same slot, or bookings the clients never saw
+            'double_bookings': sum(count - 1 for count in winners.values()) + abs(stored - outcomes['booked']),
+        }
@@ -0,0 +1,62 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.models import Category
+from tasks.benchdata import DEFAULT_PASSWORD, DataGenerator, MAX_SLOTS_PER_DAY, delete_benchmark_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large deterministic data set (users, taskers with skills and search terms, "
+        "services, availability slots and bookings) with streamed batched inserts, for capacity "
+        "planning and as a fixture for bench_api --data <tag>. Slots: taskers x days x slots-per-day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tag', help='Data set name (default: seed<seed>)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--clients', type=int, default=10_000)
+        parser.add_argument('--taskers', type=int, default=2_000)
+        parser.add_argument('--services', type=int, default=50)
+        parser.add_argument('--skills-per-tasker', type=int, default=3)
+        parser.add_argument('--days', type=int, default=60)
+        parser.add_argument('--slots-per-day', type=int, default=8, help=f'At most {MAX_SLOTS_PER_DAY}')
+        parser.add_argument('--bookings', type=int, default=300_000)
+        parser.add_argument(
+            '--start-date', type=datetime.date.fromisoformat,
+            help='First slot date, YYYY-MM-DD (default: tomorrow); past slots get completed bookings'
+        )
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per insert batch')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Password of every generated user')
+        parser.add_argument('--replace', action='store_true', help='Delete an existing data set with this tag first')
+
+    def handle(self, *args, **options):
+        tag = options['tag'] or f"seed{options['seed']}"
+        if options['replace']:
+            delete_benchmark_data(tag)
+        elif Category.objects.filter(name=f'bench-{tag}').exists():
+            raise CommandError(f"Data set {tag!r} already exists, pass --replace or another --tag")
+
+        generator = DataGenerator(
+            tag, seed=options['seed'], password=options['password'],
+            batch_size=options['batch_size'], start_date=options['start_date']
+        )
+        try:
+            data = generator.generate(
+                clients=options['clients'], taskers=options['taskers'], services=options['services'],
+                skills_per_tasker=options['skills_per_tasker'], days=options['days'],
+                slots_per_day=options['slots_per_day'], bookings=options['bookings'],
+            )
+        except Exception:
+            # Leave no half-written data set behind
+            delete_benchmark_data(tag)
+            raise
+
+        total = sum(data.rows.values())
+        for table, count in data.rows.items():
+            self.stdout.write(f"{table:>13}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total} rows in {data.seconds:.1f}s ({total / data.seconds:,.0f} rows/s) "
+            f"as data set {tag!r}; run bench_api --data {tag} to benchmark against it"
+        ))
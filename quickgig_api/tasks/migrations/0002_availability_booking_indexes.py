@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_alter_service_options'),
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='availabilityslot',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='availabilityslot',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['tasker', 'date', 'start_time'], name='slot_tasker_free_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='availabilityslot',
+            index=models.Index(fields=['date', 'start_time'], name='slot_date_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['client', 'availability_slot'], name='booking_client_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['tasker', 'availability_slot'], name='booking_tasker_slot_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='availabilityslot',
+            constraint=models.UniqueConstraint(fields=('tasker', 'date', 'start_time', 'end_time'), name='unique_tasker_slot'),
+        ),
+    ]
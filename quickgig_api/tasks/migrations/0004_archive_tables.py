@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_alter_service_options'),
+        ('tasks', '0003_booking_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAvailabilitySlot',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('is_booked', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('tasker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_slots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('description', models.TextField()),
+                ('status', models.CharField(choices=[('confirmed', 'Confirmed'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('availability_slot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booking', to='tasks.archivedavailabilityslot')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_client_bookings', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='services.service')),
+                ('tasker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasker_bookings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['availability_slot__date', 'availability_slot__start_time'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedavailabilityslot',
+            index=models.Index(fields=['tasker', 'date', 'start_time'], name='archived_slot_tasker_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['client', 'availability_slot'], name='archived_booking_client_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['tasker', 'availability_slot'], name='archived_booking_tasker_idx'),
+        ),
+    ]
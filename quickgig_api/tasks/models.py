@@ -1,10 +1,13 @@
 from django.db import models, transaction
 from django.conf import settings
 from services.models import Service
+from accounts.models import TaskerProfile
+from accounts.search import TaskerSearch, normalize
+from .heatmap import invalidate_heatmaps
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 import datetime
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 class AvailabilitySlot(models.Model):
@@ -18,8 +21,19 @@ class AvailabilitySlot(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('start_time', 'end_time')
         ordering = ['date', 'start_time']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tasker', 'date', 'start_time', 'end_time'], name='unique_tasker_slot'),
+        ]
+        indexes = [
+            # Free slots of a tasker on a date (BookingService.get_available_slots)
+            models.Index(
+                fields=['tasker', 'date', 'start_time'], condition=models.Q(is_booked=False),
+                name='slot_tasker_free_idx'),
+            # Global listing ordered by date/start time (slot-list pagination)
+            models.Index(fields=['date', 'start_time'], name='slot_date_start_idx'),
+        ]
 
     def clean(self):
         if self.start_time >= self.end_time:
@@ -58,6 +72,13 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['availability_slot__date', 'availability_slot__start_time']
+        indexes = [
+            # Client/tasker dashboards join straight from these to the slot
+            models.Index(fields=['client', 'availability_slot'], name='booking_client_slot_idx'),
+            models.Index(fields=['tasker', 'availability_slot'], name='booking_tasker_slot_idx'),
+            # Newest first, as the admin changelist lists them
+            models.Index(fields=['created_at'], name='booking_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.client} -> {self.tasker} on {self.date} at {self.start_time}"
@@ -81,6 +102,62 @@ class Booking(models.Model):
             raise ValidationError(f"{self.tasker} does not offer the service {self.task}.")
     
 
+class ArchivedAvailabilitySlot(models.Model):
+    """An expired AvailabilitySlot moved out of the hot table by tasks.archive, keeping its id"""
+    id = models.BigIntegerField(primary_key=True)
+    tasker = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_slots')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    is_booked = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            # A tasker's history, in the slot listing order
+            models.Index(fields=['tasker', 'date', 'start_time'], name='archived_slot_tasker_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tasker}, {self.date}, {self.start_time}, {self.end_time}"
+
+class ArchivedBooking(models.Model):
+    """A finished Booking moved out of the hot table by tasks.archive, keeping its id"""
+    id = models.BigIntegerField(primary_key=True)
+    client = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_client_bookings')
+    tasker = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_tasker_bookings')
+    task = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='archived_bookings')
+    description = models.TextField()
+    availability_slot = models.OneToOneField(
+        ArchivedAvailabilitySlot, on_delete=models.CASCADE, related_name='booking')
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['availability_slot__date', 'availability_slot__start_time']
+        indexes = [
+            models.Index(fields=['client', 'availability_slot'], name='archived_booking_client_idx'),
+            models.Index(fields=['tasker', 'availability_slot'], name='archived_booking_tasker_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client} -> {self.tasker} on {self.availability_slot.date} (archived)"
+
+
+class SlotUnavailable(ValidationError):
+    """Raised when another booking claimed the availability slot first"""
+
+    def __init__(self, message='Availability slot is already booked.'):
+        super().__init__(message)
+
+
 class BookingService:
     """ services to handle bookings"""
 
@@ -91,60 +168,240 @@ class BookingService:
             return AvailabilitySlot.objects.none()
         
         slots = AvailabilitySlot.objects.filter(tasker=tasker, date=date, is_booked=False)
+        if task:
+            slots = slots.filter(tasker__taskerprofile__skills=task)
+
+        return slots
 
+    @staticmethod
+    def search_available_slots(service, date_from, date_to, start_time=None, end_time=None, location=None):
+        """Get free slots of every tasker offering a service within a date/time window"""
+        slots = AvailabilitySlot.objects.select_related('tasker').filter(
+            is_booked=False,
+            date__range=(date_from, date_to),
+            # A tasker has each skill once, so this join can't duplicate slots
+            tasker__taskerprofile__skills=service,
+        )
+        if start_time:
+            slots = slots.filter(start_time__gte=start_time)
+        if end_time:
+            slots = slots.filter(end_time__lte=end_time)
+        if location and normalize(location):
+            slots = slots.filter(
+                tasker__taskerprofile__in=TaskerSearch.matching_profiles('location', location)
+            )
         return slots
     
+    @staticmethod
+    def get_alternative_slots(slot, limit=5):
+        """Get the next free slots of the same tasker, starting from the slot's date"""
+        return AvailabilitySlot.objects.select_related('tasker').filter(
+            tasker_id=slot.tasker_id, date__gte=slot.date, is_booked=False
+        ).exclude(id=slot.id)[:limit]
+
     @staticmethod
     @transaction.atomic
-    def create_booking(client, tasker, task, availability_slot_id, description):
-        """Create a new booking"""
-        try:
-            # Get and lock the availability slot
-            availability_slot = AvailabilitySlot.objects.select_for_update().get(
-                id=availability_slot_id
-            )
+    def create_booking(client, tasker, task, availability_slot_id, description, mode=None):
+        """
+        Create a new booking
+        mode is 'optimistic' (compare-and-set on the slot) or 'locking' (select_for_update),
+        defaulting to settings.BOOKING_CONCURRENCY
+        """
+        mode = mode or settings.BOOKING_CONCURRENCY
+
+        if mode == 'locking':
+            try:
+                availability_slot = AvailabilitySlot.objects.select_for_update().get(
+                    id=availability_slot_id
+                )
+            except AvailabilitySlot.DoesNotExist:
+                raise ValidationError("Availability slot not found")
 
             if availability_slot.is_booked:
-                raise ValidationError('Availability slot is already booked.')
-
-            booking = Booking.objects.create(
-                client=client,
-                tasker=tasker,
-                task=task,
-                availability_slot=availability_slot,
-                description=description,
-                status='confirmed'
-            )
+                raise SlotUnavailable()
+            AvailabilitySlot.objects.filter(id=availability_slot_id).update(is_booked=True)
+        else:
+            # Claim the slot with a single conditional UPDATE instead of a row lock
+            claimed = AvailabilitySlot.objects.filter(
+                id=availability_slot_id, is_booked=False
+            ).update(is_booked=True)
 
-            # mark the availability slot as booked
-            availability_slot.is_booked = True
-            availability_slot.save()
+            if not claimed:
+                if not AvailabilitySlot.objects.filter(id=availability_slot_id).exists():
+                    raise ValidationError("Availability slot not found")
+                raise SlotUnavailable()
 
-            return booking
-        except AvailabilitySlot.DoesNotExist:
-            raise ValidationError("Availability slot not found")
+        booking = Booking(
+            client=client,
+            tasker=tasker,
+            task=task,
+            availability_slot_id=availability_slot_id,
+            description=description,
+            status='confirmed'
+        )
+        # The slot is already flagged, the post_save receivers have nothing to do on this save only
+        booking._slot_synced = True
+        try:
+            booking.save(force_insert=True)
+        finally:
+            del booking._slot_synced
+        invalidate_heatmaps([tasker.id])
+        return booking
         
     @staticmethod
     @transaction.atomic
     def cancel_booking(booking):
         """Cancel a booking"""
-        try:
-            booking = Booking.objects.select_for_update().get(
-                id=booking.id
-            )
-            # only allow cancellation of confirmed bookings
-            if booking.status != 'confirmed':
-                raise ValidationError(f"Cannot cancel booking with status: {booking.status}")
-            
-            booking.status = 'cancelled'
-            booking.availability_slot.is_booked = False
+        now = timezone.now()
+        # only allow cancellation of confirmed bookings
+        cancelled = Booking.objects.filter(
+            id=booking.id, status='confirmed'
+        ).update(status='cancelled', updated_at=now)
 
-            booking.availability_slot.save()
-            booking.save()
-            return booking
-        except Booking.DoesNotExist:
-            raise ValidationError("Booking not found")
+        if not cancelled:
+            current_status = Booking.objects.filter(id=booking.id).values_list('status', flat=True).first()
+            if current_status is None:
+                raise ValidationError("Booking not found")
+            raise ValidationError(f"Cannot cancel booking with status: {current_status}")
+
+        AvailabilitySlot.objects.filter(id=booking.availability_slot_id).update(is_booked=False)
+        invalidate_heatmaps([booking.tasker_id])
+
+        booking.status = 'cancelled'
+        booking.updated_at = now
+        if Booking.availability_slot.is_cached(booking):
+            booking.availability_slot.is_booked = False
+        return booking
         
+    @staticmethod
+    def bulk_create_bookings(client, items, atomic=True):
+        """
+        Book many slots for one client in one transaction
+        items are dicts with availability_slot and task ids and a description.
+        Returns, per item, the new Booking or the ValidationError it failed with;
+        when atomic, a single failure books nothing.
+        """
+        # 'booking' is the id of a booking still on the slot: a cancelled one frees
+        # is_booked but keeps its row, which the one-to-one link won't let a new one share
+        slots = {
+            slot['id']: slot for slot in AvailabilitySlot.objects.filter(
+                id__in=[item['availability_slot'] for item in items]
+            ).values('id', 'tasker_id', 'is_booked', 'booking')
+        }
+        # (tasker id, service id) pairs, for all items at once instead of Booking.clean per item
+        offered = set(TaskerProfile.skills.through.objects.filter(
+            taskerprofile__user_id__in={slot['tasker_id'] for slot in slots.values()},
+            service_id__in={item['task'] for item in items},
+        ).values_list('taskerprofile__user_id', 'service_id'))
+
+        results = []
+        seen = set()
+        for item in items:
+            slot = slots.get(item['availability_slot'])
+            if slot is None:
+                results.append(ValidationError("Availability slot not found"))
+            elif slot['id'] in seen:
+                results.append(ValidationError("Availability slot is requested more than once."))
+            elif (slot['tasker_id'], item['task']) not in offered:
+                results.append(ValidationError(f"The tasker does not offer the service {item['task']}."))
+            elif slot['is_booked']:
+                results.append(SlotUnavailable())
+            elif slot['booking'] is not None:
+                results.append(ValidationError("Booking with this availability slot already exists."))
+            else:
+                results.append(Booking(
+                    client=client, tasker_id=slot['tasker_id'], task_id=item['task'],
+                    availability_slot_id=slot['id'], description=item['description'], status='confirmed'
+                ))
+            if slot is not None:
+                seen.add(slot['id'])
+
+        pending = [result for result in results if isinstance(result, Booking)]
+        if not pending or (atomic and len(pending) < len(results)):
+            return results
+
+        with transaction.atomic():
+            claimed = BookingService._update_each(
+                AvailabilitySlot.objects.filter(is_booked=False),
+                [booking.availability_slot_id for booking in pending], is_booked=True
+            )
+            results = [
+                SlotUnavailable() if isinstance(result, Booking) and result.availability_slot_id not in claimed
+                else result for result in results
+            ]
+            if atomic and len(claimed) < len(pending):
+                transaction.set_rollback(True)
+                return results
+            # bulk_create sends no post_save, the slots are flagged already
+            created = Booking.objects.bulk_create([result for result in results if isinstance(result, Booking)])
+            invalidate_heatmaps(booking.tasker_id for booking in created)
+        return results
+
+    @staticmethod
+    def bulk_cancel_bookings(client, booking_ids, atomic=True):
+        """
+        Cancel many of a client's bookings in one transaction
+        Returns, per id, the cancelled Booking or the ValidationError it failed
+        with; when atomic, a single failure cancels nothing.
+        """
+        bookings = Booking.objects.filter(client=client, id__in=booking_ids).in_bulk()
+
+        results = []
+        seen = set()
+        for booking_id in booking_ids:
+            booking = bookings.get(booking_id)
+            if booking is None:
+                results.append(ValidationError("Booking not found"))
+            elif booking_id in seen:
+                results.append(ValidationError("Booking is requested more than once."))
+            elif booking.status != 'confirmed':
+                results.append(ValidationError(f"Cannot cancel booking with status: {booking.status}"))
+            else:
+                results.append(booking)
+            seen.add(booking_id)
+
+        pending = [result for result in results if isinstance(result, Booking)]
+        if not pending or (atomic and len(pending) < len(results)):
+            return results
+
+        now = timezone.now()
+        with transaction.atomic():
+            cancelled = BookingService._update_each(
+                Booking.objects.filter(status='confirmed'),
+                [booking.id for booking in pending], status='cancelled', updated_at=now
+            )
+            results = [
+                ValidationError("Booking was changed concurrently, please retry.")
+                if isinstance(result, Booking) and result.id not in cancelled else result
+                for result in results
+            ]
+            if atomic and len(cancelled) < len(pending):
+                transaction.set_rollback(True)
+                return results
+            AvailabilitySlot.objects.filter(
+                id__in=[result.availability_slot_id for result in results if isinstance(result, Booking)]
+            ).update(is_booked=False)
+            invalidate_heatmaps(result.tasker_id for result in results if isinstance(result, Booking))
+
+        for result in results:
+            if isinstance(result, Booking):
+                result.status = 'cancelled'
+                result.updated_at = now
+        return results
+
+    @staticmethod
+    def _update_each(queryset, ids, **values):
+        """
+        Compare-and-set queryset.update(**values) on the rows with these ids,
+        returning the ids that were updated. One UPDATE when every row still
+        matches; if a concurrent write got to some of them first, one per row.
+        """
+        with transaction.atomic():
+            if queryset.filter(id__in=ids).update(**values) == len(ids):
+                return set(ids)
+            transaction.set_rollback(True)
+        return {pk for pk in ids if queryset.filter(id=pk).update(**values)}
+
     @staticmethod
     @transaction.atomic
     def update_booking_status(booking, status):
@@ -156,79 +413,155 @@ class BookingService:
         except Exception as e:
             raise ValidationError(f"Error updating booking status: {e}")
 
+    @staticmethod
+    def get_bookings():
+        """Get bookings with everything BookingSerializer reads joined in"""
+        return Booking.objects.select_related(
+            'client', 'tasker', 'task', 'availability_slot__tasker'
+        )
+
     @staticmethod
     def get_tasker_bookings(tasker):
         """Get all bookings for a specific tasker"""
         if not tasker:
             return Booking.objects.none()
-        return Booking.objects.filter(tasker=tasker)
+        return BookingService.get_bookings().filter(tasker=tasker)
     
     @staticmethod
     def get_client_bookings(client):
         """Get all bookings for a specific client"""
         if not client:
             return Booking.objects.none()
-        return Booking.objects.filter(client=client)
+        return BookingService.get_bookings().filter(client=client)
 
 # Booking management
 class AvailabilityManager:
     """Functions to create availability slots easily"""
 
+    @staticmethod
+    def existing_slot_keys(tasker, dates):
+        """Get the (date, start_time, end_time) keys a tasker already has within the given dates"""
+        if not dates:
+            return set()
+
+        return set(
+            AvailabilitySlot.objects.filter(
+                tasker=tasker, date__range=(min(dates), max(dates))
+            ).order_by().values_list('date', 'start_time', 'end_time')
+        )
+
+    @staticmethod
+    def expand_recurrence(start_date, end_date, weekdays, start_time, end_time, slot_minutes, breaks=(), exceptions=()):
+        """
+        Expand a recurrence rule into (date, start_time, end_time) keys in memory.
+        Weekdays follow date.weekday() (Monday is 0), breaks are (start_time, end_time) pairs
+        and exception dates are skipped entirely.
+        """
+        def to_minutes(value):
+            return value.hour * 60 + value.minute
+
+        def to_time(minutes):
+            return datetime.time(minutes // 60, minutes % 60)
+
+        break_minutes = [(to_minutes(b_start), to_minutes(b_end)) for b_start, b_end in breaks]
+        day_end = to_minutes(end_time)
+
+        # Slot boundaries are identical for every matching day, so compute them once
+        times = []
+        current = to_minutes(start_time)
+        while current + slot_minutes <= day_end:
+            slot_end = current + slot_minutes
+            overlapping = [b_end for b_start, b_end in break_minutes if b_start < slot_end and current < b_end]
+            if overlapping:
+                # Restart the slot grid right after the break
+                current = max(overlapping)
+                continue
+            times.append((to_time(current), to_time(slot_end)))
+            current = slot_end
+
+        weekdays = set(weekdays)
+        exceptions = set(exceptions)
+        keys = []
+        date = start_date
+        while date <= end_date:
+            if date.weekday() in weekdays and date not in exceptions:
+                keys.extend((date, slot_start, slot_end) for slot_start, slot_end in times)
+            date += datetime.timedelta(days=1)
+        return keys
+
+    @staticmethod
+    def create_recurring_slots(tasker, start_date, end_date, weekdays, start_time, end_time, slot_minutes, breaks=(), exceptions=()):
+        """Create the slots of a recurrence rule that the tasker doesn't have yet"""
+        today = timezone.now().date()
+        keys = [
+            key for key in AvailabilityManager.expand_recurrence(
+                start_date, end_date, weekdays, start_time, end_time, slot_minutes, breaks, exceptions
+            )
+            if key[0] >= today
+        ]
+        taken = AvailabilityManager.existing_slot_keys(tasker, [key[0] for key in keys])
+
+        slots = [
+            AvailabilitySlot(tasker=tasker, date=date, start_time=slot_start, end_time=slot_end)
+            for date, slot_start, slot_end in keys
+            if (date, slot_start, slot_end) not in taken
+        ]
+        # All batches or none: a slot inserted concurrently raises IntegrityError (unique_tasker_slot)
+        with transaction.atomic():
+            slots = AvailabilitySlot.objects.bulk_create(slots, batch_size=500)
+            if slots:
+                invalidate_heatmaps([tasker.id])
+        return slots
+
     @staticmethod
     def create_daily_slots(tasker, date, start_hour, end_hour, slot_duration_hours=1):
         """Create daily availability slots for a tasker"""
-        slots_created = []
-        current_hour = start_hour
-        
-        while current_hour + slot_duration_hours <= end_hour:
-            start_time = datetime.time(current_hour, 0)
-            end_time = datetime.time(current_hour + slot_duration_hours, 0)
-            
-            slot, created = AvailabilitySlot.objects.get_or_create(
-                tasker=tasker,
-                date=date,
-                start_time=start_time,
-                defaults= {
-                    'end_time': end_time,
-                    'is_booked': False
-                }
-            )
-            
-            if created:
-                slots_created.append(slot)
-            
-            current_hour += slot_duration_hours
-            
-        return slots_created
+        return AvailabilityManager.create_recurring_slots(
+            tasker=tasker,
+            start_date=date,
+            end_date=date,
+            weekdays=[date.weekday()],
+            start_time=datetime.time(start_hour, 0),
+            end_time=datetime.time(end_hour, 0),
+            slot_minutes=slot_duration_hours * 60
+        )
     
     @staticmethod
     def create_weekly_slots(tasker, start_date, start_hour, end_hour, slot_duration_hours, num_weeks=1, work_days=[0,1,2,3,4,5,6]):
         """
         Create weekly availability slots for a tasker
+        work_days are day offsets from start_date within each week
         """
-        slots_created = []
-        for week in range(num_weeks):
-            for day in work_days:
-                date = start_date + datetime.timedelta(weeks=week, days=day)
-                slots = AvailabilityManager.create_daily_slots(
-                    tasker=tasker,
-                    date=date,
-                    start_hour=start_hour,
-                    end_hour=end_hour,
-                    slot_duration_hours=slot_duration_hours
-                )
-                slots_created.extend(slots)
-        return slots_created
+        return AvailabilityManager.create_recurring_slots(
+            tasker=tasker,
+            start_date=start_date,
+            end_date=start_date + datetime.timedelta(weeks=num_weeks, days=-1),
+            weekdays=[(start_date.weekday() + day) % 7 for day in work_days],
+            start_time=datetime.time(start_hour, 0),
+            end_time=datetime.time(end_hour, 0),
+            slot_minutes=slot_duration_hours * 60
+        )
 
 @receiver(post_save, sender=Booking)
 def mark_slot_as_booked(sender, instance, created, **kwargs):
     """Automatically mark availability slot as booked when booking is created"""
+    if getattr(instance, '_slot_synced', False):
+        return
     if created and instance.status == 'confirmed':
         # Use update() to avoid calling save() and triggering clean()
-        AvailabilitySlot.objects.filter(id=instance.availability_slot.id).update(is_booked=True)
+        AvailabilitySlot.objects.filter(id=instance.availability_slot_id).update(is_booked=True)
+        invalidate_heatmaps([instance.tasker_id])
 
 @receiver(post_save, sender=Booking)
 def handle_booking_cancellation(sender, instance, **kwargs):
     """Handle slot availability when booking is cancelled"""
+    if getattr(instance, '_slot_synced', False):
+        return
     if instance.status == 'cancelled':
-        AvailabilitySlot.objects.filter(id=instance.availability_slot.id).update(is_booked=False)
\ No newline at end of file
+        AvailabilitySlot.objects.filter(id=instance.availability_slot_id).update(is_booked=False)
+        invalidate_heatmaps([instance.tasker_id])
+
+@receiver([post_save, post_delete], sender=AvailabilitySlot)
+def invalidate_slot_heatmap(sender, instance, **kwargs):
+    """Slots saved or deleted one by one (API, admin, cascades) change the tasker's heatmap"""
+    invalidate_heatmaps([instance.tasker_id])
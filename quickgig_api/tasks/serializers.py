@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
 from rest_framework import serializers
-from .models import AvailabilitySlot, Booking
+from .heatmap import month_end
+from .models import ArchivedAvailabilitySlot, ArchivedBooking, AvailabilitySlot, Booking
 
 class AvailabilitySlotSerializer(serializers.ModelSerializer):
     tasker_name = serializers.CharField(source="tasker.username", read_only=True)
@@ -13,6 +17,124 @@ class AvailabilitySlotSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["is_booked", "created_at"]
 
+class AvailabilitySlotBulkSerializer(serializers.Serializer):
+    """Validates a single entry of a bulk slot payload without touching the database"""
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+    def validate(self, attrs):
+        # Same rules as AvailabilitySlot.clean(), which bulk_create() skips
+        try:
+            AvailabilitySlot(**attrs).clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return attrs
+
+class AvailabilityBreakSerializer(serializers.Serializer):
+    """A break inside the working hours of a recurrence rule"""
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError("Break end time must be after start time.")
+        return attrs
+
+class RecurringAvailabilitySerializer(serializers.Serializer):
+    """Recurrence rule used to generate a tasker's availability slots"""
+    MAX_DAYS = 366
+
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6), allow_empty=False
+    )
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    slot_minutes = serializers.IntegerField(min_value=5, max_value=24 * 60)
+    breaks = AvailabilityBreakSerializer(many=True, required=False)
+    exceptions = serializers.ListField(child=serializers.DateField(), required=False)
+
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError("End time must be after start time.")
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError("End date must not be before start date.")
+        if (attrs['end_date'] - attrs['start_date']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"A schedule can span at most {self.MAX_DAYS} days.")
+        return attrs
+
+class AvailabilitySearchSerializer(serializers.Serializer):
+    """Query parameters of the cross-tasker availability search"""
+    MAX_DAYS = 31
+
+    service = serializers.IntegerField(min_value=1)
+    date_from = serializers.DateField()
+    date_to = serializers.DateField(required=False)
+    start_time = serializers.TimeField(required=False)
+    end_time = serializers.TimeField(required=False)
+    location = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        attrs.setdefault('date_to', attrs['date_from'])
+        if attrs['date_to'] < attrs['date_from']:
+            raise serializers.ValidationError("date_to must not be before date_from.")
+        if (attrs['date_to'] - attrs['date_from']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"A search can span at most {self.MAX_DAYS} days.")
+        if attrs.get('start_time') and attrs.get('end_time') and attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError("end_time must be after start_time.")
+        return attrs
+
+class HeatmapSerializer(serializers.Serializer):
+    """Query parameters of the tasker heatmap, the current month by default"""
+    MAX_DAYS = 93
+
+    tasker = serializers.IntegerField(min_value=1)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'date_from' not in attrs:
+            attrs['date_from'] = attrs.get('date_to', timezone.now().date()).replace(day=1)
+        if 'date_to' not in attrs:
+            attrs['date_to'] = month_end(attrs['date_from'])
+        if attrs['date_to'] < attrs['date_from']:
+            raise serializers.ValidationError("date_to must not be before date_from.")
+        if (attrs['date_to'] - attrs['date_from']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"A heatmap can span at most {self.MAX_DAYS} days.")
+        return attrs
+
+class BookingExportSerializer(serializers.Serializer):
+    """Query parameters of the booking export"""
+    output = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    status = serializers.ChoiceField(choices=Booking.STATUS_CHOICES, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_to'] < attrs['date_from']:
+            raise serializers.ValidationError("date_to must not be before date_from.")
+        return attrs
+
+class BookingBulkItemSerializer(serializers.Serializer):
+    """One booking of a bulk request, by ids so validating it needs no queries"""
+    availability_slot = serializers.IntegerField(min_value=1)
+    task = serializers.IntegerField(min_value=1)
+    description = serializers.CharField()
+
+
+class BookingBulkSerializer(serializers.Serializer):
+    bookings = BookingBulkItemSerializer(many=True, allow_empty=False, max_length=settings.BOOKING_BULK_MAX_ITEMS)
+    atomic = serializers.BooleanField(default=True)
+
+
+class BookingBulkCancelSerializer(serializers.Serializer):
+    bookings = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=settings.BOOKING_BULK_MAX_ITEMS
+    )
+    atomic = serializers.BooleanField(default=True)
+
 class BookingSerializer(serializers.ModelSerializer):
     client_name = serializers.CharField(source="client.username", read_only=True)
     tasker_name = serializers.CharField(source="tasker.username", read_only=True)
@@ -30,3 +152,19 @@ class BookingSerializer(serializers.ModelSerializer):
             "status", "created_at", "updated_at"
         ]
         read_only_fields = ["status", "created_at", "updated_at"]
+
+
+class ArchivedAvailabilitySlotSerializer(AvailabilitySlotSerializer):
+    class Meta(AvailabilitySlotSerializer.Meta):
+        model = ArchivedAvailabilitySlot
+        fields = AvailabilitySlotSerializer.Meta.fields + ["archived_at"]
+        read_only_fields = fields
+
+
+class ArchivedBookingSerializer(BookingSerializer):
+    slot_detail = ArchivedAvailabilitySlotSerializer(source="availability_slot", read_only=True)
+
+    class Meta(BookingSerializer.Meta):
+        model = ArchivedBooking
+        fields = BookingSerializer.Meta.fields + ["archived_at"]
+        read_only_fields = fields
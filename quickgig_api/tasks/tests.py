@@ -1,3 +1,1255 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import json
+import threading
+import unittest
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from quickgig_api.admin_tools import EstimatedCountPaginator
+from quickgig_api.db_routers import ReadReplicaRouter, read_from_replica
+from quickgig_api.metrics import registry
+from services.models import Category, Service
+from .archive import archive_cutoff, archive_expired
+from .benchdata import delete_benchmark_data, load_benchmark_data, seed_benchmark_data
+from .models import (
+    ArchivedAvailabilitySlot, ArchivedBooking, AvailabilityManager, AvailabilitySlot, Booking, BookingService
+)
+
+User = get_user_model()
+
+
+class MarketplaceFixture:
+    """The tasker, client, 'Cleaning' category and 'Deep clean' service most tests start from"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tasker = User.objects.create_user(
+            email='tasker@example.com', password='pass12345', username='tasker', is_tasker=True, is_active=True
+        )
+        cls.customer = User.objects.create_user(
+            email='client@example.com', password='pass12345', username='client', is_active=True
+        )
+        cls.category = Category.objects.create(name='Cleaning')
+        cls.service = Service.objects.create(
+            name='Deep clean', description='Whole house', price='50.00', category=cls.category
+        )
+
+
+class DailyAvailabilitySlotViewTests(TestCase):
+    """Bulk slot ingestion through /api/tasks/slots/daily/"""
+
+    def setUp(self):
+        self.tasker = User.objects.create_user(
+            email='tasker@example.com', password='pass12345', username='tasker', is_tasker=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.tasker)
+        self.url = reverse('slot-daily')
+        self.day = timezone.now().date() + datetime.timedelta(days=1)
+
+    def _slots(self, count, day=None):
+        day = day or self.day
+        return [
+            {'date': str(day), 'start_time': f'{hour:02d}:00', 'end_time': f'{hour:02d}:30'}
+            for hour in range(count)
+        ]
+
+    def test_creates_all_slots(self):
+        response = self.client.post(self.url, {'slots': self._slots(5)}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(AvailabilitySlot.objects.filter(tasker=self.tasker).count(), 5)
+
+    def test_query_count_does_not_grow_with_payload(self):
+        # conflict lookup + savepoint + bulk insert + release, regardless of payload size
+        with self.assertNumQueries(4):
+            self.client.post(self.url, {'slots': self._slots(20)}, format='json')
+
+    def test_reports_errors_per_item(self):
+        AvailabilitySlot.objects.create(
+            tasker=self.tasker, date=self.day,
+            start_time=datetime.time(0, 0), end_time=datetime.time(0, 30)
+        )
+        slots = self._slots(3) + [
+            {'date': str(self.day), 'start_time': '10:00', 'end_time': '09:00'},
+            {'date': str(self.day), 'start_time': '01:00', 'end_time': '01:30'},
+        ]
+
+        response = self.client.post(self.url, {'slots': slots}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(len(response.data['created_slots']), 2)
+        # existing slot, end before start, and a duplicate within the payload
+        self.assertEqual(len(response.data['errors']), 3)
+        self.assertEqual(AvailabilitySlot.objects.filter(tasker=self.tasker).count(), 3)
+
+
+class RecurringAvailabilityTests(TestCase):
+    """Recurrence expansion and /api/tasks/slots/recurring/"""
+
+    def setUp(self):
+        self.tasker = User.objects.create_user(
+            email='tasker@example.com', password='pass12345', username='tasker', is_tasker=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.tasker)
+        self.url = reverse('slot-recurring')
+        today = timezone.now().date()
+        # Next Monday, so weekday masks are predictable
+        self.monday = today + datetime.timedelta(days=7 - today.weekday())
+
+    def test_expand_recurrence_honours_breaks_and_exceptions(self):
+        keys = AvailabilityManager.expand_recurrence(
+            start_date=self.monday,
+            end_date=self.monday + datetime.timedelta(days=13),
+            weekdays=[0, 2],
+            start_time=datetime.time(9, 0),
+            end_time=datetime.time(12, 0),
+            slot_minutes=45,
+            breaks=[(datetime.time(10, 0), datetime.time(10, 15))],
+            exceptions=[self.monday + datetime.timedelta(days=7)],
+        )
+
+        self.assertEqual(
+            sorted({date for date, _, _ in keys}),
+            [self.monday, self.monday + datetime.timedelta(days=2), self.monday + datetime.timedelta(days=9)]
+        )
+        self.assertEqual(
+            [(start, end) for date, start, end in keys if date == self.monday],
+            [
+                (datetime.time(9, 0), datetime.time(9, 45)),
+                (datetime.time(10, 15), datetime.time(11, 0)),
+                (datetime.time(11, 0), datetime.time(11, 45)),
+            ]
+        )
+
+    def test_endpoint_only_inserts_missing_slots(self):
+        AvailabilitySlot.objects.create(
+            tasker=self.tasker, date=self.monday,
+            start_time=datetime.time(9, 0), end_time=datetime.time(10, 0)
+        )
+        payload = {
+            'start_date': str(self.monday),
+            'end_date': str(self.monday + datetime.timedelta(weeks=12, days=-1)),
+            'weekdays': [0, 1, 2, 3, 4],
+            'start_time': '09:00',
+            'end_time': '17:00',
+            'slot_minutes': 60,
+        }
+
+        # conflict lookup + savepoint + 3 inserts (SQLite's batch limit) + release
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 12 * 5 * 8 - 1)
+        self.assertEqual(AvailabilitySlot.objects.filter(tasker=self.tasker).count(), 12 * 5 * 8)
+
+    def test_create_weekly_slots_uses_day_offsets(self):
+        wednesday = self.monday + datetime.timedelta(days=2)
+        created = AvailabilityManager.create_weekly_slots(
+            tasker=self.tasker, start_date=wednesday, start_hour=8, end_hour=10,
+            slot_duration_hours=1, num_weeks=2, work_days=[0, 1]
+        )
+
+        self.assertEqual(
+            sorted({slot.date for slot in created}),
+            [wednesday + datetime.timedelta(days=offset) for offset in (0, 1, 7, 8)]
+        )
+        self.assertEqual(len(created), 8)
+
+    def test_slot_inserted_concurrently_returns_conflict(self):
+        AvailabilitySlot.objects.create(
+            tasker=self.tasker, date=self.monday, start_time=datetime.time(10, 0), end_time=datetime.time(11, 0)
+        )
+        payload = {
+            'start_date': str(self.monday), 'end_date': str(self.monday), 'weekdays': [0],
+            'start_time': '09:00', 'end_time': '12:00', 'slot_minutes': 60,
+        }
+
+        # The other request's slot commits after this one looked for existing slots
+        with mock.patch.object(AvailabilityManager, 'existing_slot_keys', return_value=set()):
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(AvailabilitySlot.objects.filter(tasker=self.tasker).count(), 1)
+
+
+class BookingListQueryTests(MarketplaceFixture, TestCase):
+    """Booking listings must not issue a query per booking"""
+
+    def setUp(self):
+        self.day = timezone.now().date() + datetime.timedelta(days=1)
+        for hour in range(5):
+            self._book(hour)
+
+    def _book(self, hour):
+        slot = AvailabilitySlot.objects.create(
+            tasker=self.tasker, date=self.day,
+            start_time=datetime.time(hour, 0), end_time=datetime.time(hour, 30)
+        )
+        return Booking.objects.create(
+            client=self.customer, tasker=self.tasker, task=self.service,
+            availability_slot=slot, description='Please bring supplies'
+        )
+
+    def _assert_single_query(self, url_name, user):
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with self.assertNumQueries(1):
+            response = client.get(reverse(url_name))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_client_bookings(self):
+        self._assert_single_query('client-bookings', self.customer)
+
+    def test_tasker_bookings(self):
+        self._assert_single_query('tasker-bookings', self.tasker)
+
+    def test_booking_list(self):
+        self._assert_single_query('booking-list', self.customer)
+
+
+class SlotPaginationTests(TestCase):
+    """Keyset pagination on /api/tasks/slots/"""
+
+    def setUp(self):
+        self.tasker = User.objects.create_user(
+            email='tasker@example.com', password='pass12345', username='tasker', is_tasker=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.tasker)
+        today = timezone.now().date()
+        # Same start times on several days so the cursor has to break ties on date
+        AvailabilityManager.create_recurring_slots(
+            tasker=self.tasker,
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=3),
+            weekdays=range(7),
+            start_time=datetime.time(9, 0),
+            end_time=datetime.time(12, 0),
+            slot_minutes=30,
+        )
+
+    def test_walks_every_slot_once_in_order(self):
+        url = reverse('slot-list') + '?page_size=4'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 4)
+            seen.extend(response.data['results'])
+            url = response.data['next']
+
+        expected = list(
+            AvailabilitySlot.objects.order_by('date', 'start_time', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual([slot['id'] for slot in seen], expected)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get(reverse('slot-list') + '?page_size=5')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_page_size_is_capped(self):
+        with self.settings(API_MAX_PAGE_SIZE=3):
+            response = self.client.get(reverse('slot-list') + '?page_size=1000')
+
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('slot-list') + '?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor_values(self):
+        for position in (['abc', 'x', 'y'], [{'a': 1}, 1, 2], ['2020-01-01', '09:00', 'zz'], [None, None, None]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'p': position}).encode()).decode()
+            response = self.client.get(reverse('slot-list'), {'cursor': cursor})
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is backend specific')
+class IndexUsageTests(TestCase):
+    """The hot availability/booking lookups must be served by an index"""
+
+    def setUp(self):
+        self.tasker = User.objects.create_user(
+            email='tasker@example.com', password='pass12345', username='tasker', is_tasker=True
+        )
+        self.day = timezone.now().date() + datetime.timedelta(days=1)
+
+    def test_available_slots_use_partial_index(self):
+        plan = BookingService.get_available_slots(tasker=self.tasker, date=self.day).explain()
+
+        self.assertIn('USING INDEX slot_tasker_free_idx', plan)
+
+    def test_slot_conflict_lookup_uses_unique_index(self):
+        queryset = AvailabilitySlot.objects.filter(
+            tasker=self.tasker, date__range=(self.day, self.day)
+        ).order_by().values_list('date', 'start_time', 'end_time')
+
+        plan = queryset.explain()
+
+        self.assertIn('COVERING INDEX', plan)
+        self.assertNotIn('SCAN tasks_availabilityslot', plan)
+
+    def test_booking_dashboards_use_composite_indexes(self):
+        self.assertIn('USING INDEX booking_client_slot_idx', BookingService.get_client_bookings(self.tasker).explain())
+        self.assertIn('USING INDEX booking_tasker_slot_idx', BookingService.get_tasker_bookings(self.tasker).explain())
+
+
+class AvailabilitySlotConstraintTests(TestCase):
+    """Slot uniqueness is scoped to the tasker and date"""
+
+    def setUp(self):
+        self.day = timezone.now().date() + datetime.timedelta(days=1)
+        self.first = User.objects.create_user(
+            email='first@example.com', password='pass12345', username='first', is_tasker=True
+        )
+        self.second = User.objects.create_user(
+            email='second@example.com', password='pass12345', username='second', is_tasker=True
+        )
+
+    def _slot(self, tasker, day):
+        return AvailabilitySlot.objects.create(
+            tasker=tasker, date=day, start_time=datetime.time(9, 0), end_time=datetime.time(10, 0)
+        )
+
+    def test_same_hours_allowed_for_other_taskers_and_days(self):
+        self._slot(self.first, self.day)
+        self._slot(self.second, self.day)
+        self._slot(self.first, self.day + datetime.timedelta(days=1))
+
+        self.assertEqual(AvailabilitySlot.objects.count(), 3)
+
+    def test_duplicate_slot_rejected(self):
+        self._slot(self.first, self.day)
+
+        # full_clean() on save validates the unique_tasker_slot constraint
+        with self.assertRaises(ValidationError):
+            self._slot(self.first, self.day)
+
+    def test_same_hours_on_two_dates_through_the_api(self):
+        client = APIClient()
+        client.force_authenticate(self.first)
+
+        def post(day):
+            return client.post(reverse('slot-list'), {
+                'tasker': self.first.id, 'date': day.isoformat(), 'start_time': '09:00', 'end_time': '10:00'
+            }, format='json')
+
+        self.assertEqual(post(self.day).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(post(self.day + datetime.timedelta(days=1)).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(post(self.day).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(AvailabilitySlot.objects.filter(tasker=self.first).count(), 2)
+
+
+class BookingWriteTests(MarketplaceFixture, TestCase):
+    """BookingService writes each row once, without row locks"""
+
+    def setUp(self):
+        self.slot = AvailabilitySlot.objects.create(
+            tasker=self.tasker, date=timezone.now().date() + datetime.timedelta(days=1),
+            start_time=datetime.time(9, 0), end_time=datetime.time(10, 0)
+        )
+
+    def _book(self):
+        return BookingService.create_booking(
+            client=self.customer, tasker=self.tasker, task=self.service,
+            availability_slot_id=self.slot.id, description='Please bring supplies'
+        )
+
+    def test_create_booking_claims_slot_once(self):
+        # savepoint + conditional slot UPDATE + booking INSERT + release
+        with self.assertNumQueries(4):
+            self._book()
+
+        self.slot.refresh_from_db()
+        self.assertTrue(self.slot.is_booked)
+
+    def test_create_booking_rejects_booked_slot(self):
+        self._book()
+
+        with self.assertRaisesMessage(ValidationError, 'already booked'):
+            self._book()
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_cancel_booking_frees_slot(self):
+        booking = self._book()
+
+        # savepoint + booking UPDATE + slot UPDATE + release
+        with self.assertNumQueries(4):
+            BookingService.cancel_booking(booking)
+
+        self.slot.refresh_from_db()
+        self.assertFalse(self.slot.is_booked)
+        self.assertEqual(Booking.objects.get(id=booking.id).status, 'cancelled')
+        with self.assertRaisesMessage(ValidationError, 'Cannot cancel booking with status: cancelled'):
+            BookingService.cancel_booking(booking)
+
+    def test_status_update_still_frees_slot(self):
+        booking = Booking.objects.get(id=self._book().id)
+
+        BookingService.update_booking_status(booking, 'cancelled')
+
+        self.slot.refresh_from_db()
+        self.assertFalse(self.slot.is_booked)
+
+    def test_cancelling_the_returned_booking_frees_slot(self):
+        booking = self._book()
+
+        booking.status = 'cancelled'
+        booking.save()
+
+        self.slot.refresh_from_db()
+        self.assertFalse(self.slot.is_booked)
+
+
+class BookingConflictTests(MarketplaceFixture, TestCase):
+    """Losing the race for a slot returns 409 with alternatives"""
+
+    def setUp(self):
+        self.tasker.taskerprofile.skills.add(self.service)
+        self.slots = AvailabilityManager.create_daily_slots(
+            tasker=self.tasker, date=timezone.now().date() + datetime.timedelta(days=1),
+            start_hour=9, end_hour=12
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_taken_slot_returns_conflict_with_alternatives(self):
+        # Someone else claimed the slot after the client loaded it
+        AvailabilitySlot.objects.filter(id=self.slots[0].id).update(is_booked=True)
+        payload = {
+            'client': self.customer.id, 'tasker': self.tasker.id, 'task': self.service.id,
+            'availability_slot': self.slots[0].id, 'description': 'Please bring supplies',
+        }
+
+        for mode in ('optimistic', 'locking'):
+            with self.settings(BOOKING_CONCURRENCY=mode):
+                response = self.client.post(reverse('booking-list'), payload, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(
+                [slot['id'] for slot in response.data['alternatives']],
+                [slot.id for slot in self.slots[1:]]
+            )
+        self.assertFalse(Booking.objects.exists())
+
+
+class AvailabilitySearchTests(MarketplaceFixture, TestCase):
+    """Cross-tasker availability search on /api/tasks/availability/"""
+
+    def setUp(self):
+        other = Service.objects.create(name='Ironing', description='', price='5.00', category=self.category)
+        self.day = timezone.now().date() + datetime.timedelta(days=1)
+
+        self.nairobi = self._tasker('nairobi@example.com', 'Nairobi', [self.service])
+        self.mombasa = self._tasker('mombasa@example.com', 'Mombasa', [self.service, other])
+        self.ironer = self._tasker('ironer@example.com', 'Nairobi', [other])
+        for tasker in (self.nairobi, self.mombasa, self.ironer):
+            AvailabilityManager.create_daily_slots(tasker=tasker, date=self.day, start_hour=8, end_hour=12)
+        AvailabilitySlot.objects.filter(tasker=self.nairobi, start_time=datetime.time(8, 0)).update(is_booked=True)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.nairobi)
+
+    def _tasker(self, email, location, skills):
+        user = User.objects.create_user(
+            email=email, password=None, username=email.split('@')[0], location=location, is_tasker=True
+        )
+        user.taskerprofile.skills.set(skills)
+        return user
+
+    def _search(self, **params):
+        params.setdefault('service', self.service.id)
+        params.setdefault('date_from', str(self.day))
+        return self.client.get(reverse('availability-search'), params)
+
+    def test_groups_free_slots_by_tasker(self):
+        # pagination query, whatever the number of taskers or slots
+        with self.assertNumQueries(1):
+            response = self._search()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        groups = {group['tasker']: group['slots'] for group in response.data['results']}
+        self.assertEqual(set(groups), {self.nairobi.id, self.mombasa.id})
+        self.assertEqual(len(groups[self.nairobi.id]), 3)
+        self.assertEqual(len(groups[self.mombasa.id]), 4)
+
+    def test_time_window_and_location(self):
+        response = self._search(start_time='09:00', end_time='11:00', location='mombasa')
+
+        self.assertEqual(
+            [(group['tasker'], len(group['slots'])) for group in response.data['results']],
+            [(self.mombasa.id, 2)]
+        )
+
+    def test_pages_split_on_slot_boundaries(self):
+        response = self._search(page_size=5)
+        next_page = self.client.get(response.data['next'])
+
+        slots = [
+            slot['id']
+            for page in (response, next_page)
+            for group in page.data['results']
+            for slot in group['slots']
+        ]
+        self.assertEqual(len(slots), 7)
+        self.assertEqual(len(set(slots)), 7)
+
+    def test_requires_valid_window(self):
+        response = self._search(date_to=str(self.day - datetime.timedelta(days=1)))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingBulkTests(MarketplaceFixture, TestCase):
+    """Bulk booking and bulk cancel"""
+
+    def setUp(self):
+        self.other_service = Service.objects.create(
+            name='Plumbing', description='Pipes', price='80.00', category=self.category
+        )
+        self.tasker.taskerprofile.skills.add(self.service)
+        tomorrow = timezone.now().date() + datetime.timedelta(days=1)
+        self.slots = [
+            AvailabilitySlot.objects.create(
+                tasker=self.tasker, date=tomorrow, start_time=datetime.time(hour, 0), end_time=datetime.time(hour, 45)
+            )
+            for hour in range(8, 16)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def _items(self, slots, task=None):
+        return [
+            {'availability_slot': slot.id, 'task': (task or self.service).id, 'description': 'Agency job'}
+            for slot in slots
+        ]
+
+    def _book(self, items, atomic=True):
+        return self.client.post(reverse('booking-bulk'), {'bookings': items, 'atomic': atomic}, format='json')
+
+    def test_books_every_slot_with_a_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as two:
+            response = self._book(self._items(self.slots[:2]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as six:
+            response = self._book(self._items(self.slots[2:]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(two), len(six))
+
+        self.assertEqual([item['status'] for item in response.data['results']], ['created'] * 6)
+        self.assertEqual(response.data['results'][0]['booking']['task_name'], 'Deep clean')
+        self.assertEqual(Booking.objects.filter(client=self.customer, status='confirmed').count(), 8)
+        self.assertFalse(AvailabilitySlot.objects.filter(is_booked=False).exists())
+
+    def test_slot_freed_by_a_cancellation_fails_its_item(self):
+        cancelled = BookingService.create_booking(
+            client=self.customer, tasker=self.tasker, task=self.service,
+            availability_slot_id=self.slots[0].id, description='First try'
+        )
+        BookingService.cancel_booking(cancelled)
+        items = self._items(self.slots[:2])
+
+        response = self._book(items)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([item['status'] for item in response.data['results']], ['failed', 'skipped'])
+        self.assertIn('already exists', response.data['results'][0]['detail'])
+
+        response = self._book(items, atomic=False)
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item['status'] for item in response.data['results']], ['failed', 'created'])
+        self.assertEqual(Booking.objects.get(availability_slot=self.slots[0]).status, 'cancelled')
+
+    def test_atomic_books_nothing_when_an_item_fails(self):
+        items = self._items(self.slots[:2]) + self._items(self.slots[2:3], task=self.other_service)
+
+        response = self._book(items)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([item['status'] for item in response.data['results']], ['skipped', 'skipped', 'failed'])
+        self.assertIn('does not offer', response.data['results'][2]['detail'])
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(AvailabilitySlot.objects.filter(is_booked=True).exists())
+
+    def test_partial_success(self):
+        self._book(self._items(self.slots[:1]))
+        items = self._items(self.slots[:3]) + [{'availability_slot': 999999, 'task': self.service.id, 'description': 'x'}]
+
+        response = self._book(items, atomic=False)
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [item['status'] for item in response.data['results']], ['failed', 'created', 'created', 'failed']
+        )
+        self.assertEqual(response.data['results'][0]['detail'], 'Availability slot is already booked.')
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_slots_claimed_concurrently_are_reported(self):
+        # Taken between the validation read and the claim: only the free rows are updated
+        AvailabilitySlot.objects.filter(id=self.slots[1].id).update(is_booked=True)
+
+        claimed = BookingService._update_each(
+            AvailabilitySlot.objects.filter(is_booked=False), [slot.id for slot in self.slots[:3]], is_booked=True
+        )
+
+        self.assertEqual(claimed, {self.slots[0].id, self.slots[2].id})
+
+    def test_bulk_cancel(self):
+        created = self._book(self._items(self.slots[:3])).data['results']
+        ids = [item['booking']['id'] for item in created]
+        stranger = User.objects.create_user(email='other@example.com', password='pass12345', username='other')
+        self.client.force_authenticate(stranger)
+        response = self.client.post(reverse('booking-bulk-cancel'), {'bookings': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(reverse('booking-bulk-cancel'), {'bookings': ids[:2]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['booking']['status'] for item in response.data['results']], ['cancelled'] * 2)
+        self.assertEqual(
+            set(AvailabilitySlot.objects.filter(is_booked=False).values_list('id', flat=True)),
+            {slot.id for slot in self.slots} - {self.slots[2].id}
+        )
+
+        response = self.client.post(
+            reverse('booking-bulk-cancel'), {'bookings': ids, 'atomic': False}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            response.data['results'][0]['detail'], 'Cannot cancel booking with status: cancelled'
+        )
+        self.assertEqual(Booking.objects.filter(status='cancelled').count(), 3)
+
+
+class BookingExportTests(MarketplaceFixture, TestCase):
+    """Streamed CSV/NDJSON exports of bookings"""
+
+    def setUp(self):
+        other = User.objects.create_user(
+            email='other@example.com', password='pass12345', username='other', is_tasker=True
+        )
+        tomorrow = timezone.now().date() + datetime.timedelta(days=1)
+        for tasker, hours in ((self.tasker, range(9, 14)), (other, [9])):
+            for hour in hours:
+                slot = AvailabilitySlot.objects.create(
+                    tasker=tasker, date=tomorrow, start_time=datetime.time(hour, 0), end_time=datetime.time(hour, 45)
+                )
+                BookingService.create_booking(
+                    client=self.customer, tasker=tasker, task=self.service,
+                    availability_slot_id=slot.id, description=f'Job at {hour}'
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.tasker)
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    @override_settings(BOOKING_EXPORT_CHUNK_SIZE=2)
+    def test_csv_streams_own_bookings_in_one_query(self):
+        response = self.client.get(reverse('tasker-bookings-export'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="bookings.csv"', response['Content-Disposition'])
+        # Every chunk comes from one joined query per table (live and archived bookings)
+        with self.assertNumQueries(2):
+            rows = list(csv.DictReader(self._content(response).splitlines()))
+        self.assertEqual([row['description'] for row in rows], [f'Job at {hour}' for hour in range(9, 14)])
+        self.assertEqual(rows[0]['client_email'], 'client@example.com')
+        self.assertEqual(rows[0]['service'], 'Deep clean')
+        self.assertEqual(rows[0]['start_time'], '09:00:00')
+
+    def test_ndjson_with_filters(self):
+        Booking.objects.filter(description='Job at 10').update(status='completed')
+
+        response = self.client.get(reverse('tasker-bookings-export'), {'output': 'ndjson', 'status': 'completed'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['description'], 'Job at 10')
+        self.assertEqual(lines[0]['price'], '50.00')
+
+    def test_csv_cells_are_not_formulas(self):
+        Booking.objects.filter(description='Job at 9').update(description='=HYPERLINK("http://evil","x")')
+        Booking.objects.filter(description='Job at 10').update(description='-1+2')
+
+        response = self.client.get(reverse('tasker-bookings-export'))
+
+        rows = list(csv.DictReader(self._content(response).splitlines()))
+        self.assertEqual(rows[0]['description'], '\'=HYPERLINK("http://evil","x")')
+        self.assertEqual(rows[1]['description'], "'-1+2")
+        self.assertEqual(rows[0]['price'], '50.00')
+
+    def test_archived_bookings_are_included_in_date_order(self):
+        now = timezone.now()
+        old = now.date() - datetime.timedelta(days=60)
+        slot = ArchivedAvailabilitySlot.objects.create(
+            id=10_000, tasker=self.tasker, date=old, start_time=datetime.time(9, 0), end_time=datetime.time(9, 45),
+            is_booked=True, created_at=now, archived_at=now
+        )
+        ArchivedBooking.objects.create(
+            id=10_000, client=self.customer, tasker=self.tasker, task=self.service, description='Archived job',
+            availability_slot=slot, status='completed', created_at=now, updated_at=now, archived_at=now
+        )
+
+        response = self.client.get(reverse('tasker-bookings-export'), {'output': 'ndjson'})
+
+        lines = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual(
+            [line['description'] for line in lines], ['Archived job'] + [f'Job at {hour}' for hour in range(9, 14)]
+        )
+
+    def test_rejects_clients_and_bad_parameters(self):
+        response = self.client.get(reverse('tasker-bookings-export'), {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse('tasker-bookings-export'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_admin_action(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='pass12345', is_active=True)
+        self.client.force_login(admin)
+        selected = Booking.objects.filter(tasker=self.tasker).values_list('id', flat=True)[:2]
+
+        response = self.client.post(
+            reverse('admin:tasks_booking_changelist'),
+            {'action': 'export_csv', '_selected_action': [str(pk) for pk in selected]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._content(response).splitlines()), 3)
+
+
+class ArchiveTests(MarketplaceFixture, TestCase):
+    """Expired slots and finished bookings move to the archive tables"""
+
+    def setUp(self):
+        today = timezone.now().date()
+        old = today - datetime.timedelta(days=settings.ARCHIVE_AFTER_DAYS + 10)
+        recent = today - datetime.timedelta(days=1)
+        # (date, hour, booking status)
+        specs = [
+            (old, 9, None), (old, 10, 'completed'), (old, 11, 'cancelled'),
+            # Still open, stays until it is closed
+            (old, 12, 'confirmed'),
+            # Not expired yet
+            (recent, 9, None), (recent, 10, 'completed'),
+        ]
+        # bulk_create, as AvailabilitySlot.save() refuses past dates
+        slots = AvailabilitySlot.objects.bulk_create([
+            AvailabilitySlot(tasker=self.tasker, date=date, start_time=datetime.time(hour, 0),
+                             end_time=datetime.time(hour, 45), is_booked=booking_status is not None)
+            for date, hour, booking_status in specs
+        ])
+        Booking.objects.bulk_create([
+            Booking(client=self.customer, tasker=self.tasker, task=self.service, availability_slot=slot,
+                    description=f'Job at {hour}', status=booking_status)
+            for slot, (_, hour, booking_status) in zip(slots, specs) if booking_status
+        ])
+        self.client = APIClient()
+
+    def test_archives_expired_slots_and_finished_bookings_in_batches(self):
+        booking_ids = set(Booking.objects.filter(
+            status__in=['completed', 'cancelled'], availability_slot__date__lt=archive_cutoff()
+        ).values_list('id', flat=True))
+
+        self.assertEqual(archive_expired(batch_size=2), (3, 2))
+
+        self.assertEqual(set(ArchivedBooking.objects.values_list('id', flat=True)), booking_ids)
+        self.assertEqual(ArchivedAvailabilitySlot.objects.count(), 3)
+        self.assertEqual(
+            sorted(AvailabilitySlot.objects.values_list('start_time__hour', 'is_booked')),
+            [(9, False), (10, True), (12, True)]
+        )
+        self.assertEqual(Booking.objects.count(), 2)
+        archived = ArchivedBooking.objects.select_related('availability_slot').get(description='Job at 10')
+        self.assertEqual(archived.status, 'completed')
+        self.assertEqual(archived.availability_slot.start_time, datetime.time(10, 0))
+        self.assertIsNotNone(archived.archived_at)
+
+        # Nothing left to do on the next run
+        self.assertEqual(archive_expired(), (0, 0))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('archive_bookings', '--dry-run', stdout=out)
+        self.assertIn('3 slots and 2 bookings', out.getvalue())
+        self.assertEqual(ArchivedAvailabilitySlot.objects.count(), 0)
+
+        call_command('archive_bookings', '--days', '0', stdout=out)
+        self.assertIn('Archived 5 slots and 3 bookings', out.getvalue())
+
+    def test_history_endpoints(self):
+        archive_expired()
+
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse('client-booking-history'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([b['description'] for b in response.data['results']], ['Job at 10', 'Job at 11'])
+        self.assertEqual(response.data['results'][0]['slot_detail']['tasker_name'], 'tasker')
+        self.assertIn('archived_at', response.data['results'][0])
+        # The live listing no longer has them
+        response = self.client.get(reverse('client-bookings'))
+        self.assertEqual([b['description'] for b in response.data['results']], ['Job at 12', 'Job at 10'])
+
+        self.client.force_authenticate(self.tasker)
+        response = self.client.get(reverse('tasker-booking-history'))
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(reverse('slot-history'))
+        self.assertEqual(len(response.data['results']), 3)
+
+        response = self.client.post(reverse('slot-history'), {})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class HeatmapTests(MarketplaceFixture, TestCase):
+    """Per-day free/booked counts of a tasker, cached per month"""
+
+    def setUp(self):
+        cache.clear()
+        self.tasker.taskerprofile.skills.add(self.service)
+
+        # The 10th and 11th of next month, the 3rd of the one after
+        self.month = (timezone.now().date().replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        self.next_month = (self.month + datetime.timedelta(days=32)).replace(day=1)
+        self.slots = AvailabilitySlot.objects.bulk_create([
+            AvailabilitySlot(tasker=self.tasker, date=date, start_time=datetime.time(hour, 0),
+                             end_time=datetime.time(hour, 45), is_booked=booked)
+            for date, hour, booked in [
+                (self.month.replace(day=10), 9, False), (self.month.replace(day=10), 10, True),
+                (self.month.replace(day=10), 11, False), (self.month.replace(day=11), 9, False),
+                (self.next_month.replace(day=3), 9, True),
+            ]
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def heatmap(self, **params):
+        return self.client.get(reverse('slot-heatmap'), {'tasker': self.tasker.id, **params})
+
+    def test_counts_per_day_from_one_query_then_the_cache(self):
+        params = {'date_from': self.month.isoformat(), 'date_to': self.next_month.replace(day=20).isoformat()}
+        # The tasker lookup and the grouped counts
+        with self.assertNumQueries(2):
+            response = self.heatmap(**params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(day['date'], day['free'], day['booked']) for day in response.data['days']],
+            [(self.month.replace(day=10), 2, 1), (self.month.replace(day=11), 1, 0),
+             (self.next_month.replace(day=3), 0, 1)]
+        )
+        with self.assertNumQueries(0):
+            cached = self.heatmap(**params)
+        self.assertEqual(cached.data, response.data)
+
+        # Defaults to the month of date_from, cut to the requested days
+        response = self.heatmap(date_from=self.month.replace(day=11).isoformat())
+        self.assertEqual(response.data['date_to'], self.next_month - datetime.timedelta(days=1))
+        self.assertEqual([day['date'] for day in response.data['days']], [self.month.replace(day=11)])
+
+    def test_booking_and_slot_changes_invalidate(self):
+        params = {'date_from': self.month.isoformat()}
+        self.heatmap(**params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.create_booking(
+                client=self.customer, tasker=self.tasker, task=self.service,
+                availability_slot_id=self.slots[0].id, description='Job'
+            )
+        response = self.heatmap(**params)
+        self.assertEqual(response.data['days'][0], {'date': self.month.replace(day=10), 'free': 1, 'booked': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailabilityManager.create_daily_slots(self.tasker, self.month.replace(day=12), 9, 11)
+        response = self.heatmap(**params)
+        self.assertEqual(response.data['days'][-1], {'date': self.month.replace(day=12), 'free': 2, 'booked': 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slots[3].delete()
+        response = self.heatmap(**params)
+        self.assertNotIn(self.month.replace(day=11), [day['date'] for day in response.data['days']])
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get(reverse('slot-heatmap')).status_code, status.HTTP_400_BAD_REQUEST)
+        for tasker_id in (self.customer.id, 9999):
+            response = self.client.get(reverse('slot-heatmap'), {'tasker': tasker_id})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        too_long = self.month + datetime.timedelta(days=120)
+        response = self.heatmap(date_from=self.month.isoformat(), date_to=too_long.isoformat())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AdminChangelistTests(MarketplaceFixture, TestCase):
+    """Slot and booking changelists: fixed query budget, autocomplete tasker filter, estimated counts"""
+
+    def setUp(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='pass12345', is_active=True)
+        self.client.force_login(admin)
+        self.taskers = []
+
+    def _add_bookings(self, count):
+        tasker = User.objects.create_user(
+            email=f'tasker{len(self.taskers)}@example.com', password=None, username='tasker', is_tasker=True
+        )
+        self.taskers.append(tasker)
+        for hour in range(count):
+            slot = AvailabilitySlot.objects.create(
+                tasker=tasker, date=timezone.now().date(), start_time=datetime.time(hour, 0),
+                end_time=datetime.time(hour, 45)
+            )
+            Booking.objects.create(
+                client=self.customer, tasker=tasker, task=self.service, availability_slot=slot, description='Job'
+            )
+
+    def _queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_budget(self):
+        for name in ('admin:tasks_availabilityslot_changelist', 'admin:tasks_booking_changelist'):
+            with self.subTest(name):
+                self._add_bookings(1)
+                few = self._queries(reverse(name))
+                self._add_bookings(12)
+                self.assertEqual(self._queries(reverse(name)), few)
+                self.assertLessEqual(few, 6)
+
+    def test_tasker_filter_is_an_autocomplete(self):
+        self._add_bookings(2)
+        self._add_bookings(3)
+        url = reverse('admin:tasks_booking_changelist')
+
+        response = self.client.get(url)
+        self.assertContains(response, 'data-field-name="tasker"')
+        # Taskers are looked up as you type, not listed in the sidebar
+        self.assertNotContains(response, f'tasker__id__exact={self.taskers[0].id}"')
+
+        response = self.client.get(url, {'tasker__id__exact': self.taskers[1].id})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertContains(response, f'<option value="{self.taskers[1].id}" selected>')
+
+    def test_invalid_tasker_filter_value_is_dropped(self):
+        self._add_bookings(2)
+
+        for value in ('abc', '1 OR 1=1', ''):
+            with self.subTest(value):
+                response = self.client.get(reverse('admin:tasks_booking_changelist'), {'tasker__id__exact': value})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_estimated_count_only_for_unfiltered_large_tables(self):
+        self._add_bookings(2)
+        with mock.patch('quickgig_api.admin_tools.estimated_count', return_value=5_000_000):
+            self.assertEqual(EstimatedCountPaginator(Booking.objects.all(), 100).count, 5_000_000)
+            self.assertEqual(EstimatedCountPaginator(Booking.objects.filter(status='confirmed'), 100).count, 2)
+        with mock.patch('quickgig_api.admin_tools.estimated_count', return_value=50):
+            self.assertEqual(EstimatedCountPaginator(Booking.objects.all(), 100).count, 2)
+
+
+class AsyncReadTests(MarketplaceFixture, TestCase):
+    """The async read endpoints answer like their DRF counterparts"""
+
+    def setUp(self):
+        day = timezone.now().date() + datetime.timedelta(days=1)
+        for hour in range(5):
+            slot = AvailabilitySlot.objects.create(
+                tasker=self.tasker, date=day, start_time=datetime.time(hour, 0), end_time=datetime.time(hour, 30)
+            )
+            if hour % 2:
+                Booking.objects.create(
+                    client=self.customer, tasker=self.tasker, task=self.service, availability_slot=slot, description=''
+                )
+
+    def _client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def _assert_same(self, sync_name, async_name, user=None, **params):
+        client = self._client(user)
+        expected = client.get(reverse(sync_name), params)
+        response = client.get(reverse(async_name), params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], expected.json()['results'])
+        return response.json()
+
+    def test_same_results_as_sync_endpoints(self):
+        self.assertEqual(len(self._assert_same('client-bookings', 'client-bookings-async', self.customer)['results']), 2)
+        self._assert_same('tasker-bookings', 'tasker-bookings-async', self.tasker)
+        self._assert_same('slot-list', 'slot-list-async', tasker=self.tasker.id)
+
+    def test_cursor_pagination(self):
+        first = self._assert_same('slot-list', 'slot-list-async', page_size=2)
+        self.assertIn('/api/tasks/async/slots/', first['next'])
+
+        second = self._client().get(first['next']).json()
+        self.assertEqual(len(second['results']), 2)
+        self.assertNotEqual(second['results'][0]['id'], first['results'][0]['id'])
+
+    def test_bookings_require_a_valid_token(self):
+        self.assertEqual(self._client().get(reverse('client-bookings-async')).status_code, 401)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(client.get(reverse('tasker-bookings-async')).status_code, 401)
+
+    def test_read_only(self):
+        response = self._client(self.customer).post(reverse('client-bookings-async'))
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class ReadReplicaRoutingTests(TestCase):
+    """Listings read from the replica, everything else from the primary"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='client@example.com', password=None, username='client', is_tasker=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_router_only_reads_from_a_configured_replica_inside_the_block(self):
+        router = ReadReplicaRouter()
+
+        with read_from_replica():
+            self.assertIsNone(router.db_for_read(Booking))
+
+        with mock.patch.dict(settings.DATABASES, {'replica': {}}):
+            self.assertIsNone(router.db_for_read(Booking))
+            with read_from_replica():
+                self.assertEqual(router.db_for_read(Booking), 'replica')
+                self.assertEqual(router.db_for_write(Booking), 'default')
+            self.assertFalse(router.allow_migrate('replica', 'tasks'))
+
+    def test_decorator_is_safe_across_threads(self):
+        barrier = threading.Barrier(2)
+        errors = []
+
+        @read_from_replica()
+        def listing():
+            barrier.wait(timeout=5)
+
+        def call():
+            try:
+                listing()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    def _replica_reads(self, method, url):
+        routed = []
+        route = ReadReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            # Record the decision, but keep reading from the test database
+            with mock.patch.dict(settings.DATABASES, {'replica': {}}):
+                routed.append(route(router, model, **hints) == 'replica')
+            return None
+
+        with mock.patch.object(ReadReplicaRouter, 'db_for_read', autospec=True, side_effect=db_for_read):
+            getattr(self.client, method)(url)
+        return routed
+
+    def test_listings_read_from_the_replica(self):
+        for url in (reverse('client-bookings'), reverse('slot-list'), reverse('public-taskers')):
+            routed = self._replica_reads('get', url)
+            self.assertTrue(routed and all(routed), url)
+
+    def test_detail_and_writes_stay_on_the_primary(self):
+        self.assertFalse(any(self._replica_reads('get', '/api/accounts/tasker-profiles/me/')))
+        self.assertFalse(any(self._replica_reads('post', reverse('slot-list'))))
+
+
+@override_settings(SERVER_TIMING_HEADER=True)
+class RequestMetricsTests(MarketplaceFixture, TestCase):
+    """Per-route instrumentation by RequestMetricsMiddleware"""
+
+    def setUp(self):
+        registry.reset()
+        day = timezone.now().date() + datetime.timedelta(days=1)
+        for hour in range(3):
+            slot = AvailabilitySlot.objects.create(
+                tasker=self.tasker, date=day, start_time=datetime.time(hour, 0), end_time=datetime.time(hour, 30)
+            )
+            Booking.objects.create(
+                client=self.customer, tasker=self.tasker, task=self.service, availability_slot=slot, description=''
+            )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.customer).access_token}')
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('booking-list'))
+
+        # user lookup + one joined booking query
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="2 queries", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+
+    def test_serialization_is_timed_apart_from_rendering(self):
+        self.client.get(reverse('booking-list'))
+
+        stats = registry.routes['booking-list']
+        self.assertGreater(stats['serialize_seconds'], 0)
+        self.assertGreater(stats['render_seconds'], 0)
+
+    def test_async_views_count_queries_run_in_worker_threads(self):
+        response = self.client.get(reverse('client-bookings-async'))
+
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    def test_prometheus_endpoint(self):
+        self.client.get(reverse('booking-list'))
+        self.client.get(reverse('booking-list'))
+
+        with self.settings(DEBUG=True):
+            metrics = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertIn('quickgig_http_requests_total{route="booking-list",method="GET",status="200"} 2', metrics)
+        self.assertIn('quickgig_db_queries_per_request_bucket{route="booking-list",le="2"} 2', metrics)
+        self.assertIn('quickgig_http_request_duration_seconds_count{route="booking-list"} 2', metrics)
+        self.assertIn('quickgig_serialization_seconds_total{route="booking-list"}', metrics)
+        self.assertIn('quickgig_render_seconds_total{route="booking-list"}', metrics)
+
+    def test_metrics_token(self):
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+            response = APIClient().get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_server_timing_header_can_be_turned_off(self):
+        with self.settings(SERVER_TIMING_HEADER=False):
+            response = self.client.get(reverse('booking-list'))
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_unknown_methods_share_one_label(self):
+        self.client.generic('BREW"}', reverse('booking-list'))
+
+        with self.settings(DEBUG=True):
+            metrics = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertIn('quickgig_http_requests_total{route="booking-list",method="other",status="405"} 1', metrics)
+        self.assertNotIn('BREW', metrics)
+
+    def test_metrics_are_private_without_a_token(self):
+        with self.settings(METRICS_TOKEN='', DEBUG=False):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_slow_queries_are_logged(self):
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0), self.assertLogs('quickgig_api.sql', 'WARNING') as logs:
+            self.client.get(reverse('booking-list'))
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('Slow query on booking-list', logs.output[0])
+
+
+class BenchmarkDataTests(TestCase):
+    """Synthetic data seeded for bench_api"""
+
+    def _seed(self, tag, seed=1):
+        return seed_benchmark_data(
+            tag, seed=seed, clients=5, taskers=3, services=4, skills_per_tasker=2, weeks=1, slots_per_day=2, bookings=10
+        )
+
+    def test_seeds_a_consistent_graph(self):
+        data = self._seed('a')
+
+        self.assertEqual(User.objects.filter(email__endswith='@bench-a.local').count(), 8)
+        self.assertEqual(AvailabilitySlot.objects.filter(tasker_id__in=data.tasker_ids).count(), 42)
+        self.assertEqual(AvailabilitySlot.objects.filter(tasker_id__in=data.tasker_ids, is_booked=True).count(), 10)
+        self.assertEqual(len(data.free_slot_ids), 32)
+        for booking in Booking.objects.filter(tasker_id__in=data.tasker_ids):
+            self.assertIn(booking.task_id, data.skills[booking.tasker_id])
+
+        # Seeded taskers are searchable and can log in
+        response = APIClient().get(reverse('public-taskers'), {'skills': data.service_ids[0]})
+        self.assertTrue(response.data['results'])
+        self.assertTrue(User.objects.get(email=data.email('client', 0)).check_password(data.password))
+
+    def test_same_seed_same_data(self):
+        self._seed('a')
+        self._seed('b')
+
+        def usernames(tag):
+            return list(User.objects.filter(email__endswith=f'@bench-{tag}.local').order_by('email').values_list(
+                'username', flat=True
+            ))
+        self.assertEqual(usernames('a'), usernames('b'))
+
+    def test_delete_removes_only_the_tagged_data(self):
+        self._seed('a')
+        kept = self._seed('b')
+
+        delete_benchmark_data('a')
+
+        self.assertFalse(User.objects.filter(email__endswith='@bench-a.local').exists())
+        self.assertEqual(Booking.objects.count(), 10)
+        self.assertEqual(Service.objects.count(), len(kept.service_ids))
+
+    def test_load_returns_the_generated_ids(self):
+        data = self._seed('a')
+
+        loaded = load_benchmark_data('a')
+
+        self.assertEqual(loaded.client_ids, data.client_ids)
+        self.assertEqual(loaded.tasker_ids, data.tasker_ids)
+        self.assertEqual({k: sorted(v) for k, v in loaded.skills.items()}, {k: sorted(v) for k, v in data.skills.items()})
+        self.assertEqual(sorted(loaded.free_slot_ids), sorted(data.free_slot_ids))
+
+    def test_generate_command_refuses_to_overwrite(self):
+        options = dict(clients=4, taskers=2, services=2, days=2, slots_per_day=3, bookings=5, stdout=StringIO())
+        call_command('generate_bench_data', tag='g', **options)
+        self.assertEqual(Booking.objects.filter(tasker__email__endswith='@bench-g.local').count(), 5)
+
+        with self.assertRaises(CommandError):
+            call_command('generate_bench_data', tag='g', **options)
+        call_command('generate_bench_data', tag='g', replace=True, **options)
+        self.assertEqual(AvailabilitySlot.objects.filter(tasker__email__endswith='@bench-g.local').count(), 12)
@@ -1,7 +1,11 @@
 from django.urls import path
+from . import async_views
 from .views import (
     AvailabilitySlotListCreateView, AvailabilitySlotDetailView,
-    BookingListCreateView, BookingDetailView, DailyAvailabilitySlotView,client_bookings, tasker_bookings
+    BookingListCreateView, BookingDetailView, DailyAvailabilitySlotView, RecurringAvailabilitySlotView,
+    AvailabilitySearchView, slot_heatmap,
+    bulk_bookings, bulk_cancel_bookings, client_bookings, tasker_bookings, tasker_bookings_export,
+    client_booking_history, slot_history, tasker_booking_history
 )
 
 urlpatterns = [
@@ -9,14 +13,30 @@ urlpatterns = [
     path("slots/", AvailabilitySlotListCreateView.as_view(), name="slot-list"),
     path("slots/<int:pk>/", AvailabilitySlotDetailView.as_view(), name="slot-detail"),
     path("slots/daily/", DailyAvailabilitySlotView.as_view(), name="slot-daily"),
+    path("slots/recurring/", RecurringAvailabilitySlotView.as_view(), name="slot-recurring"),
+    path("slots/heatmap/", slot_heatmap, name="slot-heatmap"),
+    path("availability/", AvailabilitySearchView.as_view(), name="availability-search"),
 
     # Bookings
     path("bookings/", BookingListCreateView.as_view(), name="booking-list"),
     path("bookings/<int:pk>/", BookingDetailView.as_view(), name="booking-detail"),
+    path("bookings/bulk/", bulk_bookings, name="booking-bulk"),
+    path("bookings/bulk/cancel/", bulk_cancel_bookings, name="booking-bulk-cancel"),
     # Client Bookings
     path("bookings/client/", client_bookings, name="client-bookings"),
     # Tasker Bookings
     path("bookings/tasker/", tasker_bookings, name="tasker-bookings"),
+    path("bookings/tasker/export/", tasker_bookings_export, name="tasker-bookings-export"),
+
+    # History (archived, read-only)
+    path("history/slots/", slot_history, name="slot-history"),
+    path("history/bookings/client/", client_booking_history, name="client-booking-history"),
+    path("history/bookings/tasker/", tasker_booking_history, name="tasker-booking-history"),
+
+    # ASGI-native read endpoints
+    path("async/slots/", async_views.slot_list, name="slot-list-async"),
+    path("async/bookings/client/", async_views.client_bookings, name="client-bookings-async"),
+    path("async/bookings/tasker/", async_views.tasker_bookings, name="tasker-bookings-async"),
 ]
 
 """
@@ -41,6 +61,19 @@ Availability Slots
     Delete a specific availability slot (owner only).
 - POST   /api/tasks/slots/daily/
     Bulk create multiple availability slots for the authenticated tasker (daily or weekly).
+- POST   /api/tasks/slots/recurring/
+    Generate slots from a recurring schedule for the authenticated tasker
+    (start_date, end_date, weekdays, start_time, end_time, slot_minutes, breaks, exceptions).
+    Slots the tasker already has are skipped.
+- GET    /api/tasks/slots/heatmap/?tasker=<tasker_id>
+    Free and booked slot counts per day of the tasker, for the days that have slots:
+    {"tasker", "date_from", "date_to", "days": [{"date", "free", "booked"}, ...]}.
+    Optional: date_from, date_to (at most 93 days, the current month by default).
+    Cached per tasker and month, any change to the tasker's slots or bookings invalidates it.
+    Readable by any authenticated user, like the availability search. 404 for an unknown tasker.
+- GET    /api/tasks/availability/?service=<id>&date_from=<date>
+    Free slots of every tasker offering the service, grouped by tasker.
+    Optional: date_to (window of at most 31 days), start_time, end_time, location.
 
 Bookings
 --------
@@ -48,6 +81,7 @@ Bookings
     List all bookings (authenticated users).
 - POST   /api/tasks/bookings/
     Create a new booking (authenticated users).
+    Returns 409 with the tasker's next free slots ("alternatives") if the slot was taken.
 - GET    /api/tasks/bookings/<int:pk>/
     Retrieve details of a specific booking (tasker or client).
 - PATCH  /api/tasks/bookings/<int:pk>/
@@ -56,14 +90,50 @@ Bookings
     Fully update the status of a booking (tasker or client).
 - DELETE /api/tasks/bookings/<int:pk>/
     Cancel a booking (only clients can cancel).
+- POST   /api/tasks/bookings/bulk/
+    Book up to BOOKING_BULK_MAX_ITEMS slots at once:
+    {"bookings": [{"availability_slot", "task", "description"}, ...], "atomic": true}.
+    With atomic (the default) either every slot is booked or none is; otherwise
+    the valid items are booked and the response is 207. Each item is reported
+    in "results" as created (with the booking), failed or skipped.
+- POST   /api/tasks/bookings/bulk/cancel/
+    Cancel many of the client's bookings: {"bookings": [<id>, ...], "atomic": true},
+    reported the same way.
 - GET    /api/tasks/bookings/client/
     Get user's bookings as client (optional).
 - GET    /api/tasks/bookings/tasker/
     Get user's bookings as tasker (optional).
+- GET    /api/tasks/bookings/tasker/export/?output=csv|ndjson
+    Stream all of the tasker's bookings, archived ones included, as a CSV
+    (default) or NDJSON download, in date order. Optional: status, date_from,
+    date_to. CSV cells that a spreadsheet would run as a formula are prefixed
+    with an apostrophe.
+
+History
+-------
+Slots dated more than ARCHIVE_AFTER_DAYS ago and their completed or cancelled
+bookings are moved out of the listings above by `manage.py archive_bookings`.
+- GET    /api/tasks/history/slots/
+    The tasker's archived availability slots.
+- GET    /api/tasks/history/bookings/client/
+- GET    /api/tasks/history/bookings/tasker/
+    The user's archived bookings as client / as tasker, shaped like the live
+    ones plus "archived_at". Read-only.
+
+Async reads
+-----------
+- GET    /api/tasks/async/slots/
+- GET    /api/tasks/async/bookings/client/
+- GET    /api/tasks/async/bookings/tasker/
+    Same responses as the endpoints above, served by async views that do not
+    hold a worker thread while waiting on the database when run under ASGI
+    (e.g. `uvicorn quickgig_api.asgi:application`).
 
 Notes
 -----
 - All endpoints require authentication unless otherwise specified.
 - Permissions are enforced so only owners can modify or delete their slots/bookings.
 - Bulk slot creation returns a multi-status response if some slots fail validation.
+- Slot and booking listings are cursor paginated ({"next", "previous", "results"}),
+  ordered by date and start time. Use ?page_size=<n> (capped by API_MAX_PAGE_SIZE).
 """
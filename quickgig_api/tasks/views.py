@@ -1,22 +1,38 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, router, transaction
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from .models import AvailabilitySlot, Booking, BookingService
-from .serializers import AvailabilitySlotSerializer, BookingSerializer
+from quickgig_api.db_routers import ReplicaListMixin, read_from_replica
+from quickgig_api.pagination import AvailabilitySearchPagination, BookingPagination, SlotPagination
+from .exports import stream_bookings
+from .heatmap import get_heatmap, invalidate_heatmaps
+from .models import (
+    ArchivedAvailabilitySlot, ArchivedBooking, AvailabilitySlot, AvailabilityManager, Booking, BookingService,
+    SlotUnavailable
+)
+from .serializers import (
+    AvailabilitySlotSerializer, AvailabilitySlotBulkSerializer,
+    RecurringAvailabilitySerializer, AvailabilitySearchSerializer, BookingSerializer, BookingExportSerializer,
+    BookingBulkSerializer, BookingBulkCancelSerializer, ArchivedAvailabilitySlotSerializer, ArchivedBookingSerializer,
+    HeatmapSerializer
+)
 from accounts.permissions import (    
     IsOwnerOrReadOnly,
+    IsTasker,
     IsTaskerOrClient,
 )
 from rest_framework.decorators import api_view, permission_classes
 
 
-class AvailabilitySlotListCreateView(generics.ListCreateAPIView):
+class AvailabilitySlotListCreateView(ReplicaListMixin, generics.ListCreateAPIView):
     """List all slots or creates a new availability slot"""
     queryset = AvailabilitySlot.objects.all()
     serializer_class = AvailabilitySlotSerializer
     permission_classes = [IsOwnerOrReadOnly]
+    pagination_class = SlotPagination
 
     def get_queryset(self):
-        queryset = AvailabilitySlot.objects.all()
+        queryset = AvailabilitySlot.objects.select_related('tasker')
         tasker_id = self.request.query_params.get("tasker")
 
         if tasker_id:
@@ -25,18 +41,20 @@ class AvailabilitySlotListCreateView(generics.ListCreateAPIView):
         return queryset
     
     def create(self, request, *args, **kwargs):
-        start_time = request.data.get('start_time')
-        end_time = request.data.get('end_time')
         tasker = request.user
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        if AvailabilitySlot.objects.filter(start_time=start_time, end_time=end_time, tasker=tasker).exists():
+        # Checked on the validated values, so the comparison matches the unique_tasker_slot constraint
+        data = serializer.validated_data
+        if AvailabilitySlot.objects.filter(
+            tasker=tasker, date=data.get('date'), start_time=data.get('start_time'), end_time=data.get('end_time')
+        ).exists():
             return Response(
-                {"detail": "A slot with the same start and end time already exists."},
+                {"detail": "A slot with the same date, start and end time already exists."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
         serializer.save(tasker=tasker)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -51,22 +69,46 @@ class DailyAvailabilitySlotView(generics.CreateAPIView):
         created_slots = []
         errors = []
 
+        # Validate the whole payload in memory first
+        results = []
         for slot_data in slots_data:
-            start_time = slot_data.get('start_time')
-            end_time = slot_data.get('end_time')
+            serializer = AvailabilitySlotBulkSerializer(data=slot_data)
+            if serializer.is_valid():
+                results.append(AvailabilitySlot(tasker=tasker, **serializer.validated_data))
+            else:
+                results.append(serializer.errors)
+
+        # One query for every slot the tasker already has in the payload's date range
+        pending = [result for result in results if isinstance(result, AvailabilitySlot)]
+        taken = AvailabilityManager.existing_slot_keys(tasker, [slot.date for slot in pending])
 
-            if AvailabilitySlot.objects.filter(start_time=start_time, end_time=end_time, tasker=tasker).exists():
+        new_slots = []
+        for result in results:
+            if not isinstance(result, AvailabilitySlot):
+                errors.append(result)
+                continue
+
+            key = (result.date, result.start_time, result.end_time)
+            if key in taken:
                 errors.append(
-                    {"detail": f"A slot with the same start and end time already exists: {start_time} - {end_time}."}
+                    {"detail": f"A slot with the same start and end time already exists: {result.start_time} - {result.end_time}."}
                 )
                 continue
 
-            serializer = self.get_serializer(data=slot_data)
-            if serializer.is_valid():
-                serializer.save(tasker=tasker)
-                created_slots.append(serializer.data)
-            else:
-                errors.append(serializer.errors)
+            taken.add(key)
+            new_slots.append(result)
+
+        if new_slots:
+            try:
+                with transaction.atomic():
+                    new_slots = AvailabilitySlot.objects.bulk_create(new_slots)
+                    invalidate_heatmaps([tasker.id])
+            except IntegrityError:
+                return Response(
+                    {"detail": "Slots were modified concurrently, please retry."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            created_slots = self.get_serializer(new_slots, many=True).data
 
         if errors:
             return Response(
@@ -75,6 +117,80 @@ class DailyAvailabilitySlotView(generics.CreateAPIView):
             )
         return Response(created_slots, status=status.HTTP_201_CREATED)
 
+class RecurringAvailabilitySlotView(generics.CreateAPIView):
+    """Taskers can generate availability slots from a recurring weekly schedule"""
+    serializer_class = RecurringAvailabilitySerializer
+    permission_classes = [IsTasker]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rule = serializer.validated_data
+
+        try:
+            created = AvailabilityManager.create_recurring_slots(
+                tasker=request.user,
+                start_date=rule['start_date'],
+                end_date=rule['end_date'],
+                weekdays=rule['weekdays'],
+                start_time=rule['start_time'],
+                end_time=rule['end_time'],
+                slot_minutes=rule['slot_minutes'],
+                breaks=[(b['start_time'], b['end_time']) for b in rule.get('breaks', [])],
+                exceptions=rule.get('exceptions', [])
+            )
+        except IntegrityError:
+            return Response(
+                {"detail": "Slots were modified concurrently, please retry."},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(
+            AvailabilitySlotSerializer(created, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+class AvailabilitySearchView(ReplicaListMixin, generics.ListAPIView):
+    """Free slots of every tasker offering a service in a date/time window, grouped by tasker"""
+    serializer_class = AvailabilitySlotSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AvailabilitySearchPagination
+
+    def get_queryset(self):
+        params = AvailabilitySearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return BookingService.search_available_slots(**params.validated_data)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+
+        taskers = []
+        for slot in page:
+            if not taskers or taskers[-1]['tasker'] != slot.tasker_id:
+                taskers.append({'tasker': slot.tasker_id, 'tasker_name': slot.tasker.username, 'slots': []})
+            taskers[-1]['slots'].append(slot)
+
+        for group in taskers:
+            group['slots'] = self.get_serializer(group['slots'], many=True).data
+        return self.get_paginated_response(taskers)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def slot_heatmap(request):
+    """Free and booked slot counts per day of a tasker (tasks.heatmap), like the availability search any user may see it"""
+    params = HeatmapSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    filters = params.validated_data
+
+    days = get_heatmap(filters['tasker'], filters['date_from'], filters['date_to'])
+    if days is None:
+        return Response({"detail": "Tasker not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        "tasker": filters['tasker'],
+        "date_from": filters['date_from'],
+        "date_to": filters['date_to'],
+        "days": [{"date": date, "free": free, "booked": booked} for date, (free, booked) in days.items()],
+    })
+
 class AvailabilitySlotDetailView(generics.RetrieveUpdateDestroyAPIView):
     """View, update, or delete a specific slot"""
     queryset = AvailabilitySlot.objects.all()
@@ -107,27 +223,44 @@ class AvailabilitySlotDetailView(generics.RetrieveUpdateDestroyAPIView):
                 {"detail": "Slot not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
-class BookingListCreateView(generics.ListCreateAPIView):
+class BookingListCreateView(ReplicaListMixin, generics.ListCreateAPIView):
     """List all bookings or create a new booking"""
-    queryset = Booking.objects.all()
+    queryset = BookingService.get_bookings()
     serializer_class = BookingSerializer
     permission_classes = [IsOwnerOrReadOnly, permissions.IsAuthenticated]
+    pagination_class = BookingPagination
 
-    def perform_create(self, serializer):
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
-        booking = BookingService.create_booking(
-            client=self.request.user,
-            tasker=data["tasker"],
-            task=data["task"],
-            availability_slot_id=data["availability_slot"].id,
-            description=data["description"]
-        )
-        # Save the booking instance using the serializer
-        serializer.instance = booking
+
+        try:
+            booking = BookingService.create_booking(
+                client=request.user,
+                tasker=data["tasker"],
+                task=data["task"],
+                availability_slot_id=data["availability_slot"].id,
+                description=data["description"]
+            )
+        except SlotUnavailable as e:
+            # Lost the race for the slot, offer the tasker's next free slots instead
+            alternatives = BookingService.get_alternative_slots(data["availability_slot"])
+            return Response(
+                {
+                    "detail": e.messages[0],
+                    "alternatives": AvailabilitySlotSerializer(alternatives, many=True).data
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValidationError as e:
+            return Response({"detail": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(self.get_serializer(booking).data, status=status.HTTP_201_CREATED)
 
 class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
     """View, update, or cancel a booking"""
-    queryset = Booking.objects.all()
+    queryset = BookingService.get_bookings()
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated, IsTaskerOrClient]
 
@@ -153,20 +286,154 @@ class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
         serializer = self.get_serializer(cancelled)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+def bulk_response(results, atomic, success_status, serialize):
+    """Per item results of a bulk booking request, with the status code the outcome calls for"""
+    failed = [result for result in results if isinstance(result, ValidationError)]
+    items = []
+    for index, result in enumerate(results):
+        if isinstance(result, ValidationError):
+            items.append({"index": index, "status": "failed", "detail": result.messages[0]})
+        elif atomic and failed:
+            items.append({"index": index, "status": "skipped", "detail": "Not applied because another item failed."})
+        else:
+            items.append({"index": index, "status": success_status, "booking": serialize(result)})
+
+    if not failed:
+        code = status.HTTP_201_CREATED if success_status == "created" else status.HTTP_200_OK
+    elif not atomic:
+        code = status.HTTP_207_MULTI_STATUS
+    elif all(isinstance(result, SlotUnavailable) for result in failed):
+        code = status.HTTP_409_CONFLICT
+    else:
+        code = status.HTTP_400_BAD_REQUEST
+    return Response({"results": items}, status=code)
+
+# Bulk Bookings
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_bookings(request):
+    """Book many slots for the client in one transaction"""
+    serializer = BookingBulkSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    atomic = serializer.validated_data["atomic"]
+
+    results = BookingService.bulk_create_bookings(
+        request.user, serializer.validated_data["bookings"], atomic=atomic
+    )
+    # One query for everything the created bookings' representation needs
+    created = BookingService.get_bookings().in_bulk(
+        [result.id for result in results if isinstance(result, Booking) and result.id]
+    )
+    return bulk_response(
+        results, atomic, "created", lambda booking: BookingSerializer(created[booking.id]).data
+    )
+
+# Bulk Cancel
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_cancel_bookings(request):
+    """Cancel many of the client's bookings in one transaction"""
+    serializer = BookingBulkCancelSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    atomic = serializer.validated_data["atomic"]
+
+    results = BookingService.bulk_cancel_bookings(
+        request.user, serializer.validated_data["bookings"], atomic=atomic
+    )
+    cancelled = BookingService.get_bookings().in_bulk(
+        [result.id for result in results if isinstance(result, Booking) and result.status == 'cancelled']
+    )
+    return bulk_response(
+        results, atomic, "cancelled", lambda booking: BookingSerializer(cancelled[booking.id]).data
+    )
+
 # Client Bookings
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica()
 def client_bookings(request):
     """Get bookings where user is the client"""
-    bookings = Booking.objects.filter(client=request.user)
-    serializer = BookingSerializer(bookings, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    bookings = BookingService.get_client_bookings(request.user)
+    paginator = BookingPagination()
+    page = paginator.paginate_queryset(bookings, request)
+    serializer = BookingSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 # Tasker Bookings
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica()
 def tasker_bookings(request):
     """Get bookings where user is the tasker"""
-    bookings = Booking.objects.filter(tasker=request.user)
-    serializer = BookingSerializer(bookings, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    bookings = BookingService.get_tasker_bookings(request.user)
+    paginator = BookingPagination()
+    page = paginator.paginate_queryset(bookings, request)
+    serializer = BookingSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+# Tasker Booking Export
+@api_view(['GET'])
+@permission_classes([IsTasker])
+def tasker_bookings_export(request):
+    """Stream the tasker's bookings, archived ones included, as CSV or NDJSON"""
+    params = BookingExportSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    filters = params.validated_data
+
+    querysets = []
+    for model in (Booking, ArchivedBooking):
+        bookings = model.objects.filter(tasker=request.user).order_by(
+            'availability_slot__date', 'availability_slot__start_time', 'id'
+        )
+        if filters.get('status'):
+            bookings = bookings.filter(status=filters['status'])
+        if filters.get('date_from'):
+            bookings = bookings.filter(availability_slot__date__gte=filters['date_from'])
+        if filters.get('date_to'):
+            bookings = bookings.filter(availability_slot__date__lte=filters['date_to'])
+
+        # The rows are read while the response streams, after this view has
+        # returned, so pin the replica choice to the queryset now
+        with read_from_replica():
+            querysets.append(bookings.using(router.db_for_read(model)))
+    return stream_bookings(querysets, filters['output'], filename='bookings')
+
+
+# History (archived slots and bookings, see tasks.archive)
+def archived_bookings():
+    return ArchivedBooking.objects.select_related('client', 'tasker', 'task', 'availability_slot__tasker')
+
+
+@api_view(['GET'])
+@permission_classes([IsTasker])
+@read_from_replica()
+def slot_history(request):
+    """Get the user's archived availability slots"""
+    slots = ArchivedAvailabilitySlot.objects.select_related('tasker').filter(tasker=request.user)
+    paginator = SlotPagination()
+    page = paginator.paginate_queryset(slots, request)
+    serializer = ArchivedAvailabilitySlotSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@read_from_replica()
+def client_booking_history(request):
+    """Get the archived bookings where user is the client"""
+    paginator = BookingPagination()
+    page = paginator.paginate_queryset(archived_bookings().filter(client=request.user), request)
+    serializer = ArchivedBookingSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@read_from_replica()
+def tasker_booking_history(request):
+    """Get the archived bookings where user is the tasker"""
+    paginator = BookingPagination()
+    page = paginator.paginate_queryset(archived_bookings().filter(tasker=request.user), request)
+    serializer = ArchivedBookingSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
@@ -25,4 +25,16 @@ PRIVATE_URL.interceptors.request.use((config) => {
         config.headers.Authorization = `Bearer ${token}`;
     }
     return config;
-});
\ No newline at end of file
+});
+
+// Listings are keyset-paginated ({ results, next }): follow next until the last page
+export const getAllPages = async (client, url) => {
+    const results = [];
+    let next = url;
+    while (next) {
+        const res = await client.get(next);
+        results.push(...res.data.results);
+        next = res.data.next;
+    }
+    return results;
+};
\ No newline at end of file
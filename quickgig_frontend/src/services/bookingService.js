@@ -1,9 +1,13 @@
-import { PRIVATE_URL } from "./api";
+import { PRIVATE_URL, getAllPages } from "./api";
 
 export const createBooking = (data) => {
     return PRIVATE_URL.post("tasks/bookings/", data);
 }
 
 export const getTaskerSlots = (taskerId) => {
-    return PRIVATE_URL.get(`tasks/slots/?tasker=${taskerId}`);
-}
\ No newline at end of file
+    return getAllPages(PRIVATE_URL, `tasks/slots/?tasker=${taskerId}`);
+}
+
+export const searchAvailability = (params) => {
+    return PRIVATE_URL.get("tasks/availability/", { params });
+}
@@ -1,9 +1,9 @@
-import { PRIVATE_URL } from "./api";
+import { PRIVATE_URL, getAllPages } from "./api";
 
 export const getClientTasks = () => {
-    return PRIVATE_URL.get("tasks/bookings/client/");
+    return getAllPages(PRIVATE_URL, "tasks/bookings/client/");
 };
 
 export const getTaskerTasks = () => {
-    return PRIVATE_URL.get("tasks/bookings/tasker/");
+    return getAllPages(PRIVATE_URL, "tasks/bookings/tasker/");
 };
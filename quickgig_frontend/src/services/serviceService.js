@@ -1,9 +1,9 @@
 // src/services/serviceService.js
-import { PUBLIC_URL } from "./api";
+import { PUBLIC_URL, getAllPages } from "./api";
 
 // fetch all services
-export const getServices = () => PUBLIC_URL.get("services/services");
+export const getServices = () => getAllPages(PUBLIC_URL, "services/services/");
 
 // fetch taskers by service
 export const getTaskersByService = (serviceId) =>
-  PUBLIC_URL.get(`accounts/public/taskers/?skills=${serviceId}`);
+  getAllPages(PUBLIC_URL, `accounts/public/taskers/?skills=${serviceId}`);
@@ -22,8 +22,8 @@ const useBookingStore = create((set) => ({
   fetchTaskerSlots: async (taskerId) => {
     set({ loading: true });
     try {
-      const res = await bookingService.getTaskerSlots(taskerId);
-      set({ slots: res.data, loading: false });
+      const slots = await bookingService.getTaskerSlots(taskerId);
+      set({ slots, loading: false });
     } catch (error) {
       set({
         error: error.response?.data || "Failed to load slots",
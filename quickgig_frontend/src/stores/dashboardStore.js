@@ -18,15 +18,15 @@ const useDashboardStore = create((set, get) => ({
         set({ loading: true, error: null });
         try {
             const { mode } = get();
-            let response;
+            let tasks;
             
             if (mode === "client") {
-                response = await getClientTasks();
+                tasks = await getClientTasks();
             } else {
-                response = await getTaskerTasks();
+                tasks = await getTaskerTasks();
             }
             
-            set({ tasks: response.data, loading: false });
+            set({ tasks, loading: false });
         } catch (error) {
             console.error("Failed to load tasks:", error.response?.data || error.message);
             set({ 
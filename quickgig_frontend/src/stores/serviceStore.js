@@ -11,8 +11,8 @@ const useServiceStore = create((set) => ({
   fetchServices: async () => {
     set({ loading: true });
     try {
-      const res = await getServices();
-      set({ services: res.data, loading: false });
+      const services = await getServices();
+      set({ services, loading: false });
     } catch (error) {
       set({ loading: false, error: error.message || "Failed to load services" });
     }
@@ -21,8 +21,8 @@ const useServiceStore = create((set) => ({
   fetchTaskers: async (serviceId) => {
     set({ loading: true });
     try {
-      const res = await getTaskersByService(serviceId);
-      set({ taskers: res.data, loading: false });
+      const taskers = await getTaskersByService(serviceId);
+      set({ taskers, loading: false });
     } catch (error) {
       set({ loading: false, error: error.message || "Failed to load taskers" });
     }